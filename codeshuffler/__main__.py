@@ -0,0 +1,324 @@
+import argparse
+import os
+import sys
+
+
+def cmd_batch(args):
+    from codeshuffler.lib.batch import run_batch
+
+    def report(done, total):
+        print(f"\rGenerated {done}/{total} versions", end="", file=sys.stderr, flush=True)
+
+    manifest_path = run_batch(
+        args.snippets,
+        args.output,
+        args.versions,
+        workers=args.workers,
+        no_of_choices=args.choices,
+        first_same_lines=args.fixed_lines,
+        seed=args.seed,
+        only=args.only,
+        renderer=args.renderer,
+        manifest=args.manifest,
+        mix=args.mix,
+        progress=None if args.quiet else report,
+    )
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Manifest written to {manifest_path}")
+
+
+def cmd_key(args):
+    import json
+
+    from codeshuffler.lib.manifest import ManifestReader
+
+    with ManifestReader(args.manifest) as reader:
+        for version in args.versions:
+            if version not in reader:
+                raise ValueError(f"Version {version} is not in {args.manifest}.")
+            print(json.dumps(reader[version], indent=1))
+
+
+def cmd_verify(args):
+    from codeshuffler.lib.verify import verify_snippets, write_report
+
+    def report(done, total):
+        print(f"\rVerified {done}/{total} chunks", end="", file=sys.stderr, flush=True)
+
+    results = verify_snippets(
+        args.snippets,
+        workers=args.workers,
+        first_same_lines=args.fixed_lines,
+        cpu_limit=args.cpu_limit,
+        wall_limit=args.wall_limit,
+        progress=None if args.quiet else report,
+    )
+    if not args.quiet:
+        print(file=sys.stderr)
+    for name, result in results.items():
+        if result["status"] not in ("ok", "incomplete"):
+            print(f"{name}: {result['status']}")
+            continue
+        print(
+            f"{name}: {len(result['flagged'])} of {result['candidates']} distractors match the "
+            f"correct code ({result['tests']} test cases, {result['cached']} verdicts cached)"
+        )
+        if result["status"] == "incomplete":
+            print(
+                f"{name}: {result['unverified']} distractors were not verified because a worker "
+                f"failed ({result['errors'][0]})"
+            )
+    print(f"Report written to {write_report(results, args.output)}")
+
+
+def cmd_exam(args):
+    from codeshuffler.lib.batch import run_exam_batch
+
+    def report(done, total):
+        print(f"\rExported {done}/{total} exam versions", end="", file=sys.stderr, flush=True)
+
+    manifest_path = run_exam_batch(
+        args.exam,
+        args.output,
+        args.versions,
+        template_path=args.template,
+        workers=args.workers,
+        seed=args.seed,
+        only=args.only,
+        mode=args.mode,
+        answer_keys=not args.no_keys,
+        archive=args.zip,
+        progress=None if args.quiet else report,
+    )
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Manifest written to {manifest_path}")
+
+
+def cmd_grade(args):
+    from codeshuffler.lib.grading import grade_files
+
+    students_path, items_path = grade_files(
+        args.manifest, args.responses, args.output, snippet_dir=args.snippets
+    )
+    print(f"Student scores written to {students_path}")
+    print(f"Item scores written to {items_path}")
+
+
+def cmd_analyze(args):
+    from codeshuffler.lib.analysis import analyze_files
+
+    if len(args.files) % 2:
+        raise ValueError("Pass the files as manifest/responses pairs.")
+    pairs = list(zip(args.files[::2], args.files[1::2]))
+    items_path, options_path = analyze_files(pairs, args.output)
+    print(f"Item analysis written to {items_path}")
+    print(f"Distractor analysis written to {options_path}")
+
+
+def cmd_sheet(args):
+    from codeshuffler.lib.omr import SheetLayout, render_answer_sheet
+
+    layout = SheetLayout(args.questions, args.choices, args.id_digits, args.version_digits)
+    render_answer_sheet(layout, title=args.title).save(args.output)
+    print(f"Answer sheet written to {args.output}")
+
+
+def cmd_scan(args):
+    from codeshuffler.lib.omr import SheetLayout, scan_folder
+
+    def report(done, total):
+        print(f"\rRead {done}/{total} sheets", end="", file=sys.stderr, flush=True)
+
+    layout = SheetLayout(args.questions, args.choices, args.id_digits, args.version_digits)
+    problems = scan_folder(
+        args.scans,
+        layout,
+        args.output,
+        workers=args.workers,
+        progress=None if args.quiet else report,
+    )
+    if not args.quiet:
+        print(file=sys.stderr)
+    for path, problem in problems:
+        print(f"Check {os.path.basename(path)}: {problem}", file=sys.stderr)
+    print(f"Responses written to {args.output}")
+
+
+def _add_sheet_layout_arguments(parser):
+    parser.add_argument("--questions", type=int, required=True, help="questions on the sheet")
+    parser.add_argument("--choices", type=int, default=5, help="bubbles per question (a-g)")
+    parser.add_argument("--id-digits", type=int, default=8, help="digits of the student id")
+    parser.add_argument("--version-digits", type=int, default=3, help="digits of the version")
+
+
+def _version_ids(value):
+    return [int(x) for x in value.split(",")]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m codeshuffler",
+        description="Headless CodeShuffler tools (the GUI is started with main.py).",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch = subparsers.add_parser(
+        "batch", help="generate shuffled code questions for many exam versions"
+    )
+    batch.add_argument("snippets", help="directory containing the code snippets")
+    batch.add_argument("versions", type=int, help="number of exam versions to generate")
+    batch.add_argument("-o", "--output", default="codeshuffler_batch", help="output directory")
+    batch.add_argument("-j", "--workers", type=int, default=None, help="worker processes")
+    batch.add_argument("--choices", type=int, default=None, help="choices per question")
+    batch.add_argument(
+        "--fixed-lines", type=int, default=None, help="leading lines kept the same in each choice"
+    )
+    batch.add_argument(
+        "--seed", type=int, default=None, help="master seed; version k is reproducible from it"
+    )
+    batch.add_argument(
+        "--only",
+        type=_version_ids,
+        default=None,
+        help="comma-separated version ids to (re)generate, e.g. 17,42",
+    )
+    batch.add_argument(
+        "--renderer",
+        choices=["atlas", "pillow"],
+        default="atlas",
+        help="glyph-atlas compositing (default) or plain Pillow text drawing",
+    )
+    batch.add_argument(
+        "--manifest",
+        choices=["both", "json", "binary"],
+        default="both",
+        help="write manifest.json, the compact manifest.bin, or both (default)",
+    )
+    batch.add_argument(
+        "--mix",
+        default=None,
+        help="wrong choices drawn from each snippet's distractor pool, e.g. hard=3,easy=1 "
+        "(buckets: hard, medium, easy, partial, random, any)",
+    )
+    batch.add_argument("-q", "--quiet", action="store_true", help="do not report progress")
+    batch.set_defaults(func=cmd_batch)
+
+    verify = subparsers.add_parser(
+        "verify", help="run each snippet's distractors on its test cases to flag correct ones"
+    )
+    verify.add_argument(
+        "snippets", help="directory of code snippets with <snippet>.tests.json test cases"
+    )
+    verify.add_argument("-o", "--output", default="verify_report.json", help="report to write")
+    verify.add_argument("-j", "--workers", type=int, default=None, help="worker processes")
+    verify.add_argument(
+        "--fixed-lines", type=int, default=None, help="leading lines kept the same in each choice"
+    )
+    verify.add_argument(
+        "--cpu-limit", type=float, default=0.25, help="CPU seconds per test case and distractor"
+    )
+    verify.add_argument(
+        "--wall-limit", type=float, default=1.0, help="wall-clock seconds per test case"
+    )
+    verify.add_argument("-q", "--quiet", action="store_true", help="do not report progress")
+    verify.set_defaults(func=cmd_verify)
+
+    exam = subparsers.add_parser(
+        "exam", help="export shuffled versions of a .docx exam, with answer keys"
+    )
+    exam.add_argument("exam", help="the .docx exam to shuffle")
+    exam.add_argument("versions", type=int, help="number of exam versions to export")
+    exam.add_argument("-o", "--output", default="codeshuffler_exams", help="output directory")
+    exam.add_argument("-j", "--workers", type=int, default=None, help="worker processes")
+    exam.add_argument("--template", default=None, help="template .docx for the exported exams")
+    exam.add_argument(
+        "--mode",
+        choices=["both", "questions", "answers"],
+        default="both",
+        help="shuffle questions and answers (default), questions only or answers only",
+    )
+    exam.add_argument(
+        "--seed", type=int, default=None, help="master seed; version k is reproducible from it"
+    )
+    exam.add_argument(
+        "--only",
+        type=_version_ids,
+        default=None,
+        help="comma-separated version ids to (re)export, e.g. 17,42",
+    )
+    exam.add_argument("--no-keys", action="store_true", help="do not export answer keys")
+    exam.add_argument("--zip", action="store_true", help="write all versions into one exams.zip")
+    exam.add_argument("-q", "--quiet", action="store_true", help="do not report progress")
+    exam.set_defaults(func=cmd_exam)
+
+    key = subparsers.add_parser("key", help="print versions from a binary manifest.bin")
+    key.add_argument("manifest", help="manifest.bin written by the batch command")
+    key.add_argument("versions", type=_version_ids, help="comma-separated version ids, e.g. 17,42")
+    key.set_defaults(func=cmd_key)
+
+    grade = subparsers.add_parser(
+        "grade", help="score student responses against a batch or exam manifest"
+    )
+    grade.add_argument(
+        "manifest", help="manifest.json, manifest.bin or exam_manifest.json of the versions"
+    )
+    grade.add_argument(
+        "responses",
+        help="CSV with student_id, version and one answer letter per question position",
+    )
+    grade.add_argument("-o", "--output", default="codeshuffler_grades", help="output directory")
+    grade.add_argument(
+        "--snippets",
+        default=None,
+        help="snippet directory; choices that order its lines in another valid way get full credit",
+    )
+    grade.set_defaults(func=cmd_grade)
+
+    analyze = subparsers.add_parser(
+        "analyze", help="item difficulty, discrimination and distractor statistics"
+    )
+    analyze.add_argument(
+        "files",
+        nargs="+",
+        metavar="MANIFEST RESPONSES",
+        help="one or more manifest/responses pairs (e.g. one per semester)",
+    )
+    analyze.add_argument("-o", "--output", default="codeshuffler_analysis", help="output directory")
+    analyze.set_defaults(func=cmd_analyze)
+
+    sheet = subparsers.add_parser("sheet", help="draw a blank bubble answer sheet to print")
+    _add_sheet_layout_arguments(sheet)
+    sheet.add_argument("-o", "--output", default="answer_sheet.png", help="output image")
+    sheet.add_argument("--title", default="Answer Sheet", help="title printed on the sheet")
+    sheet.set_defaults(func=cmd_sheet)
+
+    scan = subparsers.add_parser(
+        "scan", help="read a folder of scanned answer sheets into a responses CSV"
+    )
+    scan.add_argument("scans", help="directory of scanned sheet images")
+    _add_sheet_layout_arguments(scan)
+    scan.add_argument("-o", "--output", default="responses.csv", help="responses CSV to write")
+    scan.add_argument("-j", "--workers", type=int, default=None, help="worker processes")
+    scan.add_argument("-q", "--quiet", action="store_true", help="do not report progress")
+    scan.set_defaults(func=cmd_scan)
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        parser.print_help()
+        return 1
+    try:
+        args.func(args)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,80 @@
+import functools
 import re
 
 from PyQt5.QtGui import QColor, QFont, QSyntaxHighlighter, QTextCharFormat
 
+PYTHON_KEYWORDS = "def|class|import|from|return|if|else|elif|for|while|try|except|as|with|lambda|yield|pass|break|continue|in|is|and|or|not|None|True|False"
+CPP_KEYWORDS = "int|float|double|char|void|if|else|while|for|return|class|public|private|protected|include|using|namespace|new|delete|this"
+JS_KEYWORDS = "function|var|let|const|if|else|for|while|return|class|extends|new|import|export|from|try|catch|await|async"
+JAVA_KEYWORDS = "class|public|private|protected|void|int|float|double|new|this|if|else|while|for|try|catch|return|import|package|static|final|extends|implements"
+
+LANGUAGE_KEYWORDS = {
+    "python": PYTHON_KEYWORDS,
+    "cpp": CPP_KEYWORDS,
+    "c++": CPP_KEYWORDS,
+    "js": JS_KEYWORDS,
+    "javascript": JS_KEYWORDS,
+    "java": JAVA_KEYWORDS,
+}
+
+# block states carried from one line to the next
+NORMAL = 0
+IN_COMMENT = 1
+IN_SINGLE_DOCSTRING = 2
+IN_DOUBLE_DOCSTRING = 3
+
+# what closes each multi-line state, and the state each opener starts
+CLOSERS = {IN_COMMENT: "*/", IN_SINGLE_DOCSTRING: "'''", IN_DOUBLE_DOCSTRING: '"""'}
+OPENERS = {"/*": IN_COMMENT, "'''": IN_SINGLE_DOCSTRING, '"""': IN_DOUBLE_DOCSTRING}
+
+
+@functools.lru_cache(maxsize=None)
+def tokenizer(language: str):
+    """One alternation of named groups per language, tried left to right at each offset.
+
+    Strings and comments come first so keywords inside them are left alone, and class and
+    function declarations come before keywords so ``class Foo`` is styled as a whole. The
+    leading lookahead lists every character a token can start with, which lets the regex
+    engine skip other offsets without trying each alternative there.
+    """
+    python = language not in LANGUAGE_KEYWORDS or language == "python"
+    keywords = LANGUAGE_KEYWORDS.get(language, PYTHON_KEYWORDS)
+    if python:
+        opener = r"'''|\"\"\""
+        comment = r"\#.*"
+    else:
+        opener = r"/\*"
+        comment = r"//.*"
+    starts = {word[0] for word in keywords.split("|")} | set("cdf0123456789\"'#/")
+    return re.compile(
+        rf"""
+        (?=[{re.escape("".join(sorted(starts)))}])
+        (?:
+        (?P<open>{opener})
+        | (?P<comment>{comment})
+        | (?P<string>"(?:[^"\\]|\\.)*"?|'(?:[^'\\]|\\.)*'?)
+        | (?P<cls>\bclass\s+\w+)
+        | (?P<func>\bdef\s+\w+|\bfunction\s+\w+)
+        | (?P<keyword>\b(?:{keywords})\b)
+        | (?P<number>\b\d+\b)
+        )
+        """,
+        re.VERBOSE,
+    )
+
 
 class GenericHighlighter(QSyntaxHighlighter):
-    """Lightweight syntax highlighter that handles Python, C++, Java, and JS."""
+    """Lightweight syntax highlighter that handles Python, C++, Java, and JS.
 
-    def __init__(self, document, language="python", *, dark_mode: bool = False):
-        super().__init__(document)
+    Each line is scanned once with the language's combined tokenizer. Open block comments
+    and docstrings are carried to the next line as block state, so Qt only re-highlights
+    the following lines when that state actually changes.
+    """
 
+    def __init__(self, document, language="python", *, dark_mode: bool = False):
         self.language = language.lower()
         self.dark_mode = dark_mode
-        self.rules = []
+        self.pattern = tokenizer(self.language)
 
         if self.dark_mode:
             keyword_color = QColor("#569CD6")
@@ -28,54 +91,72 @@ class GenericHighlighter(QSyntaxHighlighter):
             class_color = QColor("#267F99")
             func_color = QColor("#795E26")
 
-        python_keywords = r"\b(def|class|import|from|return|if|else|elif|for|while|try|except|as|with|lambda|yield|pass|break|continue|in|is|and|or|not|None|True|False)\b"
-        cpp_keywords = r"\b(int|float|double|char|void|if|else|while|for|return|class|public|private|protected|include|using|namespace|new|delete|this)\b"
-        js_keywords = r"\b(function|var|let|const|if|else|for|while|return|class|extends|new|import|export|from|try|catch|await|async)\b"
-        java_keywords = r"\b(class|public|private|protected|void|int|float|double|new|this|if|else|while|for|try|catch|return|import|package|static|final|extends|implements)\b"
-
-        lang_to_kw = {
-            "python": python_keywords,
-            "cpp": cpp_keywords,
-            "c++": cpp_keywords,
-            "js": js_keywords,
-            "javascript": js_keywords,
-            "java": java_keywords,
-        }
-
         kw_fmt = QTextCharFormat()
         kw_fmt.setForeground(keyword_color)
         kw_fmt.setFontWeight(QFont.Bold)
-        self.rules.append((re.compile(lang_to_kw.get(self.language, python_keywords)), kw_fmt))
 
         str_fmt = QTextCharFormat()
         str_fmt.setForeground(string_color)
-        self.rules.append((re.compile(r"(['\"]).*?\1"), str_fmt))
 
         num_fmt = QTextCharFormat()
         num_fmt.setForeground(number_color)
-        self.rules.append((re.compile(r"\b\d+\b"), num_fmt))
 
         com_fmt = QTextCharFormat()
         com_fmt.setForeground(comment_color)
         com_fmt.setFontItalic(True)
 
-        if self.language == "python":
-            self.rules.append((re.compile(r"#.*"), com_fmt))
-        else:
-            self.rules.append((re.compile(r"//.*"), com_fmt))
-            self.rules.append((re.compile(r"/\*.*\*/"), com_fmt))
-
         class_fmt = QTextCharFormat()
         class_fmt.setForeground(class_color)
         class_fmt.setFontWeight(QFont.Bold)
-        self.rules.append((re.compile(r"\bclass\s+\w+"), class_fmt))
 
         func_fmt = QTextCharFormat()
         func_fmt.setForeground(func_color)
-        self.rules.append((re.compile(r"\bdef\s+\w+|\bfunction\s+\w+"), func_fmt))
+
+        self.formats = {
+            "keyword": kw_fmt,
+            "string": str_fmt,
+            "number": num_fmt,
+            "comment": com_fmt,
+            "cls": class_fmt,
+            "func": func_fmt,
+        }
+        # block comments look like comments, docstrings like strings
+        self.state_formats = {
+            IN_COMMENT: com_fmt,
+            IN_SINGLE_DOCSTRING: str_fmt,
+            IN_DOUBLE_DOCSTRING: str_fmt,
+        }
+        # set up last: attaching to a document with text highlights it right away
+        super().__init__(document)
+
+    def _close(self, text: str, state: int, start: int, search_from: int):
+        # format from start up to and including the closer; returns where scanning resumes
+        end = text.find(CLOSERS[state], search_from)
+        if end < 0:
+            self.setFormat(start, len(text) - start, self.state_formats[state])
+            self.setCurrentBlockState(state)
+            return len(text)
+        end += len(CLOSERS[state])
+        self.setFormat(start, end - start, self.state_formats[state])
+        return end
 
     def highlightBlock(self, text: str):
-        for pattern, fmt in self.rules:
-            for match in pattern.finditer(text):
-                start, end = match.span()
-                self.setFormat(start, end - start, fmt)
+        self.setCurrentBlockState(NORMAL)
+        pos = 0
+        state = self.previousBlockState()
+        if state in CLOSERS:
+            pos = self._close(text, state, 0, 0)
+
+        search = self.pattern.search
+        formats = self.formats
+        while pos < len(text):
+            match = search(text, pos)
+            if match is None:
+                return
+            kind = match.lastgroup
+            if kind == "open":
+                pos = self._close(text, OPENERS[match.group()], match.start(), match.end())
+                continue
+            start, end = match.span()
+            self.setFormat(start, end - start, formats[kind])
+            pos = end
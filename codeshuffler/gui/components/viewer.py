@@ -1,4 +1,159 @@
-from PyQt5.QtWidgets import QSizePolicy, QTextBrowser, QVBoxLayout, QWidget
+from collections import OrderedDict
+from html import escape
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QRectF, QSize, Qt
+from PyQt5.QtGui import QColor, QPen, QTextDocument
+from PyQt5.QtWidgets import (
+    QLabel,
+    QListView,
+    QSizePolicy,
+    QStackedLayout,
+    QStyledItemDelegate,
+    QTextBrowser,
+    QVBoxLayout,
+    QWidget,
+)
+
+# the subset of the preview page styles that QTextDocument understands
+QUESTION_CSS = """
+.qnum { color: #2b6cb0; font-weight: bold; }
+.qidx { color: #666666; }
+p { margin: 0 0 6px 0; }
+.choices { margin: 0; }
+.choice { margin: 3px 0; }
+.code { background-color: #f0f0f0; font-family: monospace; }
+"""
+PANEL_MARGIN = 6
+PANEL_PADDING = 10
+PANEL_COLOR = QColor("#f6f6f6")
+BORDER_COLOR = QColor("#d0d0d0")
+DOCUMENT_CACHE_SIZE = 128
+# past this many changed rows a model reset is cheaper than one update per row
+RESET_THRESHOLD = 32
+
+
+class QuestionListModel(QAbstractListModel):
+    """One row per question fragment; an update only signals the rows that changed."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self._rows[index.row()]
+        return None
+
+    def set_rows(self, rows):
+        rows = list(rows)
+        if len(rows) != len(self._rows):
+            self.beginResetModel()
+            self._rows = rows
+            self.endResetModel()
+            return
+        # fragments come from the preview cache, so unchanged rows are the same objects
+        changed = [
+            row
+            for row, (before, after) in enumerate(zip(self._rows, rows))
+            if before is not after and before != after
+        ]
+        if len(changed) > RESET_THRESHOLD:
+            self.beginResetModel()
+            self._rows = rows
+            self.endResetModel()
+            return
+        self._rows = rows
+        for row in changed:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
+
+
+class QuestionDelegate(QStyledItemDelegate):
+    """Paints question fragments through QTextDocument, laying out only what is painted.
+
+    Rows that were never painted get a height estimated from their line count. The real
+    height replaces it the first time a row scrolls into view.
+    """
+
+    def __init__(self, view):
+        super().__init__(view)
+        self._view = view
+        self._documents = OrderedDict()
+        self._heights = {}
+        self._width = 0
+
+    def _text_width(self):
+        width = self._view.viewport().width() - 2 * (PANEL_MARGIN + PANEL_PADDING)
+        if width != self._width:
+            self._width = width
+            self._documents.clear()
+            self._heights.clear()
+        return max(width, 50)
+
+    def document(self, fragment, font):
+        width = self._text_width()
+        doc = self._documents.get(fragment)
+        if doc is not None:
+            self._documents.move_to_end(fragment)
+            return doc
+        doc = QTextDocument()
+        doc.setDefaultFont(font)
+        doc.setDefaultStyleSheet(QUESTION_CSS)
+        doc.setHtml(fragment)
+        doc.setTextWidth(width)
+        self._documents[fragment] = doc
+        if len(self._documents) > DOCUMENT_CACHE_SIZE:
+            self._documents.popitem(last=False)
+        return doc
+
+    def _estimate(self, fragment, option):
+        # the title, then paragraphs (every choice is one), line breaks and code lines
+        lines = 1 + fragment.count("<p>") + fragment.count("<br/>") + fragment.count("\n")
+        return lines * option.fontMetrics.lineSpacing() + 12
+
+    def sizeHint(self, option, index):
+        fragment = index.data()
+        self._text_width()
+        height = self._heights.get(fragment)
+        if height is None:
+            height = self._estimate(fragment, option)
+        return QSize(self._width, height + 2 * (PANEL_MARGIN + PANEL_PADDING))
+
+    def paint(self, painter, option, index):
+        fragment = index.data()
+        doc = self.document(fragment, option.font)
+        height = int(doc.size().height())
+        if self._heights.get(fragment) != height:
+            self._heights[fragment] = height
+            self.sizeHintChanged.emit(index)
+
+        panel = QRectF(option.rect).adjusted(
+            PANEL_MARGIN, PANEL_MARGIN, -PANEL_MARGIN, -PANEL_MARGIN
+        )
+        painter.save()
+        painter.setRenderHint(painter.Antialiasing)
+        painter.setPen(QPen(BORDER_COLOR))
+        painter.setBrush(PANEL_COLOR)
+        painter.drawRoundedRect(panel, 10, 10)
+        painter.translate(panel.left() + PANEL_PADDING, panel.top() + PANEL_PADDING)
+        doc.drawContents(painter, QRectF(0, 0, doc.textWidth(), height))
+        painter.restore()
+
+
+class QuestionListView(QListView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setVerticalScrollMode(QListView.ScrollPerPixel)
+        self.setResizeMode(QListView.Adjust)
+        self.setSelectionMode(QListView.NoSelection)
+        self.setFocusPolicy(Qt.NoFocus)
+        self.setStyleSheet("QListView { background: #ffffff; border: none; }")
+        self.list_model = QuestionListModel(self)
+        self.setModel(self.list_model)
+        self.setItemDelegate(QuestionDelegate(self))
 
 
 class HtmlPreviewWidget(QWidget):
@@ -36,7 +191,21 @@ class HtmlPreviewWidget(QWidget):
         self._text = text
         container_layout.addWidget(text)
 
-        root_layout.addWidget(container)
+        # paged mode: a header plus a list view that only lays out the visible questions
+        pages = QWidget(self)
+        pages_layout = QVBoxLayout(pages)
+        pages_layout.setContentsMargins(0, 0, 0, 0)
+        pages_layout.setSpacing(0)
+        self._header = QLabel(pages)
+        self._header.setStyleSheet("background: #ffffff; padding: 10px 12px 4px 12px;")
+        self._questions = QuestionListView(pages)
+        pages_layout.addWidget(self._header)
+        pages_layout.addWidget(self._questions)
+
+        self._stack = QStackedLayout()
+        self._stack.addWidget(container)
+        self._stack.addWidget(pages)
+        root_layout.addLayout(self._stack)
         self.setLayout(root_layout)
 
     def set_message(self, msg: str):
@@ -55,7 +224,14 @@ class HtmlPreviewWidget(QWidget):
         """
         self.set_html(html)
 
+    def set_questions(self, fragments, title: str = "Exam Preview", subtitle: str = ""):
+        # fragments come from render_question_fragments, one per question in display order
+        self._header.setText(f"<b style='font-size:13pt'>{escape(title)}</b>  {escape(subtitle)}")
+        self._questions.list_model.set_rows(fragments)
+        self._stack.setCurrentIndex(1)
+
     def set_html(self, html: str):
+        self._stack.setCurrentIndex(0)
         if self._web is not None:
             self._web.setHtml(html)
         elif self._text is not None:
@@ -1,14 +1,14 @@
 import os
 import sys
 
-from PyQt5.QtWidgets import QMainWindow, QMessageBox, QTabWidget
+from PyQt5.QtWidgets import QMainWindow, QMessageBox, QTabWidget, QWidget
 
 from codeshuffler.gui.components.settings import SettingsDialog
 from codeshuffler.gui.tabs.codeshuffler import CodeShufflerTab
-from codeshuffler.gui.tabs.examshuffler import ExamShufflerTab
 from codeshuffler.gui.tabs.menu import build_menu
 from codeshuffler.gui.utils.dragdrop import FileDropHandler
 from codeshuffler.gui.utils.styles import TAB_STYLE
+from codeshuffler.lib.inputcache import default_input_cache
 
 
 class MainWindow(QMainWindow):
@@ -27,11 +27,30 @@ class MainWindow(QMainWindow):
         self.code_tab = CodeShufflerTab()
         self.tabs.addTab(self.code_tab, "Code Shuffler")
 
-        # Exam Shuffler
-        self.exam_tab = ExamShufflerTab()
-        self.tabs.addTab(self.exam_tab, "Exam Shuffler")
+        # Exam Shuffler: built the first time it is opened, which also keeps python-docx
+        # and the preview widgets out of start-up
+        self.exam_tab = None
+        self.exam_tab_index = self.tabs.addTab(QWidget(), "Exam Shuffler")
+        self.tabs.currentChanged.connect(self.on_tab_changed)
         self.setAcceptDrops(True)
 
+    def on_tab_changed(self, index):
+        if index == self.exam_tab_index and self.exam_tab is None:
+            self.create_exam_tab()
+
+    def create_exam_tab(self):
+        from codeshuffler.gui.tabs.examshuffler import ExamShufflerTab
+
+        self.exam_tab = ExamShufflerTab()
+        placeholder = self.tabs.widget(self.exam_tab_index)
+        self.tabs.blockSignals(True)
+        self.tabs.removeTab(self.exam_tab_index)
+        self.tabs.insertTab(self.exam_tab_index, self.exam_tab, "Exam Shuffler")
+        self.tabs.setCurrentIndex(self.exam_tab_index)
+        self.tabs.blockSignals(False)
+        placeholder.deleteLater()
+        return self.exam_tab
+
     def dragEnterEvent(self, e):
         active = self.tabs.currentWidget()
         if isinstance(active, FileDropHandler):
@@ -52,21 +71,16 @@ class MainWindow(QMainWindow):
         dialog.exec_()
 
     def clear_image_cache(self):
-        cache_folder = os.path.join(os.getcwd(), "codeshuffler", "gui", "cache", "inputs")
-
-        if not os.path.exists(cache_folder):
+        cache = default_input_cache()
+        if not os.path.exists(cache.directory):
             QMessageBox.information(self, "Clear Cache", "No image cache found.")
             return
 
-        deleted = 0
-        for filename in os.listdir(cache_folder):
-            try:
-                file_path = os.path.join(cache_folder, filename)
-                if os.path.isfile(file_path):
-                    os.remove(file_path)
-                    deleted += 1
-            except Exception as e:
-                QMessageBox.warning(self, "Error", f"Failed to delete {filename}: {e}")
+        try:
+            deleted = cache.clear()
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Failed to clear the cache: {e}")
+            return
 
         QMessageBox.information(self, "Cache Cleared", f"Deleted {deleted} cached images.")
 
@@ -1,5 +1,4 @@
 import os
-import random
 
 from PyQt5.QtCore import QSize
 from PyQt5.QtGui import QBrush, QColor, QIcon
@@ -28,21 +27,14 @@ from codeshuffler.gui.utils.styles import (
     LIGHT_DROP_AREA_HIGHLIGHT,
     LIGHT_TEXTEDIT,
 )
-from codeshuffler.lib.generator import (
-    gen_correct_answer,
-    gen_random_choices_wICinst,
-    generate_partials,
-    incorrect_instructions,
-    shuffle_sol,
-)
+from codeshuffler.gui.utils.workers import run_in_background
+from codeshuffler.lib.generator import gen_question
+from codeshuffler.lib.inputcache import default_input_cache
 from codeshuffler.lib.utils import download_image, resource_path
-from codeshuffler.models.codefile import CodeFile
 from codeshuffler.models.languages import language_from_extension
 from codeshuffler.settings import settings
 
-BASE_PATH = os.path.join(os.getcwd(), "codeshuffler", "gui", "cache")
 ICON_PATH = os.path.join("codeshuffler", "gui", "icons")
-os.makedirs(BASE_PATH, exist_ok=True)
 
 
 class CodeShufflerTab(QWidget, FileDropHandler):
@@ -51,6 +43,7 @@ class CodeShufflerTab(QWidget, FileDropHandler):
         self.current_file = None
         self.filename = None
         self.shuffled_question = None
+        self.worker = None
 
         self.init_ui()
         self.init_events()
@@ -116,29 +109,22 @@ class CodeShufflerTab(QWidget, FileDropHandler):
     def load_file(self, file_path):
         filename = os.path.basename(file_path)
         self.filename = filename
-        cache_path = os.path.join(BASE_PATH, "inputs")
-        save_path = os.path.join(cache_path, filename)
-        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        cache = default_input_cache()
         try:
-            with open(file_path, "rb") as src, open(save_path, "wb") as dst:
-                dst.write(src.read())
+            save_path = cache.store(file_path)
         except Exception as e:
             QMessageBox.critical(self, "Error", f": {e}")
             self.current_file = None
             return
-        self.current_file = CodeFile(save_path)
 
         try:
-            self.current_file.load()
+            self.current_file = cache.codefile(save_path, filename)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to parse file: {e}")
             self.current_file = None
             return
 
-        with open(save_path, "r", encoding="utf-8") as f:
-            code = f.read()
-
-        self.code_drop_area.setPlainText(code)
+        self.code_drop_area.setPlainText(self.current_file.text)
         ext = os.path.splitext(filename)[1]
         lang = language_from_extension(ext)
 
@@ -162,57 +148,53 @@ class CodeShufflerTab(QWidget, FileDropHandler):
             self.answer_choices.addTopLevelItem(top_item)
         self.answer_choices.resizeColumnToContents(0)
 
+    def start_job(self, label, fn, *args, **kwargs):
+        # one job at a time; buttons stay disabled until it has finished or been cancelled
+        if self.worker is not None:
+            return
+        self.shuffle_btn.setEnabled(False)
+        self.download_btn.setEnabled(False)
+        self.worker = run_in_background(
+            self, label, fn, *args, on_finished=self.job_finished, **kwargs
+        )
+
+    def job_finished(self):
+        self.worker = None
+        self.shuffle_btn.setEnabled(True)
+        self.download_btn.setEnabled(True)
+
     def shuffle_code(self):
         if not self.current_file:
             QMessageBox.warning(self, "No File", "Please upload a file first.")
             return
 
         file = self.current_file
-
-        correct_plus_wrong = incorrect_instructions(file.correct_sol, file.wrong_inst)
-        shuffled = shuffle_sol(correct_plus_wrong)
-
-        self.shuffled_question = shuffled
-        self.code_preview.setPlainText("\n".join(shuffled))
-
-        correct_answer, remain_lines = gen_correct_answer(file.correct_sol, shuffled)
-        partials = generate_partials(
-            len(file.wrong_inst_dict), shuffled, file.wrong_inst_dict, correct_answer
+        self.start_job(
+            "Shuffling code...",
+            gen_question,
+            file.correct_sol,
+            file.wrong_inst,
+            file.wrong_inst_dict,
+            settings.no_of_choices,
+            on_result=self.show_question,
+            on_error=self.show_shuffle_error,
         )
 
-        try:
-            choices = gen_random_choices_wICinst(
-                correct_answer, settings.no_of_choices, remain_lines
-            )
-        except ValueError as e:
-            QMessageBox.critical(self, "Invalid Setting", str(e))
-            return
+    def show_shuffle_error(self, error):
+        title = "Invalid Setting" if isinstance(error, ValueError) else "Error"
+        QMessageBox.critical(self, title, str(error))
 
-        candidate_indices = [i for i, ch in enumerate(choices) if ch != correct_answer]
-        num_replacements = min(len(partials), len(candidate_indices))
-
-        if num_replacements > 0:
-            replace_idx = random.sample(candidate_indices, num_replacements)
-            for part, idx in zip(partials[:num_replacements], replace_idx):
-                choices[idx] = part
+    def show_question(self, result):
+        question, correct_answer, scored = result
+        self.shuffled_question = question
+        self.code_preview.setPlainText("\n".join(question.render()))
 
         self.answer_choices.clear()
         letters = ["a", "b", "c", "d", "e", "f", "g"]
 
-        scored = []
-        for ch in choices:
-            if ch == correct_answer:
-                score = 1.0
-            elif ch in partials:
-                idx = partials.index(ch)
-                score = max(0, 1 - 0.25 * (idx + 1))
-            else:
-                score = 0.0
-            scored.append((ch, score))
-
         scored.sort(key=lambda x: x[1], reverse=True)
 
-        for i, (choice, score) in enumerate(scored):
+        for i, (choice, score, _) in enumerate(scored):
             sequence_text = f"{letters[i]}) {choice}"
             score_text = f"{score:.2f}"
 
@@ -248,10 +230,7 @@ class CodeShufflerTab(QWidget, FileDropHandler):
             QMessageBox.warning(self, "No Code", "No shuffled code to download.")
             return
 
-        lines = []
-        for el in range(len(self.shuffled_question)):
-            left, content = self.shuffled_question[el].split(")", 1)
-            lines.append(left + ") " + content.strip())
+        lines = self.shuffled_question.render(strip=True)
 
         file_path, _ = QFileDialog.getSaveFileName(
             self, "Save as PNG", "shuffled_code.png", "PNG Files (*.png)"
@@ -259,11 +238,15 @@ class CodeShufflerTab(QWidget, FileDropHandler):
         if not file_path:
             return
 
-        try:
-            download_image(lines, file_path)
-            QMessageBox.information(self, "Saved", f"Shuffled code saved to {file_path}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        self.start_job(
+            "Saving PNG...",
+            download_image,
+            lines,
+            file_path,
+            on_result=lambda _: QMessageBox.information(
+                self, "Saved", f"Shuffled code saved to {file_path}"
+            ),
+        )
 
     def open_settings(self):
         dialog = SettingsDialog(self)
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import io
 import os
 
 from PyQt5.QtGui import QIcon
@@ -23,23 +24,70 @@ from codeshuffler.gui.components.section import Section
 from codeshuffler.gui.components.viewer import HtmlPreviewWidget
 from codeshuffler.gui.utils.dragdrop import FileDropHandler
 from codeshuffler.gui.utils.styles import LIGHT_DROP_AREA, LIGHT_DROP_AREA_HIGHLIGHT, LIGHT_TEXTEDIT
-from codeshuffler.lib.parser import create_exam_docx, parse_exam, shuffle_answers, shuffle_questions
-from codeshuffler.lib.preview import PreviewError, render_exam_html
+from codeshuffler.gui.utils.workers import run_in_background
+from codeshuffler.lib.parser import (
+    ExamDocxExporter,
+    parse_exam_stream,
+    shuffle_answers,
+    shuffle_questions,
+)
+from codeshuffler.lib.preview import PreviewError, render_question_fragments
 from codeshuffler.lib.utils import resource_path
+from codeshuffler.settings import settings
 
 ICON_PATH = os.path.join("codeshuffler", "gui", "icons")
 
 
+# jobs run on the worker pool; they only touch their arguments, never the widgets
+
+
+def preview_fragments(exam_dict):
+    # (fragments, error message) so a preview problem is reported without failing the job
+    try:
+        return render_question_fragments(exam_dict), None
+    except PreviewError as e:
+        return None, str(e)
+
+
+def load_exam_job(file_path):
+    exam_dict = parse_exam_stream(file_path)
+    return (exam_dict, *preview_fragments(exam_dict))
+
+
+def shuffle_exam_job(exam_dict, mode):
+    if mode == "questions":
+        exam_dict = shuffle_questions(exam_dict)
+    elif mode == "answers":
+        exam_dict = shuffle_answers(exam_dict)
+    else:
+        exam_dict = shuffle_answers(shuffle_questions(exam_dict))
+    return (exam_dict, *preview_fragments(exam_dict))
+
+
+def save_exam_job(template_path, exam_dict, save_path, answer_key, progress):
+    # built in memory first, so cancelling never leaves a half-written file behind
+    progress(0, 3)
+    exporter = ExamDocxExporter(template_path)
+    progress(1, 3)
+    buffer = io.BytesIO()
+    exporter.write(exam_dict, buffer, answer_key=answer_key)
+    progress(2, 3)
+    with open(save_path, "wb") as f:
+        f.write(buffer.getvalue())
+    progress(3, 3)
+
+
 class ExamShufflerTab(QWidget, FileDropHandler):
     def __init__(self, parent=None):
         super().__init__(parent)
 
         self.exam_dict = None
         self.exam_file_path = None
-        self.template_path = "codeshuffler/codefiles/templates/CodeShufflersTemplate.docx"
+        self.template_path = settings.exam_template
 
         self.shuffle_mode = "both"
         self.download_mode = "exam"
+        self.worker = None
 
         self.init_ui()
         self.init_events()
@@ -107,7 +155,6 @@ class ExamShufflerTab(QWidget, FileDropHandler):
         self.shuffle_btn.setFixedHeight(default_height)
 
         self.shuffle_btn.setMenu(self.shuffle_menu)
-        self.shuffle_btn.clicked.connect(self.shuffle_exam)
         self.download_btn = QToolButton()
         self.download_btn.setPopupMode(QToolButton.MenuButtonPopup)
 
@@ -146,7 +193,6 @@ class ExamShufflerTab(QWidget, FileDropHandler):
         self.act_dl_exam.setChecked(True)
 
         self.download_btn.setMenu(self.download_menu)
-        self.download_btn.clicked.connect(self.save_exam)
 
         left.addWidget(self.shuffle_btn)
         right.addWidget(self.download_btn)
@@ -171,23 +217,37 @@ class ExamShufflerTab(QWidget, FileDropHandler):
     def on_drag_leave(self):
         self.exam_drop_area.setStyleSheet(LIGHT_DROP_AREA)
 
+    def start_job(self, label, fn, *args, **kwargs):
+        # one job at a time; buttons stay disabled until it has finished or been cancelled
+        if self.worker is not None:
+            return False
+        self.shuffle_btn.setEnabled(False)
+        self.download_btn.setEnabled(False)
+        self.worker = run_in_background(
+            self, label, fn, *args, on_finished=self.job_finished, **kwargs
+        )
+        return True
+
+    def job_finished(self):
+        self.worker = None
+        self.shuffle_btn.setEnabled(True)
+        self.download_btn.setEnabled(True)
+
     def handle_file_drop(self, file_path: str):
         if not file_path.lower().endswith(".docx"):
             QMessageBox.warning(self, "Invalid File", "Please upload a .docx exam.")
             return
 
-        try:
+        def loaded(result):
+            self.exam_dict, fragments, error = result
             self.exam_file_path = file_path
-            self.exam_dict = parse_exam(file_path)
-
             self.exam_drop_area.setPlainText(
                 f"{file_path}\n\n{len(self.exam_dict)} questions loaded."
             )
             self.shuffle_mode = "both"
-            self.update_preview()
+            self.show_preview(fragments, error)
 
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        self.start_job("Reading exam...", load_exam_job, file_path, on_result=loaded)
 
     def set_shuffle_mode(self, mode: str):
         self.shuffle_mode = mode
@@ -197,14 +257,17 @@ class ExamShufflerTab(QWidget, FileDropHandler):
             QMessageBox.warning(self, "No Exam", "Please upload an exam first.")
             return
 
-        if self.shuffle_mode == "questions":
-            self.exam_dict = shuffle_questions(self.exam_dict)
-        elif self.shuffle_mode == "answers":
-            self.exam_dict = shuffle_answers(self.exam_dict)
-        else:
-            self.exam_dict = shuffle_answers(shuffle_questions(self.exam_dict))
+        def shuffled(result):
+            self.exam_dict, fragments, error = result
+            self.show_preview(fragments, error)
 
-        self.update_preview()
+        self.start_job(
+            "Shuffling exam...",
+            shuffle_exam_job,
+            self.exam_dict,
+            self.shuffle_mode,
+            on_result=shuffled,
+        )
 
     def set_download_mode(self, mode: str):
         self.download_mode = mode
@@ -223,26 +286,28 @@ class ExamShufflerTab(QWidget, FileDropHandler):
         if not save_path:
             return
 
-        create_exam_docx(
+        self.start_job(
+            "Saving exam...",
+            save_exam_job,
             self.template_path,
             self.exam_dict,
             save_path,
-            answer_key=(self.download_mode == "exam+key"),
+            self.download_mode == "exam+key",
+            progress=True,
+            on_result=lambda _: QMessageBox.information(self, "Saved", f"Saved to:\n{save_path}"),
         )
 
-        QMessageBox.information(self, "Saved", f"Saved to:\n{save_path}")
-
     def update_preview(self):
         if not self.exam_dict:
             self.preview.set_message("Load an exam to preview it.")
             return
-        try:
-            html = render_exam_html(
-                self.exam_dict,
-                title="Exam Preview",
-                subtitle=f"{len(self.exam_dict)} questions",
-            ).html
-            self.preview.set_html(html)
-        except PreviewError as e:
+        self.show_preview(*preview_fragments(self.exam_dict))
+
+    def show_preview(self, fragments, error):
+        if error is None:
+            self.preview.set_questions(
+                fragments, title="Exam Preview", subtitle=f"{len(fragments)} questions"
+            )
+        else:
             self.preview.set_message("Preview unavailable.")
-            QMessageBox.warning(self, "Preview Error", str(e))
+            QMessageBox.warning(self, "Preview Error", error)
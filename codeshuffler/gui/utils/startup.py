@@ -0,0 +1,51 @@
+import sys
+import time
+
+from PyQt5.QtCore import QEvent, QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+
+
+class StartupTimer(QObject):
+    """Records named points of the start-up and reports them once the window first paints.
+
+    ``main.py --startup-timing`` uses it to print how long imports, building the window and
+    the first paint took, then quits.
+    """
+
+    def __init__(self, started: float):
+        super().__init__()
+        self.started = started
+        self.marks = []
+
+    def mark(self, name: str):
+        self.marks.append((name, time.perf_counter()))
+
+    def watch_first_paint(self, widget, quit_after=True):
+        self._quit_after = quit_after
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Paint:
+            obj.removeEventFilter(self)
+            self.mark("first paint")
+            # report after the paint has finished, not from inside it
+            QTimer.singleShot(0, self.finish)
+        return False
+
+    def finish(self):
+        self.report()
+        if self._quit_after:
+            QApplication.instance().quit()
+
+    def report(self, stream=None):
+        stream = stream or sys.stderr
+        print("Startup timings (ms since launch, ms for the step):", file=stream)
+        previous = self.started
+        for name, at in self.marks:
+            print(
+                f"  {name:<16}{(at - self.started) * 1000:8.1f}{(at - previous) * 1000:8.1f}",
+                file=stream,
+            )
+            previous = at
+        loaded = sorted(m for m in ("docx", "docx2python", "PIL") if m in sys.modules)
+        print(f"  heavy modules loaded: {', '.join(loaded) or 'none'}", file=stream)
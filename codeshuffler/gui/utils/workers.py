@@ -0,0 +1,100 @@
+import threading
+
+from PyQt5.QtCore import QObject, QRunnable, Qt, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import QMessageBox, QProgressDialog
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(int, int)
+    result = pyqtSignal(object)
+    error = pyqtSignal(object)
+    cancelled = pyqtSignal()
+    finished = pyqtSignal()
+
+
+class Worker(QRunnable):
+    """Runs ``fn(*args, **kwargs)`` on a QThreadPool thread and reports back through signals.
+
+    With ``progress=True`` the function also gets a ``progress(done, total)`` callback, like
+    the batch helpers in lib. Once ``cancel()`` has been called that callback raises
+    JobCancelled, and a result that still arrives is dropped instead of delivered.
+    """
+
+    def __init__(self, fn, *args, progress=False, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        if progress:
+            self.kwargs["progress"] = self.report
+        self.signals = WorkerSignals()
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def report(self, done, total):
+        if self.cancelled:
+            raise JobCancelled()
+        self.signals.progress.emit(done, total)
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except JobCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            if self.cancelled:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.error.emit(e)
+        else:
+            if self.cancelled:
+                self.signals.cancelled.emit()
+            else:
+                self.signals.result.emit(result)
+        finally:
+            self.signals.finished.emit()
+
+
+def run_in_background(
+    parent, label, fn, *args, on_result, on_error=None, on_finished=None, progress=False, **kwargs
+):
+    # the progress dialog only shows up when the job takes longer than half a second
+    worker = Worker(fn, *args, progress=progress, **kwargs)
+    dialog = QProgressDialog(label, "Cancel", 0, 0, parent)
+    dialog.setWindowTitle("CodeShuffler")
+    dialog.setWindowModality(Qt.WindowModal)
+    dialog.setMinimumDuration(500)
+    dialog.setAutoReset(False)
+    dialog.setAutoClose(False)
+    dialog.canceled.connect(worker.cancel)
+
+    def show_progress(done, total):
+        dialog.setMaximum(total)
+        dialog.setValue(done)
+
+    def show_error(error):
+        QMessageBox.critical(parent, "Error", str(error))
+
+    def finish():
+        dialog.canceled.disconnect(worker.cancel)
+        dialog.close()
+        dialog.deleteLater()
+        if on_finished is not None:
+            on_finished()
+
+    worker.signals.progress.connect(show_progress)
+    worker.signals.result.connect(on_result)
+    worker.signals.error.connect(on_error or show_error)
+    worker.signals.finished.connect(finish)
+    QThreadPool.globalInstance().start(worker)
+    return worker
@@ -0,0 +1,183 @@
+import csv
+import os
+
+import numpy as np
+
+from codeshuffler.lib.grading import LETTERS, AnswerKey, grade, load_manifest, read_responses
+
+ITEM_ANALYSIS_CSV = "item_analysis.csv"
+DISTRACTOR_ANALYSIS_CSV = "distractor_analysis.csv"
+
+
+def choice_option(choice):
+    # (option, kind, swap) naming a choice the same way in every version
+    if "choice" in choice:
+        # exam questions keep their original choices, only the letters move
+        kind = "correct" if choice["score"] == 1.0 else "distractor"
+        return chr(97 + choice["choice"]), kind, None
+    if choice["score"] == 1.0:
+        return "correct", "correct", None
+    swap = choice.get("swap")
+    if swap is not None:
+        return f"partial: {swap}", "partial", swap
+    return "random", "random", None
+
+
+def choice_labels(manifest, key: AnswerKey):
+    """Label every (version row, position, letter) of the key with a shared option id.
+
+    Returns ``(labels, options)`` where ``labels[v, p, c]`` indexes ``options``, a list of
+    ``(item, option, kind, swap)`` tuples, and is -1 where the version has no such choice.
+    """
+    labels = np.full(key.scores.shape, -1, dtype=np.int64)
+    options = {}
+    for row, version in enumerate(manifest["versions"]):
+        for pos, item in enumerate(version["items"]):
+            for choice in item["choices"]:
+                option = (str(item["item"]), *choice_option(choice))
+                label = options.setdefault(option, len(options))
+                labels[row, pos, LETTERS.index(choice["letter"])] = label
+    return labels, list(options)
+
+
+def response_arrays(manifest, versions, letters):
+    """Flatten one graded administration into per-response arrays.
+
+    Every answered-or-omitted position becomes one entry; ``rest`` is the student's total
+    without that item, which is what corrected point-biserials correlate against.
+    """
+    key = AnswerKey.from_manifest(manifest)
+    labels, options = choice_labels(manifest, key)
+    scores, items, rows = grade(key, versions, letters)
+    positions = np.arange(letters.shape[1])
+    answered = letters >= 0
+    max_scores = key.max_scores[rows, : letters.shape[1]]
+    valid = items >= 0
+
+    rest = scores.sum(axis=1)[:, None] - scores
+    selected = np.where(
+        answered, labels[rows[:, None], positions[None, :], np.where(answered, letters, 0)], -1
+    )
+    offered = labels[rows[:, None], positions[None, :], :][valid]
+    return {
+        "item_ids": key.item_ids,
+        "options": options,
+        "item": items[valid],
+        "score": scores[valid],
+        "max": max_scores[valid],
+        "full": ((scores >= max_scores) & (max_scores > 0) & answered)[valid],
+        "omitted": ~answered[valid],
+        "rest": rest[valid],
+        "selected": selected[valid],
+        "offered": offered[offered >= 0],
+    }
+
+
+def _relabel(local, mapping):
+    # map local ids (with -1 for none) to global ids through a lookup array
+    lookup = np.append(np.asarray(mapping, dtype=np.int64), -1)
+    return lookup[local]
+
+
+def combine(parts):
+    # merge administrations, matching items and options by name
+    item_ids = {}
+    options = {}
+    merged = {name: [] for name in parts[0] if name not in ("item_ids", "options")}
+    for part in parts:
+        item_map = [item_ids.setdefault(i, len(item_ids)) for i in part["item_ids"]]
+        option_map = [options.setdefault(o, len(options)) for o in part["options"]]
+        for name, values in part.items():
+            if name in ("item", "item_ids", "options"):
+                continue
+            if name in ("selected", "offered"):
+                values = _relabel(values, option_map)
+            merged[name].append(values)
+        merged["item"].append(_relabel(part["item"], item_map))
+    arrays = {name: np.concatenate(values) for name, values in merged.items()}
+    return list(item_ids), list(options), arrays
+
+
+def item_statistics(n_items, arrays):
+    """Difficulty and discrimination for every item as grouped sums over the responses."""
+    item = arrays["item"]
+
+    def total(weights=None):
+        return np.bincount(item, weights=weights, minlength=n_items)
+
+    n = total()
+    x = arrays["full"].astype(np.float64)
+    y = arrays["rest"].astype(np.float64)
+    sx, sy, sxy, sxx, syy = total(x), total(y), total(x * y), total(x * x), total(y * y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        denom = np.sqrt((n * sxx - sx * sx) * (n * syy - sy * sy))
+        return {
+            "responses": n,
+            "mean_score": total(arrays["score"]) / total(arrays["max"]),
+            "p_value": sx / n,
+            "point_biserial": np.where(denom > 0, (n * sxy - sx * sy) / denom, np.nan),
+            "omitted_rate": total(arrays["omitted"]) / n,
+        }
+
+
+def option_statistics(n_options, arrays):
+    picked = arrays["selected"] >= 0
+    selected_ids = arrays["selected"][picked]
+    offered = np.bincount(arrays["offered"], minlength=n_options)
+    selected = np.bincount(selected_ids, minlength=n_options)
+    rest = np.bincount(selected_ids, weights=arrays["rest"][picked], minlength=n_options)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return {
+            "offered": offered,
+            "selected": selected,
+            "selection_rate": selected / offered,
+            "mean_rest_score": rest / selected,
+        }
+
+
+def _fmt(value):
+    return "" if np.isnan(value) else f"{value:.4f}"
+
+
+def analyze_files(pairs, out_dir):
+    """Item and distractor analysis over one or more (manifest, responses) pairs."""
+    parts = []
+    for manifest_path, responses_path in pairs:
+        student_ids, versions, letters = read_responses(responses_path)
+        if not student_ids:
+            raise ValueError(f"No responses found in {responses_path}.")
+        parts.append(response_arrays(load_manifest(manifest_path), versions, letters))
+    item_ids, options, arrays = combine(parts)
+    items = item_statistics(len(item_ids), arrays)
+    choices = option_statistics(len(options), arrays)
+
+    os.makedirs(out_dir, exist_ok=True)
+    items_path = os.path.join(out_dir, ITEM_ANALYSIS_CSV)
+    with open(items_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["item", *items])
+        for i, item_id in enumerate(item_ids):
+            responses = int(items["responses"][i])
+            writer.writerow([item_id, responses, *(_fmt(items[k][i]) for k in list(items)[1:])])
+
+    options_path = os.path.join(out_dir, DISTRACTOR_ANALYSIS_CSV)
+    item_order = {item_id: i for i, item_id in enumerate(item_ids)}
+    order = sorted(range(len(options)), key=lambda i: (item_order[options[i][0]], i))
+    with open(options_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["item", "option", "kind", "swap", *choices])
+        for i in order:
+            item_id, option, kind, swap = options[i]
+            writer.writerow(
+                [
+                    item_id,
+                    option,
+                    kind,
+                    swap or "",
+                    int(choices["offered"][i]),
+                    int(choices["selected"][i]),
+                    _fmt(choices["selection_rate"][i]),
+                    _fmt(choices["mean_rest_score"][i]),
+                ]
+            )
+    return items_path, options_path
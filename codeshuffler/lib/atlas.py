@@ -0,0 +1,120 @@
+import functools
+
+import numpy as np
+from PIL import Image
+
+from codeshuffler.lib.utils import CodeRenderer
+
+PRINTABLE_ASCII = "".join(chr(i) for i in range(32, 127))
+
+
+class GlyphAtlasRenderer(CodeRenderer):
+    """CodeRenderer that composites pre-rasterised glyph tiles with NumPy.
+
+    Every printable ASCII glyph is rasterised once into a single atlas array and each image
+    is built by blending tiles into a preallocated buffer instead of shaping text through
+    Pillow. Characters outside the atlas get a tile the first time they are seen.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        masks = {}
+        for ch in PRINTABLE_ASCII:
+            masks[ch] = self._rasterise(ch)
+        self._build_atlas(masks)
+
+    def _rasterise(self, ch):
+        mask, (dx, dy) = self.font.getmask2(ch, "L", anchor="la")
+        width, height = mask.size
+        tile = np.frombuffer(bytes(mask), dtype=np.uint8).reshape(height, width)
+        return tile, dx, dy
+
+    def _build_atlas(self, masks):
+        # one (glyph, row, col) array; each tile is stored at its offset from the pen position
+        self.min_dx = min(dx for _, dx, _ in masks.values())
+        self.min_dy = min(dy for _, _, dy in masks.values())
+        cell_w = max(dx + t.shape[1] for t, dx, _ in masks.values()) - self.min_dx
+        cell_h = max(dy + t.shape[0] for t, _, dy in masks.values()) - self.min_dy
+        self.atlas = np.zeros((len(masks), cell_h, cell_w), dtype=np.uint8)
+        self.glyph_index = {}
+        for i, (ch, (tile, dx, dy)) in enumerate(masks.items()):
+            x, y = dx - self.min_dx, dy - self.min_dy
+            self.atlas[i, y : y + tile.shape[0], x : x + tile.shape[1]] = tile
+            self.glyph_index[ch] = i
+        # glyphs without ink (spaces) are skipped entirely when compositing
+        self.blank = {ch for ch, i in self.glyph_index.items() if not self.atlas[i].any()}
+
+    def _tile(self, ch):
+        idx = self.glyph_index.get(ch)
+        if idx is None:
+            tile, dx, dy = self._rasterise(ch)
+            if (
+                dx < self.min_dx
+                or dy < self.min_dy
+                or (
+                    dx - self.min_dx + tile.shape[1] > self.atlas.shape[2]
+                    or dy - self.min_dy + tile.shape[0] > self.atlas.shape[1]
+                )
+            ):
+                masks = {c: self._tile_mask(c) for c in self.glyph_index}
+                masks[ch] = (tile, dx, dy)
+                self._build_atlas(masks)
+            else:
+                cell = np.zeros(self.atlas.shape[1:], dtype=np.uint8)
+                x, y = dx - self.min_dx, dy - self.min_dy
+                cell[y : y + tile.shape[0], x : x + tile.shape[1]] = tile
+                self.atlas = np.concatenate([self.atlas, cell[None]])
+                self.glyph_index[ch] = len(self.atlas) - 1
+                if not tile.any():
+                    self.blank.add(ch)
+            idx = self.glyph_index[ch]
+        return self.atlas[idx]
+
+    def _tile_mask(self, ch):
+        return self.atlas[self.glyph_index[ch]], self.min_dx, self.min_dy
+
+    def render(self, shuffled_sol):
+        lines = [line.rstrip() for line in shuffled_sol]
+        left, top, right, bottom = self.measure(lines)
+        height = bottom - top + 2 * self.pad_y
+        width = right - left + 2 * self.pad_x
+        cell_h, cell_w = self.atlas.shape[1:]
+
+        # pad the buffer so tiles never need clipping, then crop to the canvas
+        margin = max(cell_h, cell_w)
+        gray = np.full((height + 2 * margin, width + 2 * margin), 255, dtype=np.int32)
+        line_cov = np.empty((cell_h, gray.shape[1]), dtype=np.int32)
+        for i, line in enumerate(lines):
+            y = margin + self.pad_y + i * self.line_pitch + self.min_dy
+            line_cov.fill(0)
+            pen = 0.0
+            for ch in line:
+                if ch not in self.blank:
+                    x = margin + self.pad_x + int(pen) + self.min_dx
+                    region = line_cov[:, x : x + cell_w]
+                    tile = self._tile(ch)
+                    # FreeType's coverage union inside one line: a + b - a * b / 255
+                    region += tile - (region * tile + 127) // 255
+                pen += self._glyph_ink(ch)[4]
+            # Pillow's integer blend of black ink through the line mask, one line at a time
+            band = gray[y : y + cell_h]
+            tmp = -band * line_cov + 128
+            band += ((tmp >> 8) + tmp) >> 8
+        gray = gray[margin : margin + height, margin : margin + width]
+        return Image.fromarray(gray.astype(np.uint8), "L").convert("RGB")
+
+
+def pixel_diff(shuffled_sol, reference=None, candidate=None):
+    # largest per-channel difference between two renderers, or None if the sizes differ
+    reference = reference or CodeRenderer()
+    candidate = candidate or get_atlas_renderer()
+    a = np.asarray(reference.render(shuffled_sol), dtype=np.int16)
+    b = np.asarray(candidate.render(shuffled_sol), dtype=np.int16)
+    if a.shape != b.shape:
+        return None
+    return int(np.abs(a - b).max()) if a.size else 0
+
+
+@functools.lru_cache(maxsize=None)
+def get_atlas_renderer():
+    return GlyphAtlasRenderer()
@@ -0,0 +1,474 @@
+import io
+import json
+import os
+import secrets
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from codeshuffler.lib.distractors import parse_mix
+from codeshuffler.lib.generator import gen_question, job_rng
+from codeshuffler.lib.manifest import (
+    BINARY_MANIFEST_NAME,
+    ManifestReader,
+    ManifestWriter,
+    is_binary_manifest,
+)
+from codeshuffler.lib.parser import (
+    ExamDocxExporter,
+    parse_exam_stream,
+    shuffle_answers,
+    shuffle_questions,
+)
+from codeshuffler.lib.utils import get_renderer
+from codeshuffler.models.codefile import CodeFile
+from codeshuffler.models.exam import ExamView
+from codeshuffler.settings import settings
+
+MANIFEST_FORMAT = 1
+MANIFEST_NAME = "manifest.json"
+EXAM_MANIFEST_NAME = "exam_manifest.json"
+EXAM_ARCHIVE_NAME = "exams.zip"
+SKIPPED_EXTENSIONS = (".txt", ".md", ".json")
+LETTERS = ["a", "b", "c", "d", "e", "f", "g"]
+
+RENDERERS = ("atlas", "pillow")
+SHUFFLE_MODES = ("both", "questions", "answers")
+MANIFEST_KINDS = ("both", "json", "binary")
+# what an earlier run must share with an --only run for their versions to be merged
+MERGED_KEYS = (
+    "format",
+    "seed",
+    "versions_total",
+    "no_of_choices",
+    "first_same_lines",
+    "snippets",
+    "distractor_mix",
+)
+EXAM_MERGED_KEYS = ("format", "kind", "seed", "versions_total", "mode", "source", "questions")
+
+# snippets and renderer loaded once per worker process
+_snippets: list[CodeFile] = []
+_renderer = None
+# distractor mix like [("hard", 3), ("easy", 1)], or None for gen_question's choices
+_mix = None
+# parsed exam and template exporter loaded once per worker process
+_exam = None
+_exporter = None
+
+
+def find_snippets(snippet_dir):
+    paths = []
+    for filename in sorted(os.listdir(snippet_dir)):
+        path = os.path.join(snippet_dir, filename)
+        if filename.startswith((".", "~")) or not os.path.isfile(path):
+            continue
+        if os.path.splitext(filename)[1].lower() in SKIPPED_EXTENSIONS:
+            continue
+        paths.append(path)
+    return paths
+
+
+def load_snippets(paths):
+    snippets = []
+    for path in paths:
+        codefile = CodeFile(path)
+        codefile.load()
+        snippets.append(codefile)
+    return snippets
+
+
+def _manifest_header(path):
+    # top level of an earlier manifest, with the snippet names manifest.json lists
+    if is_binary_manifest(path):
+        with ManifestReader(path) as reader:
+            header = dict(reader.header)
+        header["snippets"] = [snippet["name"] for snippet in header["snippets"]]
+        return header
+    with open(path, "r", encoding="utf-8") as f:
+        header = json.load(f)
+    header.pop("versions", None)
+    return header
+
+
+def _previous_versions(path):
+    if is_binary_manifest(path):
+        with ManifestReader(path) as reader:
+            for version in reader.versions():
+                yield reader[version]
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            yield from json.load(f)["versions"]
+
+
+def _previous_runs(paths, only, seed):
+    """Headers of the manifests an ``--only`` run adds its versions to, and the seed to use.
+
+    Without a seed, the regenerated versions take the one of the run they replace.
+    """
+    previous = {path: _manifest_header(path) for path in paths if only and os.path.isfile(path)}
+    if seed is None:
+        seeds = [header["seed"] for header in previous.values()]
+        seed = seeds[0] if seeds else secrets.randbits(63)
+    return previous, seed
+
+
+def _add_previous(path, version_ids, writer=None, results=None):
+    # the earlier run's versions this one did not regenerate
+    regenerated = set(version_ids)
+    for result in _previous_versions(path):
+        if result["version"] in regenerated:
+            continue
+        if writer is not None:
+            writer.add(result["version"], result["items"])
+        if results is not None:
+            results.append(result)
+    if results is not None:
+        results.sort(key=lambda result: result["version"])
+
+
+def _check_mergeable(previous, header, keys):
+    for path, previous_header in previous.items():
+        for key in keys:
+            if previous_header.get(key) != header.get(key):
+                raise ValueError(
+                    f"{path} was written with a different {key}; regenerate every version "
+                    "or use another output directory."
+                )
+
+
+def _init_worker(paths, no_of_choices, first_same_lines, renderer, mix=None):
+    global _snippets, _renderer, _mix
+    if renderer == "atlas":
+        from codeshuffler.lib.atlas import get_atlas_renderer
+
+        _renderer = get_atlas_renderer()
+    else:
+        _renderer = get_renderer()
+    settings.no_of_choices = no_of_choices
+    settings.first_same_X_lines_MCQ = first_same_lines
+    _snippets = load_snippets(paths)
+    _mix = mix
+
+
+def build_version(version, out_dir, seed):
+    rng = job_rng(seed, version)
+    version_dir = os.path.join(out_dir, f"v{version:04d}")
+    os.makedirs(version_dir, exist_ok=True)
+    items = []
+    for codefile in _snippets:
+        try:
+            if _mix:
+                # the pool is built on first use and reused by every later version
+                pool = codefile.distractor_pool(settings.first_same_X_lines_MCQ)
+                question, correct_answer, scored = pool.question(settings.no_of_choices, rng, _mix)
+            else:
+                question, correct_answer, scored = gen_question(
+                    codefile.correct_sol,
+                    codefile.wrong_inst,
+                    codefile.wrong_inst_dict,
+                    settings.no_of_choices,
+                    rng,
+                )
+        except ValueError as e:
+            raise ValueError(f"{codefile.filename}: {e}") from e
+        image_path = os.path.join(version_dir, f"{codefile.filename}.png")
+        _renderer.save(question.render(strip=True), image_path)
+
+        choices = []
+        correct_letter = None
+        for letter, (sequence, score, swap) in zip(LETTERS, scored):
+            if sequence == correct_answer:
+                correct_letter = letter
+            choices.append({"letter": letter, "sequence": sequence, "score": score, "swap": swap})
+        items.append(
+            {
+                "item": codefile.filename,
+                "image": os.path.relpath(image_path, out_dir),
+                "correct": correct_letter,
+                "sequence": correct_answer,
+                # line indices of correct_sol + wrong_inst in shuffled order
+                "order": ",".join(map(str, question.order)),
+                "choices": choices,
+            }
+        )
+    return {"version": version, "items": items}
+
+
+def run_batch(
+    snippet_dir,
+    out_dir,
+    versions,
+    *,
+    workers=None,
+    no_of_choices=None,
+    first_same_lines=None,
+    seed=None,
+    only=None,
+    renderer="atlas",
+    manifest="both",
+    mix=None,
+    progress=None,
+):
+    if versions < 1:
+        raise ValueError("The number of versions must be at least 1.")
+    version_ids = sorted(set(only)) if only else list(range(1, versions + 1))
+    if version_ids[0] < 1 or version_ids[-1] > versions:
+        raise ValueError(f"Version ids must be between 1 and {versions}.")
+    if renderer not in RENDERERS:
+        raise ValueError(f"Unknown renderer {renderer!r}; expected one of {RENDERERS}.")
+    if manifest not in MANIFEST_KINDS:
+        raise ValueError(f"Unknown manifest kind {manifest!r}; expected one of {MANIFEST_KINDS}.")
+    json_path = os.path.join(out_dir, MANIFEST_NAME)
+    binary_path = os.path.join(out_dir, BINARY_MANIFEST_NAME)
+    # --only replaces those versions in the manifests already there and keeps the rest
+    previous, seed = _previous_runs([json_path, binary_path], only, seed)
+    no_of_choices = no_of_choices or settings.no_of_choices
+    if not 2 <= no_of_choices <= len(LETTERS):
+        raise ValueError(f"The number of choices must be between 2 and {len(LETTERS)}.")
+    if first_same_lines is None:
+        first_same_lines = settings.first_same_X_lines_MCQ
+    if isinstance(mix, str):
+        mix = parse_mix(mix)
+    if mix and sum(count for _, count in mix) > no_of_choices - 1:
+        raise ValueError(
+            f"The distractor mix asks for {sum(count for _, count in mix)} wrong choices, "
+            f"but each question only has {no_of_choices - 1}."
+        )
+
+    paths = find_snippets(snippet_dir)
+    if not paths:
+        raise ValueError(f"No code snippets found in {snippet_dir}.")
+    # parse up front so broken snippets fail before any work is fanned out
+    warnings = {}
+    snippets = []
+    for codefile in load_snippets(paths):
+        snippets.append(
+            {
+                "name": codefile.filename,
+                "lines": len(codefile.correct_sol) + len(codefile.wrong_inst),
+                "swaps": list(codefile.wrong_inst_dict),
+            }
+        )
+        if codefile.warning_msg:
+            warnings[codefile.filename] = codefile.warning_msg
+        if first_same_lines >= len(codefile.correct_sol):
+            raise ValueError(
+                f"{codefile.filename}: first_same_X_lines_MCQ ({first_same_lines}) is greater "
+                f"than or equal to total lines ({len(codefile.correct_sol)})."
+            )
+
+    os.makedirs(out_dir, exist_ok=True)
+    header = {
+        "format": MANIFEST_FORMAT,
+        "seed": seed,
+        "versions_total": versions,
+        "no_of_choices": no_of_choices,
+        "first_same_lines": first_same_lines,
+        "snippets": [os.path.basename(p) for p in paths],
+        "warnings": warnings,
+    }
+    if mix:
+        header["distractor_mix"] = ",".join(f"{name}={count}" for name, count in mix)
+    _check_mergeable(previous, header, MERGED_KEYS)
+    # the binary manifest is written as versions come in, so a long run never holds them all;
+    # it replaces the old one only once complete
+    writer = None
+    binary_tmp = binary_path + ".tmp"
+    if manifest != "json":
+        writer = ManifestWriter(binary_tmp, {**header, "snippets": snippets})
+    workers = workers or os.cpu_count() or 1
+    results = []
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_worker,
+            initargs=(paths, no_of_choices, first_same_lines, renderer, mix),
+        ) as pool:
+            total = len(version_ids)
+            chunksize = max(1, total // (4 * workers))
+            for done, result in enumerate(
+                pool.map(
+                    build_version,
+                    version_ids,
+                    [out_dir] * total,
+                    [seed] * total,
+                    chunksize=chunksize,
+                ),
+                start=1,
+            ):
+                if writer is not None:
+                    writer.add(result["version"], result["items"])
+                if manifest != "binary":
+                    results.append(result)
+                if progress is not None:
+                    progress(done, total)
+        if previous:
+            _add_previous(
+                next(iter(previous)), version_ids, writer, None if manifest == "binary" else results
+            )
+    except BaseException:
+        if writer is not None:
+            writer.close()
+            os.remove(binary_tmp)
+        raise
+    if writer is not None:
+        writer.close()
+        os.replace(binary_tmp, binary_path)
+
+    if manifest == "binary":
+        return binary_path
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump({**header, "versions": results}, f, indent=1)
+    return json_path
+
+
+def _init_exam_worker(exam_path, template_path):
+    global _exam, _exporter
+    _exam = ExamView.from_exam(parse_exam_stream(exam_path))
+    _exporter = ExamDocxExporter(template_path)
+
+
+def shuffle_exam_version(exam, rng, mode="both"):
+    # a view of the shuffled version plus the manifest entry of each of its questions
+    view = ExamView.from_exam(exam)
+    if mode in ("both", "questions"):
+        view = shuffle_questions(view, rng)
+    if mode in ("both", "answers"):
+        view = shuffle_answers(view, rng)
+    items = []
+    for pos in range(len(view)):
+        question = view.question_at(pos)
+        perm = view.choice_order(pos)
+        correct = question.correct_index
+        items.append(
+            {
+                "item": question.number,
+                "correct": chr(97 + perm.index(correct)) if correct in perm else None,
+                "choices": [
+                    {
+                        "letter": chr(97 + i),
+                        "choice": old_i,
+                        "score": 1.0 if old_i == correct else 0.0,
+                    }
+                    for i, old_i in enumerate(perm)
+                ],
+            }
+        )
+    return view, items
+
+
+def build_exam_version(version, out_dir, seed, mode, answer_keys, archive):
+    version_exam, items = shuffle_exam_version(_exam, job_rng(seed, version), mode)
+    names = [(f"exam_v{version:04d}.docx", False)]
+    if answer_keys:
+        names.append((f"exam_v{version:04d}_key.docx", True))
+    files = []
+    for name, answer_key in names:
+        if archive:
+            buffer = io.BytesIO()
+            _exporter.write(version_exam, buffer, answer_key=answer_key)
+            files.append((name, buffer.getvalue()))
+        else:
+            _exporter.write(version_exam, os.path.join(out_dir, name), answer_key=answer_key)
+            files.append((name, None))
+    return {"version": version, "files": [name for name, _ in files], "items": items}, files
+
+
+def run_exam_batch(
+    exam_path,
+    out_dir,
+    versions,
+    *,
+    template_path=None,
+    workers=None,
+    seed=None,
+    only=None,
+    mode="both",
+    answer_keys=True,
+    archive=False,
+    progress=None,
+):
+    if versions < 1:
+        raise ValueError("The number of versions must be at least 1.")
+    version_ids = sorted(set(only)) if only else list(range(1, versions + 1))
+    if version_ids[0] < 1 or version_ids[-1] > versions:
+        raise ValueError(f"Version ids must be between 1 and {versions}.")
+    if mode not in SHUFFLE_MODES:
+        raise ValueError(f"Unknown shuffle mode {mode!r}; expected one of {SHUFFLE_MODES}.")
+    manifest_path = os.path.join(out_dir, EXAM_MANIFEST_NAME)
+    archive_path = os.path.join(out_dir, EXAM_ARCHIVE_NAME)
+    # --only replaces those versions in the manifest already there and keeps the rest
+    previous, seed = _previous_runs([manifest_path], only, seed)
+    template_path = template_path or settings.exam_template
+
+    # parse and load the template up front so a bad input fails before any work is fanned out
+    exam = parse_exam_stream(exam_path)
+    if not exam:
+        raise ValueError(f"No questions found in {exam_path}.")
+    ExamDocxExporter(template_path)
+    header = {
+        "format": MANIFEST_FORMAT,
+        "kind": "exam",
+        "seed": seed,
+        "versions_total": versions,
+        "mode": mode,
+        "source": os.path.basename(exam_path),
+        "archive": EXAM_ARCHIVE_NAME if archive else None,
+        "questions": list(exam),
+    }
+    _check_mergeable(previous, header, EXAM_MERGED_KEYS)
+
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    results = []
+    # like the binary manifest, the archive replaces the old one only once complete
+    archive_tmp = archive_path + ".tmp"
+    archive_file = zipfile.ZipFile(archive_tmp, "w") if archive else None
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_exam_worker,
+            initargs=(exam_path, template_path),
+        ) as pool:
+            total = len(version_ids)
+            chunksize = max(1, total // (4 * workers))
+            for done, (result, files) in enumerate(
+                pool.map(
+                    build_exam_version,
+                    version_ids,
+                    [out_dir] * total,
+                    [seed] * total,
+                    [mode] * total,
+                    [answer_keys] * total,
+                    [archive] * total,
+                    chunksize=chunksize,
+                ),
+                start=1,
+            ):
+                # .docx parts are already deflated, so the archive just stores them
+                if archive_file is not None:
+                    for name, data in files:
+                        archive_file.writestr(name, data)
+                results.append(result)
+                if progress is not None:
+                    progress(done, total)
+        if archive_file is not None and only and os.path.isfile(archive_path):
+            written = set(archive_file.namelist())
+            with zipfile.ZipFile(archive_path) as old:
+                for info in old.infolist():
+                    if info.filename not in written:
+                        archive_file.writestr(info, old.read(info))
+    except BaseException:
+        if archive_file is not None:
+            archive_file.close()
+            os.remove(archive_tmp)
+        raise
+    if archive_file is not None:
+        archive_file.close()
+        os.replace(archive_tmp, archive_path)
+
+    if previous:
+        _add_previous(manifest_path, version_ids, results=results)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({**header, "versions": results}, f, indent=1)
+    return manifest_path
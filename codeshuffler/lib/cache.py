@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+import tempfile
+
+from codeshuffler.lib.generator import PARSER_VERSION
+from codeshuffler.settings import settings
+
+_default_cache = None
+
+
+class ParseCache:
+    """On-disk cache of ``read_original_code`` results keyed by content hash.
+
+    Entries are small JSON files; reading one refreshes its mtime so eviction can drop the
+    least recently used entries once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(data: bytes) -> str:
+        digest = hashlib.sha256(data)
+        digest.update(f"\0parser-v{PARSER_VERSION}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return (
+            entry["correct_sol"],
+            entry["incorrect_sol"],
+            entry["incorrect_sol_dict"],
+            entry["warning_msg"],
+        )
+
+    def put(self, key, result):
+        correct_sol, incorrect_sol, incorrect_sol_dict, warning_msg = result
+        # JSON would silently turn non-string keys into strings, so only cache plain dicts
+        if not all(
+            isinstance(k, str) and isinstance(v, str) for k, v in incorrect_sol_dict.items()
+        ):
+            return
+        entry = {
+            "correct_sol": correct_sol,
+            "incorrect_sol": incorrect_sol,
+            "incorrect_sol_dict": incorrect_sol_dict,
+            "warning_msg": warning_msg,
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._path(key))
+        except OSError:
+            return
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return 0
+        deleted = 0
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json"):
+                os.remove(os.path.join(self.directory, filename))
+                deleted += 1
+        return deleted
+
+
+def default_parse_cache():
+    global _default_cache
+    if not settings.parse_cache_enabled:
+        return None
+    if _default_cache is None:
+        _default_cache = ParseCache(settings.parse_cache_dir, settings.parse_cache_max_bytes)
+    return _default_cache
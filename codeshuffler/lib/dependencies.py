@@ -0,0 +1,300 @@
+import ast
+import functools
+import textwrap
+from dataclasses import dataclass
+from math import comb
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+# calls that only read their arguments; any other call may print, read input or mutate
+PURE_BUILTINS = frozenset(
+    {
+        "abs",
+        "all",
+        "any",
+        "bool",
+        "dict",
+        "divmod",
+        "enumerate",
+        "float",
+        "frozenset",
+        "int",
+        "isinstance",
+        "len",
+        "list",
+        "max",
+        "min",
+        "range",
+        "reversed",
+        "round",
+        "set",
+        "sorted",
+        "str",
+        "sum",
+        "tuple",
+        "zip",
+    }
+)
+# stands for the outside world: output, input and whatever unknown calls touch
+WORLD = "<world>"
+# statements that end or redirect a block, or must stay where they are
+BARRIERS = (
+    ast.Return,
+    ast.Raise,
+    ast.Break,
+    ast.Continue,
+    ast.Global,
+    ast.Nonlocal,
+    ast.Assert,
+)
+
+
+@dataclass(frozen=True)
+class LineOrder:
+    """Partial order of a snippet's lines: ``preds[k]`` is a bitmask of the lines that
+    must come before line ``k`` in every correct answer."""
+
+    preds: Tuple[int, ...]
+
+    def __len__(self) -> int:
+        return len(self.preds)
+
+    @functools.cached_property
+    def unique(self) -> bool:
+        # the original order is the only one when every line depends on the one before it
+        return all(self.preds[k] >> (k - 1) & 1 for k in range(1, len(self.preds)))
+
+    def accepts(self, order: Sequence[int]) -> bool:
+        if sorted(order) != list(range(len(self.preds))):
+            return False
+        placed = 0
+        for k in order:
+            if self.preds[k] & ~placed:
+                return False
+            placed |= 1 << k
+        return True
+
+    def count(self) -> int:
+        """Number of linear extensions, i.e. of correct orders of the lines.
+
+        Lines comparable to every other line cut the order into segments that can be
+        counted on their own, and unrelated groups of lines within a segment only need
+        their slots chosen. Each group is counted by a memoized DP over the bitmask of
+        lines already placed, so only its order ideals are ever visited.
+        """
+        if self.unique:
+            return 1
+        n = len(self.preds)
+        closure = list(self.preds)
+        for k in range(n):
+            for j in range(k):
+                if closure[k] >> j & 1:
+                    closure[k] |= closure[j]
+        succs = [0] * n
+        for k in range(n):
+            for j in range(n):
+                if closure[k] >> j & 1:
+                    succs[j] |= 1 << k
+        everything = (1 << n) - 1
+        cuts = {k for k in range(n) if closure[k] | succs[k] | 1 << k == everything}
+        segments = {}
+        for k in range(n):
+            if k not in cuts:
+                key = sum(1 for c in cuts if closure[k] >> c & 1)
+                segments[key] = segments.get(key, 0) | 1 << k
+        total = 1
+        for members in segments.values():
+            # unrelated groups of lines interleave freely: pick their slots, then order each
+            placed = 0
+            while members:
+                group = members & -members
+                grown = 0
+                while group != grown:
+                    grown = group
+                    for k in range(n):
+                        if group >> k & 1:
+                            group |= (closure[k] | succs[k]) & members
+                size = bin(group).count("1")
+                placed += size
+                total *= comb(placed, size) * _count_ideals(tuple(self.preds), group)
+                members &= ~group
+        return total
+
+    def extensions(self, limit: Optional[int] = None) -> Iterator[List[int]]:
+        """Yield correct orders, the original one first, up to ``limit`` of them."""
+        n = len(self.preds)
+        order: List[int] = []
+        produced = 0
+
+        def walk(placed):
+            nonlocal produced
+            if len(order) == n:
+                produced += 1
+                yield list(order)
+                return
+            for k in range(n):
+                if not placed >> k & 1 and not self.preds[k] & ~placed:
+                    order.append(k)
+                    yield from walk(placed | 1 << k)
+                    order.pop()
+                    if limit is not None and produced >= limit:
+                        return
+
+        if limit is None or limit > 0:
+            yield from walk(0)
+
+
+def _count_ideals(preds, members):
+    # orders of the lines in members, given every line outside them is placed around them
+    @functools.lru_cache(maxsize=None)
+    def count(placed):
+        if placed == members:
+            return 1
+        total = 0
+        rest = members & ~placed
+        while rest:
+            bit = rest & -rest
+            k = bit.bit_length() - 1
+            if not preds[k] & members & ~placed:
+                total += count(placed | bit)
+            rest ^= bit
+        return total
+
+    return count(0)
+
+
+def _effects(stmt) -> Tuple[set, set]:
+    reads, writes = set(), set()
+    for node in ast.walk(stmt):
+        if isinstance(node, ast.Name):
+            (reads if isinstance(node.ctx, ast.Load) else writes).add(node.id)
+        elif isinstance(node, (ast.Attribute, ast.Subscript)) and not isinstance(
+            node.ctx, ast.Load
+        ):
+            # storing into x.attr or x[i] changes x
+            base = node.value
+            while isinstance(base, (ast.Attribute, ast.Subscript)):
+                base = base.value
+            if isinstance(base, ast.Name):
+                writes.add(base.id)
+        elif isinstance(node, ast.Call):
+            func = node.func
+            if isinstance(func, ast.Name) and func.id in PURE_BUILTINS:
+                continue
+            if isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+                # a method may mutate the object it is called on
+                writes.add(func.value.id)
+            else:
+                reads.add(WORLD)
+                writes.add(WORLD)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                writes.add((alias.asname or alias.name).split(".")[0])
+    if isinstance(stmt, ast.AugAssign) and isinstance(stmt.target, ast.Name):
+        reads.add(stmt.target.id)
+    return reads, writes
+
+
+def _swappable(stmt) -> bool:
+    # one-line simple statements; docstrings and control flow stay where they are
+    if stmt.lineno != stmt.end_lineno or isinstance(stmt, BARRIERS):
+        return False
+    if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+        return False
+    return not any(
+        isinstance(getattr(stmt, field, None), list) and getattr(stmt, field)
+        for field in ("body", "orelse", "finalbody", "handlers")
+    )
+
+
+def _blocks(tree):
+    for node in ast.walk(tree):
+        for field in ("body", "orelse", "finalbody"):
+            block = getattr(node, field, None)
+            if isinstance(block, list) and block and isinstance(block[0], ast.stmt):
+                yield block
+        for handler in getattr(node, "handlers", ()):
+            yield handler.body
+        for case in getattr(node, "cases", ()):
+            yield case.body
+
+
+@functools.lru_cache(maxsize=256)
+def line_order(lines: Tuple[str, ...]) -> LineOrder:
+    """Which of a Python snippet's lines may trade places without changing what it does.
+
+    Lines keep their original order, except inside runs of consecutive one-line
+    statements of the same block: there two statements only keep their order when one
+    writes a name the other reads or writes (calls that may have side effects all touch
+    ``WORLD``). Code that does not parse as Python keeps the single original order.
+    """
+    n = len(lines)
+    chain = tuple(1 << (k - 1) if k else 0 for k in range(n))
+    try:
+        tree = ast.parse(textwrap.dedent("\n".join(lines)))
+    except (SyntaxError, ValueError):
+        return LineOrder(chain)
+
+    runs = []
+    for block in _blocks(tree):
+        run = []
+        for stmt in block:
+            line = stmt.lineno - 1
+            if not _swappable(stmt):
+                runs.append(run)
+                run = []
+                continue
+            if run and run[-1][0] != line - 1:
+                # a comment between them keeps the two groups apart
+                runs.append(run)
+                run = []
+            run.append((line, *_effects(stmt)))
+        runs.append(run)
+    runs = [run for run in runs if len(run) > 1]
+
+    preds = list(chain)
+    # everything in a run comes after whatever precedes its first line and before the
+    # line after it; in between, only conflicting statements keep their order
+    for run in runs:
+        after = run[-1][0] + 1
+        if after < n:
+            preds[after] |= sum(1 << line for line, _, _ in run)
+    for run in runs:
+        for line, _, _ in run[1:]:
+            preds[line] = preds[run[0][0]]
+        for i, (a, reads_a, writes_a) in enumerate(run):
+            for b, reads_b, writes_b in run[i + 1 :]:
+                if writes_a & (reads_b | writes_b) or writes_b & reads_a:
+                    preds[b] |= 1 << a
+    return LineOrder(tuple(preds))
+
+
+def answer_lines(choice: str, correct_answer: str, correct_sol: Sequence[str]):
+    """Map a choice onto correct_sol line indices, or None if it shows any other line.
+
+    Identical lines are interchangeable, so the k-th copy the choice shows is taken to be
+    the k-th copy in correct_sol.
+    """
+    slot = {pos: k for k, pos in enumerate(correct_answer.split(","))}
+    positions = choice.split(",")
+    if len(positions) != len(slot) or set(positions) != set(slot):
+        return None
+    copies = {}
+    for k, line in enumerate(correct_sol):
+        copies.setdefault(line, []).append(k)
+    seen = {}
+    ids = []
+    for pos in positions:
+        line = correct_sol[slot[pos]]
+        k = seen.get(line, 0)
+        seen[line] = k + 1
+        ids.append(copies[line][k])
+    return ids
+
+
+def is_equivalent_answer(choice: str, correct_answer: str, correct_sol: Sequence[str]) -> bool:
+    # a choice other than the key that still orders every correct line validly
+    order = line_order(tuple(correct_sol))
+    if order.unique:
+        return choice == correct_answer
+    ids = answer_lines(choice, correct_answer, correct_sol)
+    return ids is not None and order.accepts(ids)
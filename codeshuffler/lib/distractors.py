@@ -0,0 +1,236 @@
+import hashlib
+import random
+from itertools import islice
+
+import numpy as np
+
+from codeshuffler.lib.dependencies import line_order
+from codeshuffler.lib.generator import (
+    distinct_ranks,
+    distractor_blocks,
+    shuffle_question,
+    shuffle_rand_choices,
+    unrank_distractor,
+)
+from codeshuffler.lib.metrics import PAD, hamming_distance, kendall_tau_distance, lcs_length
+
+# candidates sampled per pool; smaller spaces are enumerated in full
+POOL_SIZE = 2048
+DIFFICULTIES = ("hard", "medium", "easy")
+# "random" is every entry without partial credit, "any" is every entry
+BUCKETS = DIFFICULTIES + ("partial", "random", "any")
+
+
+def parse_mix(value):
+    """Parse ``"hard=3,easy=1"`` into ``[("hard", 3), ("easy", 1)]``."""
+    mix = []
+    for part in value.split(","):
+        name, sep, count = part.partition("=")
+        name = name.strip().lower()
+        if not sep or name not in BUCKETS or not count.strip().isdigit():
+            raise ValueError(
+                f"Invalid distractor mix {part!r}; expected bucket=count with a bucket "
+                f"from {', '.join(BUCKETS)}."
+            )
+        mix.append((name, int(count)))
+    return mix
+
+
+class DistractorPool:
+    """Scored wrong answers for one snippet, shared by every version built from it.
+
+    Candidates are stored as line ids (indices into ``correct_sol + wrong_inst``) rather
+    than shuffled positions, so one pool serves every shuffle of the snippet: a version
+    only has to map the ids of the choices it draws onto where its shuffle put the lines.
+    The pool holds a sample of the valid distractors ``gen_random_choices_wICinst`` draws
+    from, plus the cumulative partial-credit swaps of ``incorrect_lines``. Each entry is
+    scored once against the correct order and the entries are split into thirds: "hard"
+    ones keep the longest common subsequence with the answer (ties broken by fewer
+    inverted pairs, then fewer moved positions), "easy" ones the shortest.
+    """
+
+    def __init__(self, correct_sol, wrong_inst, wrong_inst_dict, first_same_lines, size=POOL_SIZE):
+        if first_same_lines >= len(correct_sol):
+            raise ValueError(
+                f"Invalid setting: first_same_X_lines_MCQ ({first_same_lines}) "
+                f"is greater than or equal to total lines ({len(correct_sol)})."
+            )
+        self.lines = list(correct_sol) + list(wrong_inst)
+        self.num_correct = len(correct_sol)
+        # ids of identical lines, in id order; a shuffle hands them its positions in order
+        groups = {}
+        for i, line in enumerate(self.lines):
+            groups.setdefault(line, []).append(i)
+        self.groups = groups
+        self._group = {i: ids for ids in groups.values() for i in ids}
+
+        entries = {}
+        for sequence, credit, swap in self._partials(wrong_inst_dict):
+            entries.setdefault(self._canon(sequence), (credit, swap))
+        self._sample(first_same_lines, size, entries)
+        entries.pop(tuple(range(self.num_correct)), None)
+        # other correct orders of the lines are not wrong answers either
+        order = line_order(tuple(correct_sol))
+        if not order.unique:
+            for key in [k for k in entries if len(k) == self.num_correct and order.accepts(k)]:
+                del entries[key]
+
+        keys = list(entries)
+        width = max((len(k) for k in keys), default=0)
+        self.sequences = np.full((len(keys), width), PAD, dtype=np.int64)
+        for row, key in enumerate(keys):
+            self.sequences[row, : len(key)] = key
+        self.lengths = np.fromiter(map(len, keys), dtype=np.int64, count=len(keys))
+        self.credit = np.array([entries[k][0] for k in keys], dtype=np.float64)
+        self.swaps = [entries[k][1] for k in keys]
+
+        reference = np.arange(self.num_correct)
+        self.lcs = lcs_length(self.sequences, reference)
+        self.kendall = kendall_tau_distance(self.sequences, reference)
+        self.hamming = hamming_distance(self.sequences, reference)
+        # closest to the answer first
+        ranked = np.lexsort((self.hamming, self.kendall, -self.lcs))
+        self.buckets = {
+            name: np.sort(part) for name, part in zip(DIFFICULTIES, np.array_split(ranked, 3))
+        }
+        partial = self.credit > 0
+        # most credit first, so the partials with the fewest swaps are offered first
+        self.buckets["partial"] = np.flatnonzero(partial)[np.argsort(-self.credit[partial])]
+        self.buckets["random"] = np.flatnonzero(~partial)
+        self.buckets["any"] = np.arange(len(keys))
+        self.difficulty = np.empty(len(keys), dtype=np.int8)
+        for level, name in enumerate(DIFFICULTIES):
+            self.difficulty[self.buckets[name]] = level
+
+    @classmethod
+    def from_codefile(cls, codefile, first_same_lines, size=POOL_SIZE):
+        return cls(
+            codefile.correct_sol,
+            codefile.wrong_inst,
+            codefile.wrong_inst_dict,
+            first_same_lines,
+            size,
+        )
+
+    def __len__(self):
+        return len(self.sequences)
+
+    def _canon(self, sequence):
+        # identical lines are interchangeable, so the k-th copy used always gets the k-th id
+        seen = {}
+        out = []
+        for i in sequence:
+            ids = self._group[i]
+            k = seen.get(ids[0], 0)
+            seen[ids[0]] = k + 1
+            out.append(ids[k])
+        return tuple(out)
+
+    def _partials(self, wrong_inst_dict):
+        # the swaps generate_partials_with_swaps makes, but walked in answer order: that
+        # walks the shuffled lines, so which swaps accumulate first changes with every
+        # shuffle, while the pool is built once and gives every version the same partials
+        by_text = {}
+        for i, line in enumerate(self.lines):
+            by_text.setdefault(line.strip(), []).append(i)
+        sequence = list(range(self.num_correct))
+        used = set(sequence)
+        swaps = 0
+        for i in range(self.num_correct):
+            if swaps >= len(wrong_inst_dict):
+                break
+            code = self.lines[i].strip()
+            if code not in wrong_inst_dict:
+                continue
+            wrong = str(wrong_inst_dict[code]).strip()
+            swap_in = next((j for j in by_text.get(wrong, ()) if j not in used), None)
+            if swap_in is None:
+                continue
+            sequence[sequence.index(i)] = swap_in
+            used.discard(i)
+            used.add(swap_in)
+            swaps += 1
+            yield tuple(sequence), max(0, 1 - 0.25 * swaps), code
+
+    def _sample(self, first_same_lines, size, entries):
+        fixed = list(range(first_same_lines))
+        remaining = list(range(first_same_lines, self.num_correct))
+        wrong = list(range(self.num_correct, len(self.lines)))
+        blocks = distractor_blocks(len(remaining), len(wrong))
+        total = sum(block[-1] for block in blocks)
+        # the same snippet always gets the same pool
+        digest = hashlib.sha256("\n".join(self.lines).encode("utf-8")).digest()
+        rng = random.Random(int.from_bytes(digest[:16], "big") ^ first_same_lines)
+        target = len(entries) + min(size, total)
+        # repeated lines make many ranks the same entry, so stop drawing after a while
+        for rank in islice(distinct_ranks(total, rng), 4 * size):
+            if len(entries) >= target:
+                break
+            sequence = fixed + unrank_distractor(blocks, remaining, wrong, rank)
+            entries.setdefault(self._canon(sequence), (0.0, None))
+
+    def draw(self, count, rng, mix=None):
+        """Pick ``count`` distinct entries: the ``mix`` buckets first, then random ones.
+
+        A short difficulty bucket borrows from its neighbours, nearest first. Without a
+        mix, every partial-credit entry is used before the random ones, like gen_question.
+        """
+        mix = list(mix) if mix else [("partial", count)]
+        picked = []
+        taken = set()
+
+        def take(name, wanted):
+            bucket = self.buckets[name]
+            got = 0
+            if wanted <= 0:
+                return got
+            # each draw is O(1); only entries already taken by an earlier bucket cost extra
+            order = range(len(bucket)) if name == "partial" else distinct_ranks(len(bucket), rng)
+            for i in order:
+                if got == wanted:
+                    break
+                entry = int(bucket[i])
+                if entry not in taken:
+                    taken.add(entry)
+                    picked.append(entry)
+                    got += 1
+            return got
+
+        for name, wanted in mix:
+            wanted = min(wanted, count - len(picked))
+            wanted -= take(name, wanted)
+            if name in DIFFICULTIES:
+                level = DIFFICULTIES.index(name)
+                for other in sorted(DIFFICULTIES, key=lambda n: abs(DIFFICULTIES.index(n) - level)):
+                    if wanted > 0 and other != name:
+                        wanted -= take(other, wanted)
+        for name in ("random", "any"):
+            take(name, count - len(picked))
+        if len(picked) < count:
+            raise ValueError(
+                f"Only {len(picked)} distinct wrong choices are in the distractor pool, "
+                f"but {count} are needed."
+            )
+        return picked
+
+    def question(self, no_of_choices, rng=None, mix=None):
+        """Shuffle the snippet and choose its answers from the pool.
+
+        Returns the same ``(question, correct_answer, scored)`` triple as ``gen_question``.
+        Partial-credit choices are the pool's, so their swaps accumulate in answer order
+        rather than in the order of this shuffle's lines, as they do in ``gen_question``.
+        """
+        rng = rng or random
+        question = shuffle_question(self.lines, rng)
+        position = [0] * len(self.lines)
+        for line, ids in self.groups.items():
+            for i, pos in zip(ids, question.positions[line]):
+                position[i] = pos + 1
+        correct_answer = ",".join(str(position[i]) for i in range(self.num_correct))
+
+        scored = [(correct_answer, 1.0, None)]
+        for entry in self.draw(no_of_choices - 1, rng, mix):
+            sequence = self.sequences[entry, : self.lengths[entry]]
+            choice = ",".join(str(position[i]) for i in sequence)
+            scored.append((choice, float(self.credit[entry]), self.swaps[entry]))
+        return question, correct_answer, shuffle_rand_choices(scored, rng)
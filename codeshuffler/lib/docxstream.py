@@ -0,0 +1,337 @@
+import posixpath
+import xml.etree.ElementTree as ET
+import zipfile
+
+W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+M = "{http://schemas.openxmlformats.org/officeDocument/2006/math}"
+A = "{http://schemas.openxmlformats.org/drawingml/2006/main}"
+V = "{urn:schemas-microsoft-com:vml}"
+WP = "{http://schemas.openxmlformats.org/drawingml/2006/wordprocessingDrawing}"
+PKG_RELS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+# content parts in the order docx2python concatenates them for ``.text``
+PART_TYPES = ("header", "officeDocument", "footer", "footnotes", "endnotes")
+
+TABLE_TAGS = (f"{W}tbl", f"{W}tr", f"{W}tc")
+
+BULLET = "--"
+ROMAN = (
+    (1000, "m"),
+    (900, "cm"),
+    (500, "d"),
+    (400, "cd"),
+    (100, "c"),
+    (90, "xc"),
+    (50, "l"),
+    (40, "xl"),
+    (10, "x"),
+    (9, "ix"),
+    (5, "v"),
+    (4, "iv"),
+    (1, "i"),
+)
+
+
+def _lower_letter(n):
+    result = ""
+    while n:
+        n, remainder = divmod(n - 1, 26)
+        result = chr(97 + remainder) + result
+    return result
+
+
+def _lower_roman(n):
+    result = ""
+    for value, numeral in ROMAN:
+        count, n = divmod(n, value)
+        result += numeral * count
+    return result
+
+
+NUMBER_FORMATS = {
+    "decimal": str,
+    "lowerLetter": _lower_letter,
+    "upperLetter": lambda n: _lower_letter(n).upper(),
+    "lowerRoman": _lower_roman,
+    "upperRoman": lambda n: _lower_roman(n).upper(),
+}
+
+
+def _read_rels(zf, part):
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, "_rels", f"{name}.rels")
+    try:
+        root = ET.fromstring(zf.read(rels_path))
+    except KeyError:
+        return []
+    return [
+        (rel.get("Id"), rel.get("Type", "").rsplit("/", 1)[-1], rel.get("Target"), folder)
+        for rel in root.iter(f"{PKG_RELS}Relationship")
+    ]
+
+
+def _read_numbering(zf):
+    # numId -> [(numFmt, start)] per ilvl, resolved through the abstractNum it points to
+    try:
+        root = ET.fromstring(zf.read("word/numbering.xml"))
+    except KeyError:
+        return {}
+    abstract = {}
+    for abstract_num in root.iter(f"{W}abstractNum"):
+        levels = []
+        for lvl in abstract_num.findall(f"{W}lvl"):
+            fmt = lvl.find(f"{W}numFmt")
+            start = lvl.find(f"{W}start")
+            levels.append(
+                (
+                    fmt.get(f"{W}val") if fmt is not None else None,
+                    int(start.get(f"{W}val")) if start is not None else None,
+                )
+            )
+        abstract[abstract_num.get(f"{W}abstractNumId")] = levels
+    numbering = {}
+    for num in root.iter(f"{W}num"):
+        abstract_id = num.find(f"{W}abstractNumId")
+        if abstract_id is not None:
+            numbering[num.get(f"{W}numId")] = abstract.get(abstract_id.get(f"{W}val"), [])
+    return numbering
+
+
+class _ListCounter:
+    """List numbering that mirrors docx2python's bullet strings ("1)\\t", "--\\t", ...)."""
+
+    def __init__(self, numbering):
+        self.numbering = numbering
+        self.counts = {}
+
+    def bullet(self, num_pr):
+        num_id = num_pr.find(f"{W}numId")
+        ilvl = num_pr.find(f"{W}ilvl")
+        if num_id is None or ilvl is None:
+            return ""
+        num_id, ilvl = num_id.get(f"{W}val"), ilvl.get(f"{W}val")
+        if num_id is None or ilvl is None:
+            return ""
+        counts = self.counts.setdefault(num_id, {})
+        counts[ilvl] = counts.get(ilvl, 0) + 1
+        for level in [k for k in counts if k > ilvl]:
+            del counts[level]
+        try:
+            fmt, start = self.numbering[num_id][int(ilvl)]
+        except (KeyError, IndexError, ValueError):
+            fmt, start = None, None
+        number = counts[ilvl] + (start - 1 if start else 0)
+        formatter = NUMBER_FORMATS.get(fmt or "bullet")
+        bullet = formatter(number) + ")" if formatter else BULLET
+        return "\t" * int(ilvl) + bullet + "\t"
+
+
+def _inline_text(elem, links):
+    # text docx2python writes for a single element inside a paragraph, or None
+    tag = elem.tag
+    if tag == f"{W}t":
+        return elem.text or ""
+    if tag == f"{W}br":
+        return "\n"
+    if tag == f"{W}tab":
+        return "\t"
+    if tag == f"{W}sym":
+        char = elem.get(f"{W}char")
+        if char:
+            return f"<span style=font-family:{elem.get(f'{W}font')}>&#x0{char[1:]};</span>"
+    elif tag in (f"{W}footnoteReference", f"{W}endnoteReference"):
+        return f"----{tag[len(W) : -len('Reference')]}{elem.get(f'{W}id')}----"
+    elif tag in (f"{A}blip", f"{V}imagedata"):
+        target = links.get(elem.get(f"{R}embed" if tag == f"{A}blip" else f"{R}id"))
+        if target is not None:
+            return f"----{target}----"
+    elif tag == f"{WP}docPr" and "descr" in elem.attrib:
+        return f"----Image alt text---->{elem.get('descr')}<"
+    return None
+
+
+class _TableGrid:
+    """Open tables and cells of a part, filled the way docx2python fills merged cells.
+
+    A cell's paragraphs are held until it closes. A cell spanning n grid columns then
+    repeats its text n times, and a vertically merged one repeats the cell above it.
+    """
+
+    def __init__(self):
+        # per open table: its previous and current row, as the texts of each grid slot
+        self.tables = []
+        self.cells = []
+
+    def cut(self):
+        # docx2python ends every open cell where a nested table or a text box starts: their
+        # paragraphs so far come out once and whatever follows starts a new table
+        texts = []
+        for cell in self.cells:
+            texts.extend(cell)
+            cell.clear()
+        for table in self.tables:
+            table[:] = [None, []]
+        return texts
+
+    def open(self, tag):
+        # the paragraphs a nested table cuts off, if any
+        if tag == f"{W}tc":
+            self.cells.append([])
+        elif tag == f"{W}tbl":
+            texts = self.cut()
+            self.tables.append([None, []])
+            return texts
+        return []
+
+    def close(self, elem):
+        # the paragraphs of a closed cell, once per grid slot it fills
+        if elem.tag == f"{W}tc":
+            return self._close_cell(elem)
+        if elem.tag == f"{W}tr":
+            self.tables[-1] = [self.tables[-1][1], []]
+        else:
+            self.tables.pop()
+            self.cut()
+        return []
+
+    def add(self, text):
+        # False outside a table, where a paragraph is emitted straight away
+        if not self.cells:
+            return False
+        self.cells[-1].append(text)
+        return True
+
+    def _close_cell(self, tc):
+        texts = self.cells.pop()
+        previous_row, row = self.tables[-1]
+        tc_pr = tc.find(f"{W}tcPr")
+        span = v_merge = None
+        if tc_pr is not None:
+            span = tc_pr.find(f"{W}gridSpan")
+            v_merge = tc_pr.find(f"{W}vMerge")
+        span = int(span.get(f"{W}val") or 1) if span is not None else 1
+        # only a bare <w:vMerge/> continues the cell above; "restart" starts a new one
+        if v_merge is not None and v_merge.get(f"{W}val") is None:
+            if previous_row is not None and len(row) < len(previous_row):
+                texts = previous_row[len(row)]
+        row.extend([texts] * span)
+        return texts * span
+
+
+def _iter_part_paragraphs(stream, rels, numbering):
+    # each paragraph is emitted when it closes and its subtree is dropped straight away;
+    # inside a table, a cell is held until it closes and its merged grid slots are known
+    links = {rel_id: target for rel_id, _, target, _ in rels}
+    counter = _ListCounter(numbering)
+    grid = _TableGrid()
+    paragraphs = []
+    bullet_slots = []
+    groups = []
+    queued = []
+    in_math = 0
+    stack = []
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
+        tag = elem.tag
+        if event == "start":
+            stack.append(elem)
+            if tag == f"{M}oMath":
+                in_math += 1
+            elif in_math:
+                continue
+            elif tag == f"{W}p":
+                if paragraphs:
+                    # a paragraph inside a paragraph is text box content
+                    yield from grid.cut()
+                # note labels come first, then the list bullet once its numPr is read
+                bullet_slots.append(len(queued))
+                paragraphs.append(queued + [""])
+                queued = []
+            elif tag == f"{W}hyperlink" and paragraphs:
+                groups.append(len(paragraphs[-1]))
+            elif tag in TABLE_TAGS:
+                yield from grid.open(tag)
+            elif tag in (f"{W}footnote", f"{W}endnote"):
+                note_type = (elem.get(f"{W}type") or "").lower()
+                if "separator" not in note_type:
+                    queued = [f"{tag[len(W):]}{elem.get(f'{W}id')})\t"]
+            continue
+
+        stack.pop()
+        if tag in TABLE_TAGS:
+            yield from grid.close(elem)
+            if tag == f"{W}tbl" and stack:
+                elem.clear()
+                stack[-1].remove(elem)
+            continue
+        if tag == f"{M}oMath":
+            in_math -= 1
+            if paragraphs and not in_math:
+                paragraphs[-1].append("<latex>" + "".join(elem.itertext()) + "</latex>")
+            continue
+        if in_math or not paragraphs:
+            continue
+        pieces = paragraphs[-1]
+        text = _inline_text(elem, links)
+        if text is not None:
+            pieces.append(text)
+        elif tag == f"{W}numPr" and len(stack) >= 2 and stack[-2].tag == f"{W}p":
+            pieces[bullet_slots[-1]] = counter.bullet(elem)
+        elif tag == f"{W}hyperlink":
+            start = groups.pop()
+            text = "".join(pieces[start:])
+            link = links.get(elem.get(f"{R}id"))
+            if elem.get(f"{R}id") is not None and link is not None:
+                anchor = elem.get(f"{W}anchor")
+                if link and anchor:
+                    link = link + "#" + anchor
+                text = f'<a href="{link}">{text}</a>'
+            pieces[start:] = [text]
+        elif tag == f"{W}p":
+            text = "".join(paragraphs.pop())
+            bullet_slots.pop()
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+            # text box paragraphs stand apart from the cell around them
+            if paragraphs or not grid.add(text):
+                yield text
+            continue
+
+
+def _content_parts(zf):
+    parts = {part_type: [] for part_type in PART_TYPES}
+    seen = set()
+    queue = [""]
+    # walk the relationship graph from the package root like docx2python does
+    while queue:
+        source = queue.pop(0)
+        for _, rel_type, target, folder in _read_rels(zf, source):
+            if not target or rel_type == "hyperlink":
+                continue
+            path = posixpath.normpath(posixpath.join(folder, target)).lstrip("/")
+            if rel_type in parts and path not in seen:
+                seen.add(path)
+                parts[rel_type].append(path)
+                queue.append(path)
+    return [path for part_type in PART_TYPES for path in parts[part_type]]
+
+
+def iter_docx_lines(doc_path):
+    """Yield the stripped, non-empty text lines of a .docx without loading it whole.
+
+    Lines come out in the same order and form as ``docx2python(doc_path).text`` would give
+    them (headers, body, footers, footnotes, endnotes), but each content part is read with
+    an incremental XML parser so only the paragraph or table cell being read is kept in
+    memory.
+    """
+    with zipfile.ZipFile(doc_path) as zf:
+        numbering = _read_numbering(zf)
+        for part in _content_parts(zf):
+            rels = _read_rels(zf, part)
+            with zf.open(part) as stream:
+                for text in _iter_part_paragraphs(stream, rels, numbering):
+                    for raw in text.splitlines():
+                        stripped = raw.strip()
+                        if stripped:
+                            yield stripped
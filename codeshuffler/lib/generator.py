@@ -4,10 +4,30 @@
 # -------------------------------------------------------------------------------
 
 import ast
+import functools
+import hashlib
 import random
 from collections import Counter
+from itertools import islice
+from math import comb, factorial
 
+from ..models.question import ShuffledQuestion
 from ..settings import settings
+from .dependencies import is_equivalent_answer, line_order
+
+# bump whenever read_original_code changes its output so cached parses are invalidated
+PARSER_VERSION = 1
+# distractor filters score candidates in batches of this size, looking at no more than
+# MAX_FILTERED_CANDIDATES before giving up
+FILTER_BATCH = 256
+MAX_FILTERED_CANDIDATES = 4096
+
+
+def job_rng(master_seed, version):
+    # independent stream per (seed, version): the same version comes out identical whether it
+    # is built alone, in a thread pool or in any worker process of a batch
+    digest = hashlib.sha256(f"{master_seed}:{version}".encode("utf-8")).digest()
+    return random.Random(int.from_bytes(digest[:16], "big"))
 
 
 def read_original_code(read_code):
@@ -55,45 +75,29 @@ def read_original_code(read_code):
 
 
 def gen_correct_answer(correct_sol, shuffled_sol):
-    correct_answer = ""
-    all_lines = [str(i + 1) for i in range(len(shuffled_sol))]
-    remain_lines = all_lines.copy()
-    used_shuffled_line_indices = set()
-
-    for line_cor in correct_sol:
-        for i, line_shuf in enumerate(shuffled_sol):
-            shuffled_line_number = i + 1
-            # check if this line number (index) has already been used
-            if i in used_shuffled_line_indices:
-                continue
-            shuffled_line = line_shuf[line_shuf.index(")") + 2 :]
-
-            if line_cor == shuffled_line:
-                correct_answer += str(shuffled_line_number) + ","
-                used_shuffled_line_indices.add(i)
-                break
-    correct_answer = correct_answer[:-1]
-    # generating remaining lines which are not present the correct answer
-    used_line_numbers = set(correct_answer.split(","))
-    remain_lines = [line for line in all_lines if line not in used_line_numbers]
-
+    # accepts a ShuffledQuestion or the rendered "(n) line" strings
+    if not isinstance(shuffled_sol, ShuffledQuestion):
+        shuffled_sol = ShuffledQuestion.from_rendered(shuffled_sol)
+    answer, remaining = shuffled_sol.answer(correct_sol)
+    correct_answer = ",".join(map(str, answer))
+    remain_lines = [str(pos) for pos in remaining]
     return correct_answer, remain_lines
 
 
-def shuffle_rand_choices(answers_array):
+def shuffle_rand_choices(answers_array, rng=None):
     # shuffling the random choices
-    random.shuffle(answers_array)
+    (rng or random).shuffle(answers_array)
     return answers_array
 
 
-def shuffle_sol(correct_sol):
-    random_code = random.sample(correct_sol, k=len(correct_sol))
-    # removing the indents for programming blocks
-    for el in range(len(random_code)):
-        random_code[el] = (
-            f"({el+1}) " + random_code[el]
-        )  # .strip()        #Remove strip() function to include tabs
-    return random_code
+def shuffle_question(code_lines, rng=None):
+    order = (rng or random).sample(range(len(code_lines)), k=len(code_lines))
+    return ShuffledQuestion.from_order(code_lines, order)
+
+
+def shuffle_sol(correct_sol, rng=None):
+    # indents are kept so programming blocks still line up in the rendered output
+    return shuffle_question(correct_sol, rng).render()
 
 
 def sequence_similarity(seq1, seq2):
@@ -107,71 +111,266 @@ def incorrect_instructions(input_code, wrong_inst):
     return code_w_incorrect_instrctns
 
 
-def gen_random_choices(correct_answer, no_of_choices):
-    random_choices = []
+def distinct_ranks(total, rng):
+    # lazy Fisher-Yates over range(total): every draw is O(1) and never repeats
+    swapped = {}
+    for i in range(total):
+        j = rng.randrange(i, total)
+        yield swapped.get(j, j)
+        swapped[j] = swapped.get(i, i)
+
+
+def _unrank_combination(items, k, rank):
+    # k-subset of items (kept in their original order) with the given lexicographic rank
+    chosen = []
+    start = 0
+    while k > 0:
+        for i in range(start, len(items)):
+            count = comb(len(items) - i - 1, k - 1)
+            if rank < count:
+                chosen.append(items[i])
+                start = i + 1
+                k -= 1
+                break
+            rank -= count
+    return chosen
+
+
+def _unrank_permutation(items, rank):
+    # decode rank as a Lehmer code over items
+    pool = list(items)
+    perm = []
+    for i in range(len(pool), 0, -1):
+        idx, rank = divmod(rank, factorial(i - 1))
+        perm.append(pool.pop(idx))
+    return perm
+
+
+def distractor_blocks(num_remaining, num_wrong):
+    # valid distractors keep all but at most two of the remaining correct lines and are
+    # between num_remaining - 1 and num_remaining + num_wrong - 1 lines long
+    blocks = []
+    for k in range(max(num_remaining - 1, 0), num_remaining + num_wrong):
+        for j in range(max(num_remaining - 2, 0), min(num_remaining, k) + 1):
+            t = k - j
+            if 0 <= t <= num_wrong:
+                size = comb(num_remaining, j) * comb(num_wrong, t) * factorial(k)
+                blocks.append((k, j, t, size))
+    return blocks
+
+
+def unrank_distractor(blocks, remaining, wrong, rank):
+    # the valid distractor with this rank, 0 <= rank < the total size of ``blocks``
+    for k, j, t, size in blocks:
+        if rank < size:
+            break
+        rank -= size
+    rank, perm_rank = divmod(rank, factorial(k))
+    remaining_rank, wrong_rank = divmod(rank, comb(len(wrong), t))
+    chosen = _unrank_combination(remaining, j, remaining_rank)
+    chosen += _unrank_combination(wrong, t, wrong_rank)
+    return _unrank_permutation(chosen, perm_rank)
+
+
+def gen_random_choices(correct_answer, no_of_choices, rng=None):
+    rng = rng or random
     choice_array = correct_answer.split(",")
-    while len(random_choices) < no_of_choices - 1:
-        choice = random.sample(choice_array, k=len(choice_array))
-        choice = ",".join(choice)
-        if choice != correct_answer:
-            random_choices.append(choice)
+    available = factorial(len(choice_array)) - 1
+    if available < no_of_choices - 1:
+        raise ValueError(
+            f"Only {available} distinct orderings of {len(choice_array)} lines exist, "
+            f"which is not enough for {no_of_choices} choices."
+        )
+    random_choices = []
+    for rank in distinct_ranks(available + 1, rng):
+        if len(random_choices) == no_of_choices - 1:
+            break
+        if rank == 0:  # the identity permutation is the correct answer
+            continue
+        random_choices.append(",".join(_unrank_permutation(choice_array, rank)))
 
     random_choices.append(correct_answer)
-    random_choices = shuffle_rand_choices(random_choices)
+    random_choices = shuffle_rand_choices(random_choices, rng)
     return random_choices
 
 
-def gen_random_choices_wICinst(correct_answer, no_of_choices, remain_lines):
-    random_choices = []
+def _filter_distractors(candidates, needed, correct_answer, accept):
+    # score drawn candidates a batch at a time and keep the first ``needed`` that pass
+    from .metrics import as_sequences
+
+    reference = as_sequences([correct_answer])[0]
+    accepted = []
+    candidates = islice(candidates, MAX_FILTERED_CANDIDATES)
+    while len(accepted) < needed:
+        batch = list(islice(candidates, FILTER_BATCH))
+        if not batch:
+            break
+        mask = accept(as_sequences(batch), reference)
+        accepted.extend(candidate for candidate, ok in zip(batch, mask) if ok)
+    return accepted[:needed]
+
+
+def gen_random_choices_wICinst(
+    correct_answer, no_of_choices, remain_lines, rng=None, distractor_filter=None, reject=None
+):
+    """The correct answer plus ``no_of_choices - 1`` distinct random distractors.
+
+    Distractors are drawn uniformly from every valid one, and there are far more long
+    orderings than short ones, so most distractors have the longest lengths. Earlier
+    versions picked the length uniformly first, which made short distractors much more
+    common.
+
+    ``distractor_filter`` optionally takes a padded ``(n, width)`` array of candidate
+    sequences and the correct answer, and returns a boolean mask of the ones to keep (see
+    ``metrics.metric_filter``). Candidates are drawn in the usual order and scored in
+    batches, so the metrics run over NumPy arrays rather than one candidate at a time.
+    Rejected candidates are never offered: if fewer than ``no_of_choices - 1`` of the first
+    ``MAX_FILTERED_CANDIDATES`` pass, a ``ValueError`` is raised.
+    ``reject`` optionally drops candidates that must not be offered as wrong choices, such
+    as other correct orders of the lines.
+    """
+    rng = rng or random
     choice_array = correct_answer.split(",")
-    while len(random_choices) < no_of_choices - 1:
-        if settings.first_same_X_lines_MCQ >= len(choice_array):
+    if settings.first_same_X_lines_MCQ >= len(choice_array):
+        raise ValueError(
+            f"Invalid setting: first_same_X_lines_MCQ ({settings.first_same_X_lines_MCQ}) "
+            f"is greater than or equal to total lines ({len(choice_array)}). "
+            "Please choose a smaller number in Settings."
+        )
+    first_X_lines_MCQ = choice_array[: settings.first_same_X_lines_MCQ]
+    remaining_array = choice_array[len(first_X_lines_MCQ) :]
+    remain_lines = [str(line) for line in remain_lines]
+
+    # distractors are unranked from the set of valid ones instead of being rejection sampled,
+    # so generation takes a bounded number of steps and can fail fast when the set is too small
+    blocks = distractor_blocks(len(remaining_array), len(remain_lines))
+    total = sum(size for *_, size in blocks)
+    available = total - 1 if remain_lines else total  # the correct answer is one of them
+    if available < no_of_choices - 1:
+        raise ValueError(
+            f"Only {available} distinct wrong choices can be generated when the first "
+            f"{settings.first_same_X_lines_MCQ} of {len(choice_array)} lines are kept the same, "
+            f"but {no_of_choices - 1} are needed. "
+            "Please keep fewer lines the same or lower the number of choices in Settings."
+        )
+
+    drawn = (
+        ",".join(first_X_lines_MCQ + unrank_distractor(blocks, remaining_array, remain_lines, rank))
+        for rank in distinct_ranks(total, rng)
+    )
+    if distractor_filter is not None:
+        random_choices = _filter_distractors(
+            (c for c in drawn if c != correct_answer and not (reject and reject(c))),
+            no_of_choices - 1,
+            correct_answer,
+            distractor_filter,
+        )
+        if len(random_choices) < no_of_choices - 1:
             raise ValueError(
-                f"Invalid setting: first_same_X_lines_MCQ ({settings.first_same_X_lines_MCQ}) "
-                f"is greater than or equal to total lines ({len(choice_array)}). "
-                "Please choose a smaller number in Settings."
+                f"Only {len(random_choices)} distinct wrong choices pass the distractor filter, "
+                f"but {no_of_choices - 1} are needed. "
+                "Please loosen the filter or lower the number of choices in Settings."
             )
-        first_X_lines_MCQ = correct_answer.split(",")[: settings.first_same_X_lines_MCQ]
-        remaining_array = correct_answer.split(",")[len(first_X_lines_MCQ) :]
-        k = random.randint(len(remaining_array) - 1, len(remaining_array) + len(remain_lines) - 1)
-        # added to ensure we dont sample more than available
-        k = min(k, len(remaining_array + remain_lines))
-        remaining_choices = random.sample(remaining_array + remain_lines, max(k, 0))
-        choices = first_X_lines_MCQ + remaining_choices
-        random.shuffle(choices[3:])
-        choice = ",".join(map(str, choices))
-        similarity = sequence_similarity(choice.split(","), correct_answer.split(","))
-        if choice != correct_answer and similarity >= len(correct_answer.split(",")) - 2:
-            if choice not in random_choices:
+    else:
+        random_choices = []
+        for choice in drawn:
+            if len(random_choices) == no_of_choices - 1:
+                break
+            if choice != correct_answer and not (reject and reject(choice)):
                 random_choices.append(choice)
+    if len(random_choices) < no_of_choices - 1:
+        raise ValueError(
+            f"Only {len(random_choices)} distinct wrong choices can be generated because "
+            "other orders of the lines are also correct. "
+            "Please keep fewer lines the same or lower the number of choices in Settings."
+        )
     random_choices.append(correct_answer)
-    random_choices = shuffle_rand_choices(random_choices)
+    random_choices = shuffle_rand_choices(random_choices, rng)
     return random_choices
 
 
-def generate_partials(num_swaps_limit, numbered_code, incorrect_lines, answer_mcq):
-    copied_code = numbered_code.copy()
+def generate_partials_with_swaps(num_swaps_limit, numbered_code, incorrect_lines, answer_mcq):
+    """Partial-credit answers, each paired with the incorrect_lines key it last swapped.
+
+    Walking the shuffled lines in order, every line whose stripped content is a key of
+    ``incorrect_lines`` has its place in the answer taken by a position showing the
+    incorrect line, and the swaps accumulate from one partial to the next. Lines are
+    matched exactly (after stripping) through the question's line index, and each shown
+    copy of an incorrect line is used at most once, so no position repeats in an answer.
+    """
+    question = numbered_code
+    if not isinstance(question, ShuffledQuestion):
+        question = ShuffledQuestion.from_rendered(numbered_code)
+    index = question.stripped_positions
     correct_answer_mcq = [int(x) for x in answer_mcq.split(",")]
+    # 1-based position -> where it sits in the answer
+    slot = {pos: i for i, pos in enumerate(correct_answer_mcq)}
     partial_answer_bank = []
-    for line in numbered_code:
+    for pos in range(len(question)):
         if num_swaps_limit <= 0:
             break
-        code = line.split(")", 1)[1].strip()  # extract code without line number
-        if code in incorrect_lines:
-            index_to_swap = numbered_code.index(line)  # get the index of the line to swap
-            line_to_swap_with = incorrect_lines[code]  # get the incorrect line to swap with
-            if any(
-                line_to_swap_with in line for line in copied_code
-            ):  # ensure the line to swap with exists in the copied code
-                index_of_line_to_swap_with = next(
-                    i
-                    for i, line in enumerate(copied_code)
-                    if line_to_swap_with in line  # find index of line to swap with
-                )
-                to_swap_index = correct_answer_mcq.index(index_to_swap + 1)
-                correct_answer_mcq[to_swap_index] = (
-                    index_of_line_to_swap_with + 1
-                )  # update answer key by swapping with incorrect line
-                partial_answer_bank.append(",".join(map(str, correct_answer_mcq)))
-                num_swaps_limit -= 1
+        code = question.line_at(pos).strip()
+        if code not in incorrect_lines or pos + 1 not in slot:
+            continue
+        wrong = str(incorrect_lines[code]).strip()
+        swap_in = next((p + 1 for p in index.get(wrong, ()) if p + 1 not in slot), None)
+        if swap_in is None:
+            continue
+        i = slot.pop(pos + 1)
+        correct_answer_mcq[i] = swap_in
+        slot[swap_in] = i
+        partial_answer_bank.append((",".join(map(str, correct_answer_mcq)), code))
+        num_swaps_limit -= 1
     return partial_answer_bank
+
+
+def generate_partials(num_swaps_limit, numbered_code, incorrect_lines, answer_mcq):
+    return [
+        partial
+        for partial, _ in generate_partials_with_swaps(
+            num_swaps_limit, numbered_code, incorrect_lines, answer_mcq
+        )
+    ]
+
+
+def gen_question(correct_sol, wrong_inst, wrong_inst_dict, no_of_choices, rng=None):
+    rng = rng or random
+    correct_plus_wrong = incorrect_instructions(correct_sol, wrong_inst)
+    question = shuffle_question(correct_plus_wrong, rng)
+    correct_answer, remain_lines = gen_correct_answer(correct_sol, question)
+    partial_swaps = generate_partials_with_swaps(
+        len(wrong_inst_dict), question, wrong_inst_dict, correct_answer
+    )
+    partials = [partial for partial, _ in partial_swaps]
+    # with independent lines, a shuffle may be just as correct as the key
+    reject = None
+    if not line_order(tuple(correct_sol)).unique:
+        reject = functools.partial(
+            is_equivalent_answer, correct_answer=correct_answer, correct_sol=correct_sol
+        )
+    choices = gen_random_choices_wICinst(
+        correct_answer, no_of_choices, remain_lines, rng, reject=reject
+    )
+
+    # swap some of the random choices for partial-credit answers
+    candidate_indices = [i for i, ch in enumerate(choices) if ch != correct_answer]
+    num_replacements = min(len(partials), len(candidate_indices))
+    if num_replacements > 0:
+        replace_idx = rng.sample(candidate_indices, num_replacements)
+        for part, idx in zip(partials[:num_replacements], replace_idx):
+            choices[idx] = part
+
+    # (sequence, score, swap): swap is the incorrect_lines key a partial-credit choice came from
+    scored = []
+    for ch in choices:
+        swap = None
+        if ch == correct_answer:
+            score = 1.0
+        elif ch in partials:
+            idx = partials.index(ch)
+            score = max(0, 1 - 0.25 * (idx + 1))
+            swap = partial_swaps[idx][1]
+        else:
+            score = 0.0
+        scored.append((ch, score, swap))
+    return question, correct_answer, scored
@@ -0,0 +1,230 @@
+import csv
+import json
+import os
+from dataclasses import dataclass
+from typing import List, Tuple
+
+import numpy as np
+
+from codeshuffler.lib.manifest import ManifestReader, is_binary_manifest
+
+LETTERS = "abcdefg"
+STUDENTS_CSV = "student_scores.csv"
+ITEMS_CSV = "item_scores.csv"
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """Scores of every choice of every version, laid out for fancy indexing.
+
+    ``scores[v, p, c]`` is the credit for letter ``c`` at question position ``p`` of the
+    version in row ``v``, and ``items[v, p]`` says which item (an index into ``item_ids``)
+    that position shows. Positions a version does not have score 0 and point at item -1.
+    """
+
+    version_ids: np.ndarray
+    item_ids: Tuple[str, ...]
+    items: np.ndarray
+    scores: np.ndarray
+
+    @classmethod
+    def from_manifest(cls, manifest) -> "AnswerKey":
+        versions = manifest["versions"]
+        if not versions:
+            raise ValueError("The manifest does not contain any versions.")
+        # items in the manifest's own order (snippets or source questions), then any others
+        item_ids = {}
+        for item in manifest.get("snippets") or manifest.get("questions") or []:
+            item_ids.setdefault(str(item), len(item_ids))
+        for version in versions:
+            for item in version["items"]:
+                item_ids.setdefault(str(item["item"]), len(item_ids))
+        positions = max(len(version["items"]) for version in versions)
+        items = np.full((len(versions), positions), -1, dtype=np.int32)
+        scores = np.zeros((len(versions), positions, len(LETTERS)), dtype=np.float32)
+        for row, version in enumerate(versions):
+            for pos, item in enumerate(version["items"]):
+                items[row, pos] = item_ids[str(item["item"])]
+                for choice in item["choices"]:
+                    scores[row, pos, LETTERS.index(choice["letter"])] = choice["score"]
+        version_ids = np.array([version["version"] for version in versions], dtype=np.int64)
+        return cls(version_ids, tuple(item_ids), items, scores)
+
+    @property
+    def max_scores(self) -> np.ndarray:
+        # best available credit at each (version row, position)
+        return self.scores.max(axis=2)
+
+    def rows(self, versions: np.ndarray) -> np.ndarray:
+        order = np.argsort(self.version_ids)
+        idx = np.searchsorted(self.version_ids, versions, sorter=order)
+        idx = np.minimum(idx, len(order) - 1)
+        rows = order[idx]
+        unknown = self.version_ids[rows] != versions
+        if unknown.any():
+            raise ValueError(f"Responses refer to unknown version {versions[unknown][0]}.")
+        return rows
+
+
+def load_manifest(path):
+    if is_binary_manifest(path):
+        with ManifestReader(path) as reader:
+            return reader.to_dict()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def accept_equivalent_orderings(manifest, snippet_dir) -> int:
+    """Give full credit to choices that order a snippet's lines in another valid way.
+
+    Items are matched to the snippet files in ``snippet_dir`` by name; items without a
+    file there (such as exam questions) are left alone. Returns how many choices changed.
+    """
+    from codeshuffler.lib.dependencies import is_equivalent_answer
+    from codeshuffler.models.codefile import CodeFile
+
+    snippets = {}
+    changed = 0
+    for version in manifest["versions"]:
+        for item in version["items"]:
+            name = str(item["item"])
+            if name not in snippets:
+                path = os.path.join(snippet_dir, name)
+                codefile = None
+                if os.path.isfile(path):
+                    codefile = CodeFile(path)
+                    codefile.load()
+                snippets[name] = codefile
+            codefile = snippets[name]
+            if codefile is None or "sequence" not in item:
+                continue
+            for choice in item["choices"]:
+                if choice["score"] < 1.0 and is_equivalent_answer(
+                    choice["sequence"], item["sequence"], codefile.correct_sol
+                ):
+                    choice["score"] = 1.0
+                    changed += 1
+    return changed
+
+
+def read_responses(path) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    # student_id, version, then one letter column per question position (q1, q2, ...)
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or [h.strip().lower() for h in header[:2]] != ["student_id", "version"]:
+            raise ValueError(f"{path}: the first columns must be student_id and version.")
+        positions = len(header) - 2
+        student_ids = []
+        versions = []
+        letters = []
+        codes = {letter: i for i, letter in enumerate(LETTERS)}
+        for line_no, row in enumerate(reader, start=2):
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                versions.append(int(row[1]))
+            except (IndexError, ValueError):
+                raise ValueError(f"{path}:{line_no}: invalid version {row[1:2]}.") from None
+            student_ids.append(row[0].strip())
+            answers = row[2 : 2 + positions]
+            answers += [""] * (positions - len(answers))
+            # blanks and anything that is not a single choice letter count as -1
+            letters.append([codes.get(a.strip().lower(), -1) for a in answers])
+    return (
+        student_ids,
+        np.array(versions, dtype=np.int64),
+        np.array(letters, dtype=np.int64).reshape(len(student_ids), positions),
+    )
+
+
+def grade(key: AnswerKey, versions: np.ndarray, letters: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Score every response at once.
+
+    Returns ``(scores, items, rows)``: per-student, per-position credit, the item shown at
+    each position and the answer-key row of each student's version.
+    """
+    if letters.shape[1] > key.items.shape[1]:
+        raise ValueError(
+            f"Responses have {letters.shape[1]} questions but the versions have at most "
+            f"{key.items.shape[1]}."
+        )
+    rows = key.rows(versions)
+    positions = np.arange(letters.shape[1])
+    answered = letters >= 0
+    scores = key.scores[rows[:, None], positions[None, :], np.where(answered, letters, 0)]
+    scores = np.where(answered, scores, 0.0)
+    return scores, key.items[rows[:, None], positions[None, :]], rows
+
+
+def write_results(key, student_ids, versions, letters, out_dir):
+    scores, items, rows = grade(key, versions, letters)
+    positions = letters.shape[1]
+    max_scores = key.max_scores[rows, :positions]
+    valid = items >= 0
+    n_items = len(key.item_ids)
+
+    # per student: total plus the credit for each item, wherever it sat on their version
+    by_item = np.full((len(student_ids), n_items), np.nan, dtype=np.float32)
+    student_rows = np.broadcast_to(np.arange(len(student_ids))[:, None], items.shape)
+    by_item[student_rows[valid], items[valid]] = scores[valid]
+    totals = scores.sum(axis=1)
+    possible = np.where(valid, max_scores, 0.0).sum(axis=1)
+
+    os.makedirs(out_dir, exist_ok=True)
+    students_path = os.path.join(out_dir, STUDENTS_CSV)
+    with open(students_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["student_id", "version", "score", "max_score", "percent", *key.item_ids])
+        for i, student_id in enumerate(student_ids):
+            percent = 100.0 * totals[i] / possible[i] if possible[i] else 0.0
+            writer.writerow(
+                [
+                    student_id,
+                    int(versions[i]),
+                    f"{totals[i]:g}",
+                    f"{possible[i]:g}",
+                    f"{percent:.2f}",
+                    *("" if np.isnan(s) else f"{s:g}" for s in by_item[i]),
+                ]
+            )
+
+    # per item: how often it was seen, average credit and full/partial/zero/omitted counts
+    flat_items = items[valid]
+    flat_scores = scores[valid]
+    flat_max = max_scores[valid]
+    omitted = (letters < 0)[valid]
+    full = (flat_scores >= flat_max) & (flat_max > 0) & ~omitted
+    seen = np.bincount(flat_items, minlength=n_items)
+    total = np.bincount(flat_items, weights=flat_scores, minlength=n_items)
+    counts = {
+        "full_credit": np.bincount(flat_items, weights=full, minlength=n_items),
+        "partial_credit": np.bincount(
+            flat_items, weights=~full & (flat_scores > 0), minlength=n_items
+        ),
+        "no_credit": np.bincount(
+            flat_items, weights=(flat_scores == 0) & ~omitted, minlength=n_items
+        ),
+        "omitted": np.bincount(flat_items, weights=omitted, minlength=n_items),
+    }
+    items_path = os.path.join(out_dir, ITEMS_CSV)
+    with open(items_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["item", "responses", "mean_score", *counts])
+        for i, item_id in enumerate(key.item_ids):
+            mean = total[i] / seen[i] if seen[i] else 0.0
+            writer.writerow(
+                [item_id, int(seen[i]), f"{mean:.4f}", *(int(c[i]) for c in counts.values())]
+            )
+    return students_path, items_path
+
+
+def grade_files(manifest_path, responses_path, out_dir, snippet_dir=None):
+    manifest = load_manifest(manifest_path)
+    if snippet_dir is not None:
+        accept_equivalent_orderings(manifest, snippet_dir)
+    key = AnswerKey.from_manifest(manifest)
+    student_ids, versions, letters = read_responses(responses_path)
+    if not student_ids:
+        raise ValueError(f"No responses found in {responses_path}.")
+    return write_results(key, student_ids, versions, letters, out_dir)
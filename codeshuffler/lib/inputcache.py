@@ -0,0 +1,112 @@
+import copy
+import hashlib
+import os
+import re
+import tempfile
+from collections import OrderedDict
+
+from codeshuffler.models.codefile import CodeFile
+from codeshuffler.settings import settings
+
+CHUNK_SIZE = 1024 * 1024
+# parsed files kept in memory, most recently dropped last
+MAX_CODEFILES = 32
+ENTRY_NAME = re.compile(r"^[0-9a-f]{64}(\.[^.]*)?$")
+
+_default_cache = None
+
+
+class InputCache:
+    """Content-addressed copies of dropped code files.
+
+    A file is stored once under the SHA-256 of its content (keeping its extension), so
+    dropping the same code again, under any name, reuses the copy and its parsed CodeFile.
+    Copies are streamed in chunks while hashing, and the least recently used entries are
+    evicted once the directory grows past ``max_bytes``.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._codefiles = OrderedDict()
+
+    def store(self, src_path) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with open(src_path, "rb") as src, os.fdopen(fd, "wb") as dst:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    dst.write(chunk)
+            ext = os.path.splitext(src_path)[1].lower()
+            path = os.path.join(self.directory, digest.hexdigest() + ext)
+            if os.path.exists(path):
+                # same content seen before: keep the old copy and mark it as recently used
+                os.remove(tmp_path)
+                os.utime(path)
+            else:
+                os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict(keep=path)
+        return path
+
+    def codefile(self, path, filename=None) -> CodeFile:
+        # a parsed CodeFile for a stored copy, named after the file that was dropped
+        key = os.path.basename(path)
+        codefile = self._codefiles.get(key)
+        if codefile is None:
+            codefile = CodeFile(path)
+            codefile.load()
+            self._codefiles[key] = codefile
+            if len(self._codefiles) > MAX_CODEFILES:
+                self._codefiles.popitem(last=False)
+        else:
+            self._codefiles.move_to_end(key)
+        codefile = copy.copy(codefile)
+        codefile.filename = filename or codefile.filename
+        return codefile
+
+    def evict(self, keep=None):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if ENTRY_NAME.match(entry.name) and entry.is_file():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                self._codefiles.pop(os.path.basename(path), None)
+            except OSError:
+                pass
+
+    def clear(self):
+        self._codefiles.clear()
+        if not os.path.isdir(self.directory):
+            return 0
+        deleted = 0
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            if os.path.isfile(path):
+                os.remove(path)
+                deleted += 1
+        return deleted
+
+
+def default_input_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = InputCache(settings.input_cache_dir, settings.input_cache_max_bytes)
+    return _default_cache
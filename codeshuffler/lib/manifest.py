@@ -0,0 +1,258 @@
+import json
+import mmap
+import struct
+
+MAGIC = b"CSMF"
+BINARY_FORMAT = 1
+BINARY_MANIFEST_NAME = "manifest.bin"
+LETTERS = "abcdefg"
+
+# magic, format, header length; the JSON header follows, then one u64 offset per version
+_PREAMBLE = struct.Struct("<4sHI")
+_OFFSET = struct.Struct("<Q")
+
+KIND_RANDOM = 0
+KIND_CORRECT = 1
+KIND_PARTIAL = 2  # partial k is stored as KIND_PARTIAL + k
+RAW_SEQUENCE = 0x80  # the sequence repeats a position and is stored value by value
+
+
+def write_varint(out: bytearray, value: int):
+    # unsigned LEB128, any size
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def read_varint(buf, pos: int):
+    value = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def rank_arrangement(values, n: int) -> int:
+    """Lehmer rank of distinct ``values`` drawn from ``range(n)`` (a full or partial permutation).
+
+    Digit i is how many still-unused values are smaller than ``values[i]``, read in the
+    mixed radix n, n-1, ...
+    """
+    unused = list(range(n))
+    rank = 0
+    for i, value in enumerate(values):
+        digit = unused.index(value)
+        rank = rank * (n - i) + digit
+        del unused[digit]
+    return rank
+
+
+def unrank_arrangement(rank: int, n: int, length: int):
+    digits = []
+    for i in range(length - 1, -1, -1):
+        rank, digit = divmod(rank, n - i)
+        digits.append(digit)
+    unused = list(range(n))
+    return [unused.pop(digit) for digit in reversed(digits)]
+
+
+def _score(kind: int) -> float:
+    if kind == KIND_CORRECT:
+        return 1.0
+    if kind >= KIND_PARTIAL:
+        return max(0, 1 - 0.25 * (kind - KIND_PARTIAL + 1))
+    return 0.0
+
+
+def encode_version(items, snippets):
+    """Pack one version's items, as written to manifest.json, into bytes.
+
+    Line orders are Lehmer ranks over the shuffled question's lines; choice sequences are
+    ranks of the positions they list, with their kind and swap index alongside. Partial
+    credit answers can repeat a position, and those are stored position by position.
+    """
+    out = bytearray()
+    write_varint(out, len(items))
+    for item, snippet in zip(items, snippets):
+        n = snippet["lines"]
+        order = [int(x) for x in item["order"].split(",")]
+        write_varint(out, rank_arrangement(order, n))
+        out.append(len(item["choices"]))
+        for choice in item["choices"]:
+            positions = [int(x) - 1 for x in choice["sequence"].split(",")]
+            if choice["score"] == 1.0:
+                kind = KIND_CORRECT
+            elif choice["swap"] is not None:
+                # partial k scores 1 - 0.25 * (k + 1), so the score gives k back
+                kind = KIND_PARTIAL + min(round((1 - choice["score"]) / 0.25), 4) - 1
+            else:
+                kind = KIND_RANDOM
+            raw = len(set(positions)) != len(positions)
+            out.append(kind | (RAW_SEQUENCE if raw else 0))
+            swap = choice["swap"]
+            write_varint(out, 0 if swap is None else snippet["swaps"].index(swap) + 1)
+            write_varint(out, len(positions))
+            if raw:
+                for position in positions:
+                    write_varint(out, position)
+            else:
+                write_varint(out, rank_arrangement(positions, n))
+    return bytes(out)
+
+
+def decode_version(buf, pos, version, snippets):
+    count, pos = read_varint(buf, pos)
+    items = []
+    for snippet in snippets[:count]:
+        n = snippet["lines"]
+        rank, pos = read_varint(buf, pos)
+        order = ",".join(map(str, unrank_arrangement(rank, n, n)))
+        n_choices = buf[pos]
+        pos += 1
+        choices = []
+        correct = correct_sequence = None
+        for letter in LETTERS[:n_choices]:
+            flags = buf[pos]
+            pos += 1
+            kind = flags & ~RAW_SEQUENCE
+            swap_idx, pos = read_varint(buf, pos)
+            length, pos = read_varint(buf, pos)
+            if flags & RAW_SEQUENCE:
+                positions = []
+                for _ in range(length):
+                    value, pos = read_varint(buf, pos)
+                    positions.append(value)
+            else:
+                value, pos = read_varint(buf, pos)
+                positions = unrank_arrangement(value, n, length)
+            sequence = ",".join(str(p + 1) for p in positions)
+            if kind == KIND_CORRECT:
+                correct, correct_sequence = letter, sequence
+            choices.append(
+                {
+                    "letter": letter,
+                    "sequence": sequence,
+                    "score": _score(kind),
+                    "swap": snippet["swaps"][swap_idx - 1] if swap_idx else None,
+                }
+            )
+        items.append(
+            {
+                "item": snippet["name"],
+                "image": f"v{version:04d}/{snippet['name']}.png",
+                "correct": correct,
+                "sequence": correct_sequence,
+                "order": order,
+                "choices": choices,
+            }
+        )
+    return {"version": version, "items": items}
+
+
+class ManifestWriter:
+    """Streams versions into a binary manifest with a dense version-id offset table.
+
+    ``header`` is the manifest.json top level without "versions"; its "snippets" entries
+    must be dicts with "name", "lines" (shuffled line count) and "swaps" (the
+    incorrect_lines keys a partial can name).
+    """
+
+    def __init__(self, path, header):
+        self.header = header
+        self.snippets = header["snippets"]
+        self.total = header["versions_total"]
+        self.offsets = [0] * self.total
+        header_bytes = json.dumps(header).encode("utf-8")
+        self.file = open(path, "wb")
+        self.file.write(_PREAMBLE.pack(MAGIC, BINARY_FORMAT, len(header_bytes)))
+        self.file.write(header_bytes)
+        self.table_at = self.file.tell()
+        self.file.write(b"\0" * (_OFFSET.size * self.total))
+
+    def add(self, version, items):
+        self.offsets[version - 1] = self.file.tell()
+        self.file.write(encode_version(items, self.snippets))
+
+    def close(self):
+        self.file.seek(self.table_at)
+        self.file.write(b"".join(_OFFSET.pack(offset) for offset in self.offsets))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ManifestReader:
+    """Random access to a binary manifest; a lookup reads one offset and one record."""
+
+    def __init__(self, path):
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is empty.") from None
+        magic, fmt, header_len = _PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a binary CodeShuffler manifest.")
+        if fmt != BINARY_FORMAT:
+            self.close()
+            raise ValueError(f"{path} uses manifest format {fmt}, expected {BINARY_FORMAT}.")
+        start = _PREAMBLE.size
+        self.header = json.loads(self._mm[start : start + header_len].decode("utf-8"))
+        self.snippets = self.header["snippets"]
+        self._table_at = start + header_len
+
+    def __len__(self):
+        return self.header["versions_total"]
+
+    def offset(self, version):
+        if not 1 <= version <= len(self):
+            raise KeyError(version)
+        return _OFFSET.unpack_from(self._mm, self._table_at + _OFFSET.size * (version - 1))[0]
+
+    def __contains__(self, version):
+        return isinstance(version, int) and 1 <= version <= len(self) and self.offset(version) > 0
+
+    def __getitem__(self, version):
+        offset = self.offset(version)
+        if not offset:
+            raise KeyError(version)
+        return decode_version(self._mm, offset, version, self.snippets)
+
+    def versions(self):
+        return [v for v in range(1, len(self) + 1) if self.offset(v)]
+
+    def to_dict(self):
+        # the equivalent manifest.json structure, for tools that read every version anyway
+        manifest = dict(self.header)
+        manifest["snippets"] = [snippet["name"] for snippet in self.snippets]
+        manifest["versions"] = [self[v] for v in self.versions()]
+        return manifest
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def is_binary_manifest(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
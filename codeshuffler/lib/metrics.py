@@ -0,0 +1,118 @@
+import numpy as np
+
+# fills the tail of sequences shorter than the widest one; never a line position
+PAD = -1
+
+
+def as_sequences(sequences, width=None):
+    """Pack answer sequences into one ``(n, width)`` int array padded with ``PAD``.
+
+    Sequences may be comma-separated strings like ``"3,1,2"`` or lists of positions.
+    """
+    rows = [
+        [int(x) for x in seq.split(",") if x.strip()] if isinstance(seq, str) else list(seq)
+        for seq in sequences
+    ]
+    lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    if width is None:
+        width = int(lengths.max()) if len(rows) else 0
+    out = np.full((len(rows), width), PAD, dtype=np.int64)
+    filled = np.arange(width)[None, :] < lengths[:, None]
+    out[filled] = np.fromiter(
+        (x for row in rows for x in row[:width]), dtype=np.int64, count=int(filled.sum())
+    )
+    return out
+
+
+def _reference(reference):
+    if isinstance(reference, str):
+        return as_sequences([reference])[0]
+    return np.asarray(reference, dtype=np.int64)
+
+
+def _pad_to(array, width):
+    if array.shape[-1] >= width:
+        return array
+    pad = [(0, 0)] * (array.ndim - 1) + [(0, width - array.shape[-1])]
+    return np.pad(array, pad, constant_values=PAD)
+
+
+def reference_ranks(candidates, reference):
+    """``ranks[i, j]`` is where reference item ``j`` sits in candidate ``i``, or -1."""
+    reference = _reference(reference)
+    n, width = candidates.shape
+    lookup = np.full(max(int(reference.max(initial=0)), int(candidates.max(initial=0))) + 1, -1)
+    lookup[reference] = np.arange(len(reference))
+    item = np.where(candidates >= 0, lookup[np.maximum(candidates, 0)], -1)
+    ranks = np.full((n, len(reference)), -1, dtype=np.int64)
+    rows, cols = np.nonzero(item >= 0)
+    ranks[rows, item[rows, cols]] = cols
+    return ranks
+
+
+def kendall_tau_distance(candidates, reference):
+    """Pairs of reference items that both candidates hold but in the opposite order.
+
+    Items missing from a candidate take no part in its count, so a distractor that swaps in
+    an incorrect line is only penalised for how it reorders the lines it kept.
+    """
+    ranks = reference_ranks(candidates, reference)
+    m = ranks.shape[1]
+    upper = np.triu(np.ones((m, m), dtype=bool), k=1)
+    present = ranks >= 0
+    both = present[:, :, None] & present[:, None, :]
+    inverted = ranks[:, :, None] > ranks[:, None, :]
+    return (both & inverted & upper).sum(axis=(1, 2))
+
+
+def lcs_length(candidates, reference):
+    """Length of the longest common subsequence of every candidate and the reference.
+
+    One DP row per candidate is advanced together for each reference item. Since LCS rows
+    never decrease, a row is the running maximum of ``max(previous, previous[j-1] + 1 on a
+    match)``, which keeps the inner step a single cumulative max instead of a loop.
+    """
+    reference = _reference(reference)
+    n, width = candidates.shape
+    dp = np.zeros((n, width + 1), dtype=np.int64)
+    for item in reference:
+        match = candidates == item
+        step = np.maximum(dp[:, 1:], np.where(match, dp[:, :-1] + 1, 0))
+        dp[:, 1:] = np.maximum.accumulate(step, axis=1)
+    return dp[:, -1]
+
+
+def hamming_distance(candidates, reference):
+    """Positions where a candidate and the reference differ, counting length differences."""
+    reference = _reference(reference)
+    width = max(candidates.shape[1], len(reference))
+    candidates = _pad_to(candidates, width)
+    reference = _pad_to(reference, width)
+    return (candidates != reference[None, :]).sum(axis=1)
+
+
+METRICS = {
+    "kendall": kendall_tau_distance,
+    "lcs": lcs_length,
+    "hamming": hamming_distance,
+}
+
+
+def metric_filter(metric, minimum=None, maximum=None):
+    """A distractor filter keeping candidates whose metric lies in ``[minimum, maximum]``.
+
+    ``metric`` is a name from ``METRICS`` or a function of ``(candidates, reference)``.
+    The filter returns a boolean mask over the whole batch.
+    """
+    fn = METRICS[metric] if isinstance(metric, str) else metric
+
+    def accept(candidates, reference):
+        values = fn(candidates, reference)
+        mask = np.ones(len(values), dtype=bool)
+        if minimum is not None:
+            mask &= values >= minimum
+        if maximum is not None:
+            mask &= values <= maximum
+        return mask
+
+    return accept
@@ -0,0 +1,302 @@
+import csv
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import cached_property
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from codeshuffler.lib.utils import FONT_PATH
+
+LETTERS = "abcdefg"
+SCAN_EXTENSIONS = (".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp")
+
+# sheet geometry in pixels of a letter page at 150 dpi
+PAGE_SIZE = (1275, 1650)
+FIDUCIAL_SIZE = 40
+FIDUCIAL_MARGIN = 50
+BUBBLE_RADIUS = 12
+BUBBLE_PITCH_X = 34
+BUBBLE_PITCH_Y = 38
+ROWS_PER_COLUMN = 22
+COLUMN_WIDTH = 340
+QUESTIONS_TOP = 640
+GRID_TOP = 200
+
+# a bubble counts as filled once this share of its inner disk is dark
+FILL_THRESHOLD = 0.45
+# a second mark only invalidates an answer when it is at least this dark
+DOUBLE_MARK_THRESHOLD = 0.3
+DARK_LEVEL = 128
+
+
+@dataclass(frozen=True)
+class SheetLayout:
+    """Where the fiducials and bubbles sit on a blank answer sheet.
+
+    Sheets and scans are matched by these parameters, so the same layout must be used to
+    print the sheets and to read them back.
+    """
+
+    questions: int
+    choices: int = 5
+    id_digits: int = 8
+    version_digits: int = 3
+
+    def __post_init__(self):
+        if not 1 <= self.choices <= len(LETTERS):
+            raise ValueError(f"Answer sheets support between 1 and {len(LETTERS)} choices.")
+        columns = -(-self.questions // ROWS_PER_COLUMN)
+        if self.questions < 1 or FIDUCIAL_MARGIN + columns * COLUMN_WIDTH > PAGE_SIZE[0]:
+            raise ValueError(
+                f"One answer sheet holds between 1 and "
+                f"{(PAGE_SIZE[0] - FIDUCIAL_MARGIN) // COLUMN_WIDTH * ROWS_PER_COLUMN} "
+                "questions."
+            )
+
+    @cached_property
+    def fiducials(self) -> np.ndarray:
+        # centres of the corner squares: top-left, top-right, bottom-left, bottom-right
+        near = FIDUCIAL_MARGIN + FIDUCIAL_SIZE / 2
+        far_x, far_y = PAGE_SIZE[0] - near, PAGE_SIZE[1] - near
+        return np.array([[near, near], [far_x, near], [near, far_y], [far_x, far_y]])
+
+    def _digit_grid(self, left, digits):
+        # (digits, 10, 2) bubble centres, one column per digit and one row per value
+        xs = left + np.arange(digits) * BUBBLE_PITCH_X
+        ys = GRID_TOP + np.arange(10) * BUBBLE_PITCH_Y
+        grid = np.empty((digits, 10, 2))
+        grid[..., 0] = xs[:, None]
+        grid[..., 1] = ys[None, :]
+        return grid
+
+    @cached_property
+    def id_bubbles(self) -> np.ndarray:
+        return self._digit_grid(160, self.id_digits)
+
+    @cached_property
+    def version_bubbles(self) -> np.ndarray:
+        return self._digit_grid(160 + (self.id_digits + 2) * BUBBLE_PITCH_X, self.version_digits)
+
+    @cached_property
+    def answer_bubbles(self) -> np.ndarray:
+        # (questions, choices, 2) bubble centres laid out in columns of ROWS_PER_COLUMN
+        q = np.arange(self.questions)
+        left = 130 + (q // ROWS_PER_COLUMN) * COLUMN_WIDTH
+        top = QUESTIONS_TOP + (q % ROWS_PER_COLUMN) * BUBBLE_PITCH_Y
+        grid = np.empty((self.questions, self.choices, 2))
+        grid[..., 0] = left[:, None] + np.arange(self.choices)[None, :] * BUBBLE_PITCH_X
+        grid[..., 1] = top[:, None]
+        return grid
+
+
+def _font(size):
+    try:
+        return ImageFont.truetype(FONT_PATH, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+def render_answer_sheet(layout: SheetLayout, title="Answer Sheet", marks=None):
+    """Draw a printable sheet; ``marks`` optionally pre-fills it as
+    ``{"student_id": "...", "version": "...", "answers": ["a", "", ...]}``."""
+    sheet = Image.new("L", PAGE_SIZE, 255)
+    draw = ImageDraw.Draw(sheet)
+    small, large = _font(14), _font(22)
+    for cx, cy in layout.fiducials:
+        half = FIDUCIAL_SIZE / 2
+        draw.rectangle([cx - half, cy - half, cx + half, cy + half], fill=0)
+
+    draw.text((FIDUCIAL_MARGIN + FIDUCIAL_SIZE + 30, FIDUCIAL_MARGIN), title, font=large, fill=0)
+    id_left = layout.id_bubbles[0, 0]
+    version_left = layout.version_bubbles[0, 0]
+    draw.text((id_left[0] - BUBBLE_RADIUS, GRID_TOP - 50), "Student ID", font=small, fill=0)
+    draw.text((version_left[0] - BUBBLE_RADIUS, GRID_TOP - 50), "Version", font=small, fill=0)
+
+    def bubble(center, label):
+        x, y = center
+        box = [x - BUBBLE_RADIUS, y - BUBBLE_RADIUS, x + BUBBLE_RADIUS, y + BUBBLE_RADIUS]
+        draw.ellipse(box, outline=0, width=2)
+        # labels are printed light enough to stay below the darkness threshold
+        draw.text((x, y), label, font=small, fill=180, anchor="mm")
+
+    for grid in (layout.id_bubbles, layout.version_bubbles):
+        for column in grid:
+            for value, center in enumerate(column):
+                bubble(center, str(value))
+    for q, row in enumerate(layout.answer_bubbles):
+        x, y = row[0]
+        draw.text((x - 2 * BUBBLE_RADIUS, y), f"{q + 1}.", font=small, fill=0, anchor="rm")
+        for c, center in enumerate(row):
+            bubble(center, LETTERS[c])
+
+    if marks:
+        filled = []
+        for grid, value in (
+            (layout.id_bubbles, marks.get("student_id", "")),
+            (layout.version_bubbles, marks.get("version", "")),
+        ):
+            digits = str(value).rjust(len(grid), "0") if value != "" else ""
+            filled += [grid[i, int(d)] for i, d in enumerate(digits)]
+        for q, letter in enumerate(marks.get("answers", [])):
+            filled += [layout.answer_bubbles[q, LETTERS.index(ch)] for ch in letter]
+        for x, y in filled:
+            r = BUBBLE_RADIUS - 2
+            draw.ellipse([x - r, y - r, x + r, y + r], fill=20)
+    return sheet
+
+
+def _box_argmax(dark, size):
+    # top-left corner of the size x size window holding the most dark pixels
+    integral = np.zeros((dark.shape[0] + 1, dark.shape[1] + 1))
+    integral[1:, 1:] = dark.cumsum(axis=0).cumsum(axis=1)
+    sums = (
+        integral[size:, size:]
+        - integral[:-size, size:]
+        - integral[size:, :-size]
+        + integral[:-size, :-size]
+    )
+    y, x = np.unravel_index(np.argmax(sums), sums.shape)
+    return y, x
+
+
+def find_fiducials(gray: np.ndarray) -> np.ndarray:
+    """Locate the four corner squares of a scan, in the order of ``SheetLayout.fiducials``."""
+    height, width = gray.shape
+    scale = width / PAGE_SIZE[0]
+    size = max(4, int(round(FIDUCIAL_SIZE * scale)))
+    win_h, win_w = height // 5, width // 5
+    dark = gray < DARK_LEVEL
+    points = []
+    for top in (0, height - win_h):
+        for left in (0, width - win_w):
+            window = dark[top : top + win_h, left : left + win_w]
+            y, x = _box_argmax(window, size)
+            # refine to the centroid of the dark pixels around the best window
+            y0, x0 = max(0, y - size // 2), max(0, x - size // 2)
+            patch = window[y0 : y + size + size // 2, x0 : x + size + size // 2]
+            ys, xs = np.nonzero(patch)
+            if len(xs) < size * size // 2:
+                raise ValueError("Could not find the corner marks of the answer sheet.")
+            points.append([left + x0 + xs.mean(), top + y0 + ys.mean()])
+    return np.array(points)
+
+
+def fit_affine(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    # least-squares 3x2 matrix so that [x, y, 1] @ matrix maps source points onto target
+    design = np.hstack([source, np.ones((len(source), 1))])
+    matrix, *_ = np.linalg.lstsq(design, target, rcond=None)
+    return matrix
+
+
+def _disk_offsets(radius):
+    r = int(np.ceil(radius))
+    dy, dx = np.mgrid[-r : r + 1, -r : r + 1]
+    inside = dx * dx + dy * dy <= radius * radius
+    return dy[inside], dx[inside]
+
+
+def bubble_fill(dark: np.ndarray, centers: np.ndarray, radius: float) -> np.ndarray:
+    """Share of dark pixels inside a disk around every centre, sampled in one gather."""
+    dy, dx = _disk_offsets(radius)
+    flat = centers.reshape(-1, 2)
+    ys = np.clip(np.rint(flat[:, 1])[:, None].astype(int) + dy, 0, dark.shape[0] - 1)
+    xs = np.clip(np.rint(flat[:, 0])[:, None].astype(int) + dx, 0, dark.shape[1] - 1)
+    return dark[ys, xs].mean(axis=1).reshape(centers.shape[:-1])
+
+
+def _pick(fill):
+    # index of the single filled bubble per row, -1 for blank and -2 for a double mark
+    best = fill.argmax(axis=-1)
+    best_fill = np.take_along_axis(fill, best[..., None], axis=-1)[..., 0]
+    marked = (fill >= DOUBLE_MARK_THRESHOLD).sum(axis=-1)
+    return np.where(best_fill < FILL_THRESHOLD, -1, np.where(marked > 1, -2, best))
+
+
+def read_sheet(path, layout: SheetLayout):
+    """Return ``(student_id, version, answers, problems)`` read from one scanned sheet."""
+    with Image.open(path) as image:
+        gray = np.asarray(image.convert("L"))
+    matrix = fit_affine(layout.fiducials, find_fiducials(gray))
+    scale = np.sqrt(abs(np.linalg.det(matrix[:2])))
+    dark = gray < DARK_LEVEL
+
+    def sample(centers):
+        mapped = np.hstack([centers.reshape(-1, 2), np.ones((centers[..., 0].size, 1))])
+        mapped = (mapped @ matrix).reshape(centers.shape)
+        return _pick(bubble_fill(dark, mapped, 0.6 * BUBBLE_RADIUS * scale))
+
+    problems = []
+
+    def digits(picks, name):
+        if (picks == -2).any():
+            problems.append(f"{name} has a column with more than one bubble filled")
+        if (picks < 0).all():
+            return ""
+        if (picks < 0).any():
+            problems.append(f"{name} has blank columns")
+        return "".join(str(p) if p >= 0 else "?" for p in picks)
+
+    student_id = digits(sample(layout.id_bubbles), "student id")
+    version = digits(sample(layout.version_bubbles), "version")
+    answers = []
+    for q, pick in enumerate(sample(layout.answer_bubbles), start=1):
+        if pick == -2:
+            problems.append(f"question {q} has more than one bubble filled")
+        answers.append(LETTERS[pick] if pick >= 0 else "")
+    if version and "?" not in version:
+        version = str(int(version))
+    return student_id, version, answers, problems
+
+
+def _read_sheet_job(path, layout):
+    try:
+        return path, read_sheet(path, layout), None
+    except (OSError, ValueError) as e:
+        return path, None, str(e)
+
+
+def find_scans(scan_dir):
+    return [
+        os.path.join(scan_dir, name)
+        for name in sorted(os.listdir(scan_dir))
+        if name.lower().endswith(SCAN_EXTENSIONS) and not name.startswith(".")
+    ]
+
+
+def scan_folder(scan_dir, layout: SheetLayout, out_csv, *, workers=None, progress=None):
+    """Read every scan in a folder in a process pool and write the grader's response CSV.
+
+    Returns a list of ``(path, problem)`` for sheets that need a human look; unreadable
+    sheets are left out of the CSV.
+    """
+    paths = find_scans(scan_dir)
+    if not paths:
+        raise ValueError(f"No scanned sheets found in {scan_dir}.")
+    workers = workers or os.cpu_count() or 1
+    problems = []
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(paths) // (4 * workers))
+        results = pool.map(_read_sheet_job, paths, [layout] * len(paths), chunksize=chunksize)
+        for done, (path, result, error) in enumerate(results, start=1):
+            if error is not None:
+                problems.append((path, error))
+            else:
+                student_id, version, answers, sheet_problems = result
+                if not student_id or not version:
+                    sheet_problems = ["missing student id or version", *sheet_problems]
+                problems += [(path, problem) for problem in sheet_problems]
+                if version and "?" not in version:
+                    rows.append([student_id, version, *answers])
+            if progress is not None:
+                progress(done, len(paths))
+
+    with open(out_csv, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["student_id", "version", *(f"q{i}" for i in range(1, layout.questions + 1))]
+        )
+        writer.writerows(rows)
+    return problems
@@ -3,11 +3,13 @@ import random
 import re
 
 from docx import Document
-from docx2python import docx2python
 from docx.oxml import OxmlElement
 from docx.oxml.ns import qn
 from docx.shared import Pt
 
+from codeshuffler.lib.docxstream import iter_docx_lines
+from codeshuffler.models.exam import ExamView
+
 
 def _create_border(border_type, val, sz=4, space=4, color="auto"):
     b = OxmlElement(f"w:{border_type}")
@@ -60,15 +62,97 @@ def _add_code_block(doc, code_text: str):
 
 def create_exam_docx(template_path, exam_dict, output_path, answer_key=False):
     try:
-        doc = Document(template_path)
+        exporter = ExamDocxExporter(template_path)
     except Exception as e:
         print(f"Error loading template file {template_path}: {e}")
         return
-    _append_questions(doc, exam_dict, answer_key=answer_key)
-    doc.save(output_path)
+    exporter.write(exam_dict, output_path, answer_key=answer_key)
     print(f"Exam rebuilt and saved to {output_path}")
 
 
+class ExamDocxExporter:
+    """Writes any number of exams from one loaded template.
+
+    The template is parsed once and one question, code block, choice and spacer paragraph
+    are built through ``_append_questions`` as prototypes. Each ``write`` clones those
+    fragments, fills in the text and swaps them into the template body before saving.
+    """
+
+    def __init__(self, template_path):
+        self.doc = Document(template_path)
+        self.body = self.doc.element.body
+        self._appended = []
+
+        base = len(self.body)
+        sample = {
+            1: {"question": "", "code": ["", ""], "choices": ["", ""], "correct_index": 1},
+        }
+        _append_questions(self.doc, sample, answer_key=True)
+        question, code, choice, bold_choice, spacer = self._take_new_children(base)
+
+        runs = code.findall(qn("w:r"))
+        self._code_line, self._code_break = runs[1], runs[2]
+        for run in runs[1:-1]:
+            code.remove(run)
+        self._code_block = code
+        self._question = question
+        self._choice = choice
+        self._bold_choice = bold_choice
+        self._spacer = spacer
+
+    def _take_new_children(self, base):
+        sect_pr = self.body.sectPr
+        added = [el for el in self.body[base - (sect_pr is not None) :] if el is not sect_pr]
+        for el in added:
+            self.body.remove(el)
+        return added
+
+    @staticmethod
+    def _clone(prototype, text=None):
+        el = copy.deepcopy(prototype)
+        if text is not None:
+            run = el if el.tag == qn("w:r") else el.find(qn("w:r"))
+            run.text = text
+        return el
+
+    def _code_element(self, code_lines):
+        block = copy.deepcopy(self._code_block)
+        end_marker = block.findall(qn("w:r"))[-1]
+        for idx, line in enumerate(code_lines):
+            stripped = line.lstrip(" ")
+            visible_line = ("\u00a0" * (len(line) - len(stripped))) + stripped
+            end_marker.addprevious(self._clone(self._code_line, visible_line))
+            if idx < len(code_lines) - 1:
+                end_marker.addprevious(copy.deepcopy(self._code_break))
+        return block
+
+    def build(self, exam_dict, answer_key=False):
+        elements = []
+        for qnum, content in exam_dict.items():
+            elements.append(self._clone(self._question, f"{qnum}) {content['question']}"))
+            code_lines = content.get("code", [])
+            if code_lines:
+                # the same "\\n" round trip _add_code_block does on the joined code
+                elements.append(self._code_element("\\n".join(code_lines).split("\\n")))
+            correct_index = content.get("correct_index")
+            for i, choice in enumerate(content["choices"]):
+                bold = answer_key and correct_index == i
+                prototype = self._bold_choice if bold else self._choice
+                elements.append(self._clone(prototype, f"({chr(97 + i)}) {choice}"))
+            elements.append(self._clone(self._spacer))
+        return elements
+
+    def write(self, exam_dict, output, answer_key=False):
+        # output is a path or a binary file object, as for Document.save
+        for el in self._appended:
+            self.body.remove(el)
+        self._appended = self.build(exam_dict, answer_key=answer_key)
+        sect_pr = self.body.sectPr
+        at = self.body.index(sect_pr) if sect_pr is not None else len(self.body)
+        self.body[at:at] = self._appended
+        self.doc.save(output)
+
+
 def _append_questions(doc, exam_dict, answer_key):
     for qnum, content in exam_dict.items():
         question = content["question"]
@@ -99,6 +183,8 @@ def _append_questions(doc, exam_dict, answer_key):
 
 
 def parse_exam(doc_path: str):
+    from docx2python import docx2python
+
     with docx2python(doc_path) as docx_content:
         text = docx_content.text
 
@@ -108,7 +194,16 @@ def parse_exam(doc_path: str):
         if stripped:
             lines.append(stripped)
 
-    exam = {}
+    return dict(iter_exam_questions(lines))
+
+
+def parse_exam_stream(doc_path: str):
+    # same result as parse_exam, but the document is read one paragraph at a time
+    return dict(iter_exam_questions(iter_docx_lines(doc_path)))
+
+
+def iter_exam_questions(lines):
+    """Yield ``(qnum, content)`` pairs from stripped exam lines as each question completes."""
     current_qnum = None
     choices: list[str] = []
     question_text: list[str] = []
@@ -159,7 +254,7 @@ def parse_exam(doc_path: str):
             continue
         if question_pattern.match(line):
             if current_qnum is not None:
-                exam[current_qnum] = {
+                yield current_qnum, {
                     "question": " ".join(question_text).strip(),
                     "code": code_buffer,
                     "choices": choices,
@@ -186,49 +281,29 @@ def parse_exam(doc_path: str):
             question_text.append(line)
 
     if current_qnum is not None:
-        exam[current_qnum] = {
+        yield current_qnum, {
             "question": " ".join(question_text).strip(),
             "code": code_buffer,
             "choices": choices,
             "correct_index": correct_index,
         }
-    return exam
-
-
-def shuffle_questions(exam_dict):
-    exam_copy = copy.deepcopy(exam_dict)
-    question_items = list(exam_copy.items())
-    random.shuffle(question_items)
-
-    shuffled_exam = {}
-    for new_qnum, (_, content) in enumerate(question_items, start=1):
-        shuffled_exam[new_qnum] = content
-
-    return shuffled_exam
-
-
-def shuffle_answers(exam_dict):
-    exam_copy = copy.deepcopy(exam_dict)
-
-    for _, content in exam_copy.items():
-        choices = content.get("choices")
-        indexed = list(enumerate(choices))
 
-        random.shuffle(indexed)
-        new_choices = [text for (_, text) in indexed]
-        old_correct = content.get("correct_index")
-        new_correct = None
 
-        if old_correct is not None:
-            for new_i, (old_i, _) in enumerate(indexed):
-                if old_i == old_correct:
-                    new_correct = new_i
-                    break
+def shuffle_questions(exam_dict, rng=None):
+    view = ExamView.from_exam(exam_dict)
+    positions = list(range(len(view)))
+    (rng or random).shuffle(positions)
+    return view.reorder(positions)
 
-        content["choices"] = new_choices
-        content["correct_index"] = new_correct
 
-    return exam_copy
+def shuffle_answers(exam_dict, rng=None):
+    view = ExamView.from_exam(exam_dict)
+    perms = []
+    for pos in range(len(view)):
+        perm = list(range(len(view.question_at(pos).choices)))
+        (rng or random).shuffle(perm)
+        perms.append(perm)
+    return view.permute_choices(perms)
 
 
 def print_exam_dict(exam_dict):
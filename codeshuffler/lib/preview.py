@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import functools
 from dataclasses import dataclass
 from html import escape
 from typing import Any, Dict, List, Optional, Tuple
 
+from codeshuffler.models.exam import ExamQuestion, ExamView
+
 
 class PreviewError(RuntimeError):
     pass
@@ -14,21 +17,53 @@ class HtmlPreview:
     html: str
 
 
-def render_exam_html(
-    exam_dict: Dict[Any, Any],
-    *,
-    title: str = "Exam Preview",
-    subtitle: Optional[str] = None,
-) -> HtmlPreview:
+def render_question_fragments(exam_dict: Dict[Any, Any]) -> List[str]:
+    """The title and body HTML of every question, in display order.
+
+    ``render_exam_html`` wraps these in a page; the GUI preview lays them out one by one.
+    """
     if not exam_dict:
         raise PreviewError("No exam content to preview.")
 
-    items = list(exam_dict.items())
+    if isinstance(exam_dict, ExamView):
+        # shuffled views hand out their shared question objects, so the fragments are looked
+        # up directly instead of building and coercing an exam_dict entry per question
+        items = [(number, pos) for pos, number in enumerate(exam_dict.numbers)]
+    else:
+        items = list(exam_dict.items())
     try:
         items.sort(key=lambda kv: int(kv[0]))
     except Exception:
         pass
 
+    fragments = []
+    for idx, (qnum, qval) in enumerate(items, start=1):
+        body = None
+        if isinstance(exam_dict, ExamView):
+            question = exam_dict.question_at(qval)
+            if question.question or question.choices:
+                body = render_view_question(question, exam_dict.choice_order(qval))
+            else:
+                # nothing to show, so coerce_question falls back to the entry itself
+                qval = exam_dict.content_at(qval)
+        if body is None:
+            prompt, choices, meta = coerce_question(qnum, qval, idx=idx)
+            body = render_question_body(prompt, tuple(choices))
+        fragments.append(
+            f"<div class='qtitle'><span class='qnum'>Q{escape(str(qnum))}</span>"
+            f"<span class='qidx'>({idx})</span></div>{body}"
+        )
+    return fragments
+
+
+def render_exam_html(
+    exam_dict: Dict[Any, Any],
+    *,
+    title: str = "Exam Preview",
+    subtitle: Optional[str] = None,
+) -> HtmlPreview:
+    questions = render_question_fragments(exam_dict)
+
     css = default_css()
 
     header_bits = [f"<h1>{escape(title)}</h1>"]
@@ -43,23 +78,9 @@ def render_exam_html(
 
     body.append("<div class='questions'>")
 
-    for idx, (qnum, qval) in enumerate(items, start=1):
-        prompt, choices, meta = coerce_question(qnum, qval, idx=idx)
-
+    for fragment in questions:
         body.append("<section class='question'>")
-        body.append(
-            f"<div class='qtitle'><span class='qnum'>Q{escape(str(qnum))}</span>"
-            f"<span class='qidx'>({idx})</span></div>"
-        )
-
-        if prompt:
-            body.append(f"<div class='prompt'>{render_rich_text(prompt)}</div>")
-
-        if choices:
-            body.append("<ol class='choices'>")
-            for c in choices:
-                body.append(f"<li class='choice'>{render_rich_text(c)}</li>")
-            body.append("</ol>")
+        body.append(fragment)
         body.append("</section>")
 
     body.append("</div>")  # questions
@@ -81,6 +102,30 @@ def render_exam_html(
     return HtmlPreview(html=html)
 
 
+@functools.lru_cache(maxsize=8192)
+def render_question_body(prompt: str, choices: Tuple[str, ...]) -> str:
+    # question content never changes between shuffles, only its number and position,
+    # so a reshuffle reuses these fragments and just reassembles them
+    out = []
+    if prompt:
+        out.append(f"<div class='prompt'>{render_rich_text(prompt)}</div>")
+    if choices:
+        out.append("<ol class='choices'>")
+        out.extend(render_choice(c) for c in choices)
+        out.append("</ol>")
+    return "".join(out)
+
+
+@functools.lru_cache(maxsize=8192)
+def render_view_question(question: ExamQuestion, choice_order: Tuple[int, ...]) -> str:
+    return render_question_body(question.question, tuple(question.choices[i] for i in choice_order))
+
+
+@functools.lru_cache(maxsize=32768)
+def render_choice(choice: str) -> str:
+    return f"<li class='choice'>{render_rich_text(choice)}</li>"
+
+
 def coerce_question(qnum: Any, qval: Any, *, idx: int) -> Tuple[str, List[str], Dict[str, Any]]:
     meta: Dict[str, Any] = {}
 
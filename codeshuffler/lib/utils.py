@@ -1,7 +1,87 @@
+import functools
 import os
 import sys
 
-from PIL import Image, ImageDraw, ImageFont
+FONT_PATH = os.path.join(os.path.dirname(__file__), "fonts", "static", "SourceCodePro-Medium.ttf")
+
+
+class CodeRenderer:
+    """Renders code lines to PNG with one font load per process.
+
+    Source Code Pro is monospaced, so the canvas is sized from the advance width, the line
+    pitch and a per-character ink table instead of laying the text out twice.
+    """
+
+    def __init__(self, font_path=FONT_PATH, size=15, spacing=4, padding=(20, 20)):
+        # Pillow is imported on first use so the GUI can paint before it is loaded
+        from PIL import ImageFont
+
+        self.font = ImageFont.truetype(font_path, size)
+        self.spacing = spacing
+        self.pad_x, self.pad_y = padding
+        self.advance = self.font.getlength("M")
+        # same line pitch Pillow uses for multiline text
+        self.line_pitch = self.font.getbbox("A")[3] + spacing
+        self._ink = {}
+
+    def _glyph_ink(self, ch):
+        ink = self._ink.get(ch)
+        if ink is None:
+            bbox = self.font.getbbox(ch)
+            ink = self._ink[ch] = (bbox[0], bbox[1], bbox[2], bbox[3], self.font.getlength(ch))
+        return ink
+
+    def measure(self, lines):
+        # equivalent to ImageDraw.multiline_textbbox((0, 0), "\n".join(lines), ...)
+        left = right = 0
+        top = bottom = None
+        for i, line in enumerate(lines):
+            offset = i * self.line_pitch
+            # an empty line still occupies a zero-height box at the top of its row
+            line_top = line_bottom = 0 if not line else None
+            pen = 0
+            for ch in line:
+                ch_left, ch_top, ch_right, ch_bottom, ch_advance = self._glyph_ink(ch)
+                left = min(left, int(pen + ch_left))
+                right = max(right, int(pen + ch_right))
+                pen += ch_advance
+                if line_top is None or ch_top < line_top:
+                    line_top = ch_top
+                if line_bottom is None or ch_bottom > line_bottom:
+                    line_bottom = ch_bottom
+            top = offset + line_top if top is None else min(top, offset + line_top)
+            bottom = offset + line_bottom if bottom is None else max(bottom, offset + line_bottom)
+        if top is None or (len(lines) == 1 and not lines[0]):
+            return 0, 0, 0, 0
+        return left, top, right, bottom
+
+    def render(self, shuffled_sol):
+        from PIL import Image, ImageDraw
+
+        lines = [line.rstrip() for line in shuffled_sol]
+        bbox = self.measure(lines)
+        width = bbox[2] - bbox[0]
+        height = bbox[3] - bbox[1]
+        img = Image.new(
+            "RGB", (width + 2 * self.pad_x, height + 2 * self.pad_y), color=(255, 255, 255)
+        )
+        draw = ImageDraw.Draw(img)
+        draw.multiline_text(
+            (self.pad_x, self.pad_y),
+            "\n".join(lines),
+            font=self.font,
+            fill=(0, 0, 0),
+            spacing=self.spacing,
+        )
+        return img
+
+    def save(self, shuffled_sol, file_path):
+        self.render(shuffled_sol).save(file_path)
+
+
+@functools.lru_cache(maxsize=None)
+def get_renderer():
+    return CodeRenderer()
 
 
 def print_code(in_code, message="##### Code #####"):
@@ -12,21 +92,9 @@ def print_code(in_code, message="##### Code #####"):
 
 
 def convert_to_image(shuffled_sol, file_name):
-    code_text = "\n".join(line.rstrip() for line in shuffled_sol)
-    fnt = ImageFont.truetype("codeshuffler/lib/fonts/static/SourceCodePro-Medium.ttf", 15)
-    # temporary surface to measure bounding box
-    dummy_img = Image.new("RGB", (1, 1))
-    draw = ImageDraw.Draw(dummy_img)
-    bbox = draw.multiline_textbbox((0, 0), code_text, font=fnt, spacing=4)
-    width = bbox[2] - bbox[0]
-    height = bbox[3] - bbox[1]
-    # padding
-    pad_x, pad_y = 20, 20
-    img = Image.new("RGB", (width + 2 * pad_x, height + 2 * pad_y), color=(255, 255, 255))
-    draw = ImageDraw.Draw(img)
-    draw.multiline_text((pad_x, pad_y), code_text, font=fnt, fill=(0, 0, 0), spacing=4)
-    file_path = f"codeshuffler/gui/outputs/{file_name}.png"
-    img.save(file_path)
+    output_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "gui", "outputs")
+    os.makedirs(output_dir, exist_ok=True)
+    get_renderer().save(shuffled_sol, os.path.join(output_dir, f"{file_name}.png"))
 
 
 def resource_path(relative_path: str) -> str:
@@ -36,17 +104,4 @@ def resource_path(relative_path: str) -> str:
 
 
 def download_image(shuffled_sol, file_path):
-    code_text = "\n".join(line.rstrip() for line in shuffled_sol)
-    fnt = ImageFont.truetype("codeshuffler/lib/fonts/static/SourceCodePro-Medium.ttf", 15)
-    # temporary surface to measure bounding box
-    dummy_img = Image.new("RGB", (1, 1))
-    draw = ImageDraw.Draw(dummy_img)
-    bbox = draw.multiline_textbbox((0, 0), code_text, font=fnt, spacing=4)
-    width = bbox[2] - bbox[0]
-    height = bbox[3] - bbox[1]
-    # padding
-    pad_x, pad_y = 20, 20
-    img = Image.new("RGB", (width + 2 * pad_x, height + 2 * pad_y), color=(255, 255, 255))
-    draw = ImageDraw.Draw(img)
-    draw.multiline_text((pad_x, pad_y), code_text, font=fnt, fill=(0, 0, 0), spacing=4)
-    img.save(file_path)
+    get_renderer().save(shuffled_sol, file_path)
@@ -0,0 +1,301 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from codeshuffler.settings import settings
+
+# bump whenever run_case changes what it records so cached verdicts are invalidated
+VERIFIER_VERSION = 1
+TESTS_SUFFIX = ".tests.json"
+REPORT_NAME = "verify_report.json"
+# candidate orders sent to a worker at a time
+CHUNK_SIZE = 64
+# per test case: CPU seconds, wall-clock seconds and address space of a worker
+CPU_LIMIT = 0.25
+WALL_LIMIT = 1.0
+MEMORY_LIMIT = 1024 * 1024 * 1024
+# files a snippet writes are cut off at this size
+FILE_SIZE_LIMIT = 1024 * 1024
+
+# (cpu, wall) limits of this worker process, set by _init_worker
+_limits = (CPU_LIMIT, WALL_LIMIT)
+
+
+class Timeout(BaseException):
+    # a BaseException so a bare ``except Exception`` in the snippet cannot swallow it
+    pass
+
+
+def _on_timeout(signum, frame):
+    raise Timeout()
+
+
+def _init_worker(cpu_limit, wall_limit, memory_limit):
+    import resource
+
+    global _limits
+    _limits = (cpu_limit, wall_limit)
+    signal.signal(signal.SIGPROF, _on_timeout)
+    signal.signal(signal.SIGALRM, _on_timeout)
+    # writing past the size limit should fail the write, not kill the worker
+    signal.signal(signal.SIGXFSZ, signal.SIG_IGN)
+    for limit, value in (
+        (resource.RLIMIT_AS, memory_limit),
+        (resource.RLIMIT_FSIZE, FILE_SIZE_LIMIT),
+    ):
+        try:
+            resource.setrlimit(limit, (value, value))
+        except (ValueError, OSError):
+            # not every platform lets a process lower every limit
+            pass
+
+
+def run_case(code, case):
+    """Run compiled snippet code on one test case in a fresh directory.
+
+    A case may give ``stdin``, ``argv``, ``files`` (name -> content, created before the
+    run) and ``eval`` (an expression evaluated in the snippet's namespace afterwards).
+    Returns what an observer could tell apart: the output, the evaluated value, the
+    exception raised and the final content of the case's files.
+    """
+    cpu_limit, wall_limit = _limits
+    files = case.get("files", {})
+    cwd = os.getcwd()
+    saved = sys.stdin, sys.stdout, sys.argv
+    out = io.StringIO()
+    value = error = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, content in files.items():
+            with open(os.path.join(tmp, os.path.basename(name)), "w", encoding="utf-8") as f:
+                f.write(content)
+        os.chdir(tmp)
+        sys.stdin = io.StringIO(case.get("stdin", ""))
+        sys.stdout = out
+        sys.argv = list(case.get("argv", ["snippet.py"]))
+        namespace = {"__name__": "__main__"}
+        try:
+            try:
+                signal.setitimer(signal.ITIMER_PROF, cpu_limit)
+                signal.setitimer(signal.ITIMER_REAL, wall_limit)
+                exec(code, namespace)
+                if "eval" in case:
+                    value = repr(eval(case["eval"], namespace))
+            finally:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+                signal.setitimer(signal.ITIMER_REAL, 0)
+        except Timeout:
+            error = "Timeout"
+        except KeyboardInterrupt:
+            raise
+        except BaseException as e:
+            error = type(e).__name__
+        finally:
+            sys.stdin, sys.stdout, sys.argv = saved
+            os.chdir(cwd)
+        contents = {}
+        for name in files:
+            try:
+                with open(os.path.join(tmp, os.path.basename(name)), encoding="utf-8") as f:
+                    contents[name] = f.read()
+            except (OSError, ValueError):
+                contents[name] = None
+    return [out.getvalue(), value, error, contents]
+
+
+def run_order(lines, order, tests, stop_at=None):
+    # outcomes of every test, stopping at the first one that differs from stop_at
+    try:
+        code = compile("\n".join(lines[i] for i in order), "<snippet>", "exec")
+    except (SyntaxError, ValueError) as e:
+        return [[None, None, type(e).__name__, {}]]
+    outcomes = []
+    for k, case in enumerate(tests):
+        outcomes.append(run_case(code, case))
+        if stop_at is not None and outcomes[-1] != stop_at[k]:
+            break
+    return outcomes
+
+
+def verify_chunk(lines, tests, num_correct, orders):
+    """Which of ``orders`` (comma-separated line ids) behave exactly like the correct code.
+
+    Returns ``(reference, verdicts)``; verdicts are None when the correct code itself
+    timed out, since nothing can be told from the others then.
+    """
+    reference = run_order(lines, range(num_correct), tests)
+    if any(outcome[2] == "Timeout" for outcome in reference):
+        return reference, None
+    verdicts = {}
+    for order in orders:
+        ids = [int(i) for i in order.split(",")]
+        verdicts[order] = run_order(lines, ids, tests, stop_at=reference) == reference
+    return reference, verdicts
+
+
+class VerifyCache:
+    """Verdicts per (snippet, candidate order), one JSON file per snippet and test set.
+
+    The key covers the snippet's lines, its test cases and the verifier version, so
+    editing either one starts that snippet over while everything else is reused.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    @staticmethod
+    def key(lines, tests) -> str:
+        digest = hashlib.sha256(f"verifier-v{VERIFIER_VERSION}\0".encode("utf-8"))
+        digest.update("\n".join(lines).encode("utf-8"))
+        digest.update(b"\0" + json.dumps(tests, sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key) -> dict:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def put(self, key, verdicts):
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(verdicts, f)
+        os.replace(tmp_path, self._path(key))
+
+
+def load_tests(path):
+    with open(path, "r", encoding="utf-8") as f:
+        tests = json.load(f)
+    if not isinstance(tests, list) or not all(isinstance(case, dict) for case in tests):
+        raise ValueError(f"{path}: expected a list of test cases.")
+    return tests
+
+
+def verify_snippets(
+    snippet_dir,
+    *,
+    workers=None,
+    first_same_lines=None,
+    cpu_limit=CPU_LIMIT,
+    wall_limit=WALL_LIMIT,
+    memory_limit=MEMORY_LIMIT,
+    cache=None,
+    progress=None,
+):
+    """Run every candidate distractor of the Python snippets against their test cases.
+
+    Candidates are the entries of each snippet's distractor pool. A snippet is tested
+    when ``<snippet>.tests.json`` sits next to it; candidates whose outcomes match the
+    correct code on every case are flagged. Verdicts are cached, so only new snippets,
+    orders or test cases are run again.
+
+    The limits only stop runaway snippets; this is not a sandbox. Snippet code runs with
+    the permissions of the user, so only verify snippets you trust. A chunk whose worker
+    dies is recorded under the snippet's "errors" and its orders are left unverified.
+    """
+    from codeshuffler.lib.batch import find_snippets, load_snippets
+
+    if not hasattr(signal, "setitimer"):
+        raise ValueError("Execution verification needs POSIX timers (Linux or macOS).")
+    if first_same_lines is None:
+        first_same_lines = settings.first_same_X_lines_MCQ
+    cache = cache or VerifyCache(settings.verify_cache_dir)
+    paths = [p for p in find_snippets(snippet_dir) if p.lower().endswith(".py")]
+
+    report = {}
+    jobs = {}
+    pending = {}
+    for codefile in load_snippets(paths):
+        name = codefile.filename
+        tests_path = os.path.join(snippet_dir, name + TESTS_SUFFIX)
+        if not os.path.isfile(tests_path):
+            report[name] = {"status": "no tests"}
+            continue
+        tests = load_tests(tests_path)
+        lines = codefile.correct_sol + codefile.wrong_inst
+        if first_same_lines >= len(codefile.correct_sol):
+            report[name] = {"status": "skipped: fewer lines than --fixed-lines"}
+            continue
+        pool = codefile.distractor_pool(first_same_lines)
+        orders = [
+            ",".join(map(str, pool.sequences[i, : pool.lengths[i]])) for i in range(len(pool))
+        ]
+        key = cache.key(lines, tests)
+        verdicts = cache.get(key)
+        missing = [order for order in orders if order not in verdicts]
+        report[name] = {
+            "status": "ok",
+            "tests": len(tests),
+            "candidates": len(orders),
+            "cached": len(orders) - len(missing),
+            "orders": orders,
+        }
+        pending[name] = {"key": key, "lines": lines, "verdicts": verdicts, "chunks": 0}
+        for start in range(0, len(missing), CHUNK_SIZE):
+            chunk = missing[start : start + CHUNK_SIZE]
+            jobs[(name, start)] = (lines, tests, len(codefile.correct_sol), chunk)
+            pending[name]["chunks"] += 1
+
+    # spawned workers start clean, so the limits only cover the snippet runs
+    workers = workers or os.cpu_count() or 1
+    total = len(jobs)
+    if jobs:
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(cpu_limit, wall_limit, memory_limit),
+        ) as pool:
+            futures = {pool.submit(verify_chunk, *args): name for (name, _), args in jobs.items()}
+            for done, future in enumerate(as_completed(futures), start=1):
+                name = futures[future]
+                try:
+                    reference, verdicts = future.result()
+                except Exception as e:
+                    # a run that kills its worker (os._exit, a crash in C code) breaks the
+                    # pool, and every chunk still queued fails with it; their orders stay
+                    # uncached and are run again next time
+                    report[name].setdefault("errors", []).append(f"{type(e).__name__}: {e}")
+                    verdicts = {}
+                entry = pending[name]
+                if verdicts is None:
+                    report[name]["status"] = "the correct code timed out"
+                else:
+                    entry["verdicts"].update(verdicts)
+                entry["chunks"] -= 1
+                if entry["chunks"] == 0 and report[name]["status"] == "ok":
+                    cache.put(entry["key"], entry["verdicts"])
+                if progress is not None:
+                    progress(done, total)
+
+    for name, entry in pending.items():
+        result = report[name]
+        orders = result.pop("orders")
+        if result["status"] != "ok":
+            continue
+        if "errors" in result:
+            result["status"] = "incomplete"
+            result["unverified"] = sum(order not in entry["verdicts"] for order in orders)
+        lines = entry["lines"]
+        result["flagged"] = [
+            {"order": order, "lines": [lines[int(i)] for i in order.split(",")]}
+            for order in orders
+            if entry["verdicts"].get(order)
+        ]
+    return report
+
+
+def write_report(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    return path
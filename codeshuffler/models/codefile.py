@@ -1,5 +1,7 @@
+import io
 import os
 
+from codeshuffler.lib.cache import ParseCache, default_parse_cache
 from codeshuffler.lib.generator import read_original_code
 
 
@@ -11,14 +13,39 @@ class CodeFile:
         self.wrong_inst = None
         self.wrong_inst_dict = None
         self.warning_msg = None
+        # the file's text with newlines normalised like a text-mode open(), for display
+        self.text = None
         self.loaded = False
+        # distractor pools by (first_same_lines, size), shared with copies of this file
+        self.pools = {}
 
-    def load(self):
-        with open(self.path, "r", encoding="utf-8") as f:
-            (
-                self.correct_sol,
-                self.wrong_inst,
-                self.wrong_inst_dict,
-                self.warning_msg,
-            ) = read_original_code(f)
+    def load(self, cache=None):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        cache = cache or default_parse_cache()
+        key = ParseCache.key(data) if cache is not None else None
+        result = cache.get(key) if cache is not None else None
+        # newline=None keeps the universal-newline handling of a text-mode open()
+        self.text = io.StringIO(data.decode("utf-8"), newline=None).read()
+        if result is None:
+            result = read_original_code(io.StringIO(self.text))
+            if cache is not None:
+                cache.put(key, result)
+        (
+            self.correct_sol,
+            self.wrong_inst,
+            self.wrong_inst_dict,
+            self.warning_msg,
+        ) = result
+        self.pools = {}
         self.loaded = True
+
+    def distractor_pool(self, first_same_lines, size=None):
+        from codeshuffler.lib.distractors import POOL_SIZE, DistractorPool
+
+        size = size or POOL_SIZE
+        key = (first_same_lines, size)
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = DistractorPool.from_codefile(self, first_same_lines, size)
+        return pool
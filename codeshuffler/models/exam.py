@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+# choice permutations repeat a lot between versions, so views share one tuple per permutation
+_PERMUTATIONS: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+
+@dataclass(frozen=True)
+class ExamQuestion:
+    number: Any
+    question: str
+    code: Tuple[str, ...]
+    choices: Tuple[str, ...]
+    correct_index: Optional[int]
+
+    @classmethod
+    def from_content(cls, number: Any, content: Mapping) -> ExamQuestion:
+        return cls(
+            number,
+            content["question"],
+            tuple(content.get("code", ())),
+            tuple(content["choices"]),
+            content.get("correct_index"),
+        )
+
+
+class ExamView(Mapping):
+    """An exam_dict read through a question order and per-question choice orders.
+
+    ``questions`` holds the content once and is shared by every view made from it; a
+    shuffled version only stores which question sits at each position and how its choices
+    are permuted. Looking a question up builds a small exam_dict-style entry on the fly.
+    """
+
+    __slots__ = ("questions", "order", "choice_orders", "numbers", "_positions")
+
+    def __init__(
+        self,
+        questions: Sequence[ExamQuestion],
+        order: Optional[Sequence[int]] = None,
+        choice_orders: Optional[Sequence[Optional[Tuple[int, ...]]]] = None,
+        numbers: Optional[Sequence[Any]] = None,
+    ):
+        self.questions = tuple(questions)
+        self.order = tuple(range(len(self.questions))) if order is None else tuple(order)
+        # indexed like ``questions``; None keeps the original choice order
+        self.choice_orders = (
+            (None,) * len(self.questions) if choice_orders is None else tuple(choice_orders)
+        )
+        if numbers is None:
+            numbers = [self.questions[idx].number for idx in self.order]
+        self.numbers = numbers if isinstance(numbers, range) else tuple(numbers)
+        self._positions = None
+
+    @classmethod
+    def from_exam(cls, exam_dict: Mapping) -> ExamView:
+        if isinstance(exam_dict, ExamView):
+            return exam_dict
+        return cls([ExamQuestion.from_content(k, v) for k, v in exam_dict.items()])
+
+    def __getitem__(self, number: Any) -> Dict[str, Any]:
+        return self.content_at(self.position(number))
+
+    def position(self, number: Any) -> int:
+        if isinstance(self.numbers, range):
+            try:
+                return self.numbers.index(number)
+            except ValueError:
+                raise KeyError(number) from None
+        if self._positions is None:
+            self._positions = {number: pos for pos, number in enumerate(self.numbers)}
+        return self._positions[number]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.numbers)
+
+    def __len__(self) -> int:
+        return len(self.numbers)
+
+    def question_at(self, pos: int) -> ExamQuestion:
+        return self.questions[self.order[pos]]
+
+    def choice_order(self, pos: int) -> Tuple[int, ...]:
+        perm = self.choice_orders[self.order[pos]]
+        return perm if perm is not None else tuple(range(len(self.question_at(pos).choices)))
+
+    def content_at(self, pos: int) -> Dict[str, Any]:
+        question = self.question_at(pos)
+        perm = self.choice_order(pos)
+        correct_index = question.correct_index
+        return {
+            "question": question.question,
+            "code": list(question.code),
+            "choices": [question.choices[i] for i in perm],
+            "correct_index": perm.index(correct_index) if correct_index in perm else None,
+        }
+
+    def reorder(self, positions: Sequence[int]) -> ExamView:
+        # new view showing the current positions in the given order, renumbered from 1
+        order = [self.order[pos] for pos in positions]
+        return ExamView(self.questions, order, self.choice_orders, range(1, len(order) + 1))
+
+    def permute_choices(self, perms: Sequence[Sequence[int]]) -> ExamView:
+        # perms[pos] reorders the choices currently shown at position pos
+        choice_orders = list(self.choice_orders)
+        for pos, perm in enumerate(perms):
+            current = self.choice_order(pos)
+            new_order = tuple(current[i] for i in perm)
+            choice_orders[self.order[pos]] = _PERMUTATIONS.setdefault(new_order, new_order)
+        return ExamView(self.questions, self.order, choice_orders, self.numbers)
@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Dict, List, Sequence, Tuple
+
+
+@dataclass(frozen=True)
+class ShuffledQuestion:
+    """Shuffled code stored as a permutation over the original lines.
+
+    ``order[pos]`` indexes ``lines`` for shuffled position ``pos`` and ``positions`` maps
+    line content to its shuffled positions; "(n) " prefixes are only added by ``render``.
+    """
+
+    lines: Tuple[str, ...]
+    order: Tuple[int, ...]
+    positions: Dict[str, Tuple[int, ...]]
+
+    @classmethod
+    def from_order(cls, lines: Sequence[str], order: Sequence[int]) -> ShuffledQuestion:
+        lines = tuple(lines)
+        order = tuple(order)
+        if sorted(order) != list(range(len(lines))):
+            raise ValueError("order must be a permutation of the line indices.")
+        positions: Dict[str, List[int]] = {}
+        for pos, line_idx in enumerate(order):
+            positions.setdefault(lines[line_idx], []).append(pos)
+        return cls(lines, order, {k: tuple(v) for k, v in positions.items()})
+
+    @classmethod
+    def from_rendered(cls, rendered: Sequence[str]) -> ShuffledQuestion:
+        # recover a question from "(n) line" strings, keeping the shuffled order as is
+        lines = [line[line.index(")") + 2 :] for line in rendered]
+        return cls.from_order(lines, range(len(lines)))
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    @cached_property
+    def stripped_positions(self) -> Dict[str, Tuple[int, ...]]:
+        # like ``positions`` but keyed by the line without surrounding whitespace
+        index: Dict[str, List[int]] = {}
+        for pos, line_idx in enumerate(self.order):
+            index.setdefault(self.lines[line_idx].strip(), []).append(pos)
+        return {k: tuple(v) for k, v in index.items()}
+
+    def line_at(self, pos: int) -> str:
+        return self.lines[self.order[pos]]
+
+    def render(self, strip: bool = False) -> List[str]:
+        if strip:
+            return [f"({pos + 1}) " + self.lines[idx].strip() for pos, idx in enumerate(self.order)]
+        return [f"({pos + 1}) " + self.lines[idx] for pos, idx in enumerate(self.order)]
+
+    def answer(self, correct_sol: Sequence[str]) -> Tuple[List[int], List[int]]:
+        # repeated lines take their shuffled positions from first to last
+        used = [False] * len(self.order)
+        cursor: Dict[str, int] = {}
+        answer = []
+        for line in correct_sol:
+            candidates = self.positions.get(line, ())
+            nxt = cursor.get(line, 0)
+            if nxt < len(candidates):
+                pos = candidates[nxt]
+                cursor[line] = nxt + 1
+                used[pos] = True
+                answer.append(pos + 1)
+        remaining = [pos + 1 for pos, taken in enumerate(used) if not taken]
+        return answer, remaining
@@ -1,5 +1,19 @@
+import os
+
+# bundled files and caches live inside the package, wherever the app is started from
+_PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
 include_incorrect_instructions = True  # Include incorrect instructions to increase difficulty level
 first_same_X_lines_MCQ = 4  # Specify upto how many number of lines should be kept same in the generated multiple choice options.
 no_of_choices = 5  # generating these many random choices including the correct answer
 image_x_dim = 600
 image_y_dim = 300
+parse_cache_enabled = True  # Reuse parsed snippets across runs when the file content is unchanged
+parse_cache_dir = os.path.join(_PACKAGE_DIR, "gui", "cache", "parsed")
+parse_cache_max_bytes = 16 * 1024 * 1024  # Least recently used entries are evicted above this size
+exam_template = os.path.join(_PACKAGE_DIR, "codefiles", "templates", "CodeShufflersTemplate.docx")
+input_cache_dir = os.path.join(_PACKAGE_DIR, "gui", "cache", "inputs")
+# Dropped files are stored once per content; least recently used are evicted above this size
+input_cache_max_bytes = 64 * 1024 * 1024
+# Verdicts of the verify command, per snippet and test set
+verify_cache_dir = os.path.join(_PACKAGE_DIR, "gui", "cache", "verified")
@@ -1,11 +1,26 @@
-import os
-import sys
+import time
 
-from PyQt5.QtGui import QFont, QIcon
-from PyQt5.QtWidgets import QApplication
+STARTED = time.perf_counter()
 
-from codeshuffler.gui.main_window import MainWindow
-from codeshuffler.lib.utils import resource_path
+import os  # noqa: E402
+import sys  # noqa: E402
+
+from PyQt5.QtGui import QFont, QIcon  # noqa: E402
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+from codeshuffler.gui.utils.startup import StartupTimer  # noqa: E402
+
+# --startup-timing prints import, window and first-paint timings, then exits
+timer = StartupTimer(STARTED)
+timing = "--startup-timing" in sys.argv
+if timing:
+    sys.argv.remove("--startup-timing")
+timer.mark("qt imports")
+
+from codeshuffler.gui.main_window import MainWindow  # noqa: E402
+from codeshuffler.lib.utils import resource_path  # noqa: E402
+
+timer.mark("app imports")
 
 if sys.platform == "darwin":  # macOS
     os.environ["QT_MAC_WANTS_LAYER"] = "1"
@@ -21,7 +36,11 @@ QApplication.instance().setWindowIcon(icon)
 app.setApplicationName("CodeShuffler")
 app.setOrganizationName("CodeShuffler")
 app.setApplicationDisplayName("CodeShuffler")
+timer.mark("application")
 
 gui = MainWindow()
+timer.mark("main window")
+if timing:
+    timer.watch_first_paint(gui)
 gui.show()
 sys.exit(app.exec_())
@@ -0,0 +1,103 @@
+"""Time GenericHighlighter on a generated 5,000-line file.
+
+Run from the repository root:
+
+    QT_QPA_PLATFORM=offscreen python scripts/bench_highlighter.py --lines 5000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt5.QtGui import QGuiApplication, QTextCursor, QTextDocument  # noqa: E402
+
+from codeshuffler.gui.components.syntax import GenericHighlighter  # noqa: E402
+
+SOURCES = {
+    "python": [
+        '"""Module docstring',
+        "spanning a few lines with if/for keywords inside.",
+        '"""',
+        "class Shape{i}(object):",
+        "    def area(self, r=2):  # radius 2 by default",
+        "        name = 'shape {i}' + \"#not a comment\"",
+        "        return 3.14159 * r * r + {i}",
+    ],
+    "cpp": [
+        "/* block comment",
+        " * spanning several lines, with int and for inside",
+        " */",
+        "class Shape{i} {{",
+        "public:",
+        "    double area(int r) {{ return 3.14 * r * r + {i}; }}  // inline comment",
+        '    const char* name = "shape /* {i} */";',
+        "}};",
+    ],
+    "java": [
+        "/** Javadoc for Shape{i}",
+        " * @return the area */",
+        "public class Shape{i} extends Base {{",
+        "    private static final int SIDES = {i};",
+        '    public String name() {{ return "shape // {i}"; }}',
+        "}}",
+    ],
+}
+
+
+def make_source(language, lines):
+    template = SOURCES[language]
+    out = []
+    i = 0
+    while len(out) < lines:
+        out.extend(line.format(i=i) for line in template)
+        i += 1
+    return "\n".join(out[:lines])
+
+
+def bench(language, lines, repeat):
+    text = make_source(language, lines)
+    full = []
+    for _ in range(repeat):
+        doc = QTextDocument()
+        doc.setPlainText(text)
+        highlighter = GenericHighlighter(doc, language=language)
+        # attaching only schedules highlighting, so time an explicit pass over every block
+        start = time.perf_counter()
+        highlighter.rehighlight()
+        full.append(time.perf_counter() - start)
+
+    # one keystroke in the middle of the file: only the edited block should be re-highlighted
+    doc = QTextDocument()
+    doc.setPlainText(text)
+    highlighter = GenericHighlighter(doc, language=language)
+    highlighter.rehighlight()
+    cursor = QTextCursor(doc.findBlockByNumber(lines // 2))
+    cursor.movePosition(QTextCursor.EndOfBlock)
+    start = time.perf_counter()
+    cursor.insertText(" x")
+    edit = time.perf_counter() - start
+    del highlighter
+    return min(full), edit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("languages", nargs="*", default=list(SOURCES))
+    args = parser.parse_args()
+
+    QGuiApplication(sys.argv)
+    for language in args.languages:
+        full, edit = bench(language, args.lines, args.repeat)
+        print(
+            f"{language:>7}: {args.lines} lines highlighted in {full * 1000:.1f} ms, "
+            f"one-line edit in {edit * 1000:.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import os
+import random
+
+import pytest
+from PIL import Image, ImageDraw
+
+from codeshuffler.lib.atlas import PRINTABLE_ASCII, get_atlas_renderer, pixel_diff
+from codeshuffler.lib.batch import find_snippets
+from codeshuffler.lib.utils import CodeRenderer
+
+SNIPPET_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "codeshuffler",
+    "codefiles",
+    "snippets",
+)
+
+
+class BaselineRenderer(CodeRenderer):
+    # measures and draws the text through Pillow, as convert_to_image always did
+    def render(self, shuffled_sol):
+        code_text = "\n".join(line.rstrip() for line in shuffled_sol)
+        draw = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+        bbox = draw.multiline_textbbox((0, 0), code_text, font=self.font, spacing=self.spacing)
+        width = bbox[2] - bbox[0]
+        height = bbox[3] - bbox[1]
+        img = Image.new(
+            "RGB", (width + 2 * self.pad_x, height + 2 * self.pad_y), color=(255, 255, 255)
+        )
+        draw = ImageDraw.Draw(img)
+        draw.multiline_text(
+            (self.pad_x, self.pad_y),
+            code_text,
+            font=self.font,
+            fill=(0, 0, 0),
+            spacing=self.spacing,
+        )
+        return img
+
+
+def _snippet_texts():
+    for path in find_snippets(SNIPPET_DIR):
+        with open(path, "r", encoding="utf-8") as f:
+            yield pytest.param(f.read().splitlines(), id=os.path.basename(path))
+
+
+def _random_texts(count=40, seed=2026):
+    rng = random.Random(seed)
+    for i in range(count):
+        lines = [
+            "".join(rng.choice(PRINTABLE_ASCII) for _ in range(rng.randint(0, 60)))
+            for _ in range(rng.randint(1, 12))
+        ]
+        yield pytest.param(lines, id=f"random-{i}")
+
+
+EDGE_CASES = [
+    pytest.param([""], id="empty"),
+    pytest.param(["", "", "x"], id="leading-blank-lines"),
+    pytest.param(["    ", "  indented"], id="spaces-only"),
+    pytest.param([PRINTABLE_ASCII], id="every-glyph"),
+    pytest.param(["_" * 80, "|" * 80, "`'" * 40], id="thin-glyphs"),
+]
+
+
+@pytest.fixture(scope="module")
+def baseline():
+    return BaselineRenderer()
+
+
+@pytest.mark.parametrize("lines", [*_snippet_texts(), *_random_texts(), *EDGE_CASES])
+@pytest.mark.parametrize("renderer", ["pillow", "atlas"])
+def test_matches_pillow_multiline_text(baseline, renderer, lines):
+    candidate = get_atlas_renderer() if renderer == "atlas" else CodeRenderer()
+    assert pixel_diff(lines, reference=baseline, candidate=candidate) == 0
@@ -0,0 +1,88 @@
+import itertools
+import os
+import random
+import time
+from math import comb, factorial
+
+import pytest
+
+from codeshuffler.lib.dependencies import LineOrder, is_equivalent_answer, line_order
+from codeshuffler.models.codefile import CodeFile
+
+SNIPPET_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "codeshuffler",
+    "codefiles",
+    "snippets",
+)
+
+
+def _random_order(rng, n):
+    # each line may depend on any earlier line, so the original order is always valid
+    return LineOrder(
+        tuple(sum(1 << j for j in range(k) if rng.random() < rng.random()) for k in range(n))
+    )
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_count_and_extensions_match_brute_force(seed):
+    rng = random.Random(seed)
+    order = _random_order(rng, rng.randint(1, 7))
+    valid = [list(p) for p in itertools.permutations(range(len(order))) if order.accepts(p)]
+    assert order.count() == len(valid)
+    extensions = list(order.extensions())
+    assert extensions[0] == list(range(len(order)))
+    assert sorted(extensions) == valid
+    limit = rng.randint(0, len(valid))
+    assert list(order.extensions(limit)) == extensions[:limit]
+
+
+def test_mergelists_initializations_trade_places():
+    codefile = CodeFile(os.path.join(SNIPPET_DIR, "mergelists.py"))
+    codefile.load()
+    lines = codefile.correct_sol
+    assert lines[1:3] == ["    i = j = 0", "    result = []"]
+    order = line_order(tuple(lines))
+    assert not order.unique
+    assert order.count() == 2
+    assert list(order.extensions()) == [
+        list(range(len(lines))),
+        [0, 2, 1, *range(3, len(lines))],
+    ]
+    answer = ",".join(str(k) for k in range(1, len(lines) + 1))
+    swapped = ",".join(str(k) for k in [1, 3, 2, *range(4, len(lines) + 1)])
+    # the def line cannot move
+    moved_def = ",".join(str(k) for k in [2, 1, *range(3, len(lines) + 1)])
+    assert is_equivalent_answer(swapped, answer, lines)
+    assert not is_equivalent_answer(moved_def, answer, lines)
+
+
+def _chains(count, length):
+    # ``count`` counters, each line bumping one of them, interleaved round robin
+    lines = ["def f():"]
+    for k in range(count * length):
+        name, step = f"v{k % count}", k // count
+        lines.append(f"    {name}_{step} = {name}_{step - 1} + 1" if step else f"    {name}_0 = 0")
+    return lines
+
+
+@pytest.mark.parametrize(
+    "lines, expected",
+    [
+        pytest.param(_chains(30, 1), factorial(30), id="independent"),
+        pytest.param(_chains(2, 15), comb(30, 15), id="two-chains"),
+        pytest.param(_chains(3, 10), factorial(30) // factorial(10) ** 3, id="three-chains"),
+    ],
+)
+def test_thirty_lines_take_milliseconds(lines, expected):
+    line_order.cache_clear()
+    start = time.perf_counter()
+    order = line_order(tuple(lines))
+    count = order.count()
+    extensions = list(order.extensions(1000))
+    elapsed = time.perf_counter() - start
+    assert count == expected
+    assert len(extensions) == 1000
+    assert all(order.accepts(e) for e in extensions[:50])
+    # typically 10-20 ms; the bound leaves room for slow CI machines
+    assert elapsed < 0.25
@@ -0,0 +1,65 @@
+import os
+import random
+
+import pytest
+
+from codeshuffler.lib.distractors import DistractorPool
+from codeshuffler.models.codefile import CodeFile
+
+SNIPPET_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "codeshuffler",
+    "codefiles",
+    "snippets",
+)
+
+
+def _pool(name, size=2048):
+    codefile = CodeFile(os.path.join(SNIPPET_DIR, name))
+    codefile.load()
+    return DistractorPool.from_codefile(codefile, 2, size)
+
+
+def _bucket(pool, name):
+    return {int(entry) for entry in pool.buckets[name]}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_mix_draws_from_its_buckets(seed):
+    pool = _pool("mergelists.py")
+    picked = pool.draw(4, random.Random(seed), mix=[("hard", 3), ("easy", 1)])
+    assert len(set(picked)) == 4
+    assert set(picked[:3]) <= _bucket(pool, "hard")
+    assert picked[3] in _bucket(pool, "easy")
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_short_buckets_borrow_from_neighbours(seed):
+    # a nine-candidate pool plus three partials: four entries in each difficulty
+    pool = _pool("mergelists.py", size=9)
+    hard, medium, easy = (_bucket(pool, name) for name in ("hard", "medium", "easy"))
+    assert (len(hard), len(medium), len(easy)) == (4, 4, 4)
+
+    picked = pool.draw(7, random.Random(seed), mix=[("hard", 6), ("easy", 1)])
+    assert len(set(picked)) == 7
+    # hard runs out and borrows from medium, its nearest neighbour, before easy
+    assert set(picked[:4]) == hard
+    assert set(picked[4:6]) <= medium
+    assert picked[6] in easy
+
+    picked = pool.draw(11, random.Random(seed), mix=[("easy", 10), ("hard", 1)])
+    assert set(picked[:4]) == easy
+    assert set(picked[4:8]) == medium
+    assert set(picked[8:11]) <= hard
+
+    with pytest.raises(ValueError, match="Only 12 distinct wrong choices"):
+        pool.draw(13, random.Random(seed), mix=[("hard", 13)])
+
+
+def test_pool_and_draws_are_deterministic_per_snippet():
+    first, second = _pool("mergelists.py"), _pool("mergelists.py")
+    assert (first.sequences == second.sequences).all()
+    mix = [("hard", 3), ("easy", 1)]
+    assert first.draw(4, random.Random(7), mix) == second.draw(4, random.Random(7), mix)
+    # another snippet samples its own candidates
+    assert _pool("binarysearch.py").sequences.tolist() != first.sequences.tolist()
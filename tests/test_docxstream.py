@@ -0,0 +1,98 @@
+import os
+
+import pytest
+from docx import Document
+from docx2python import docx2python
+from docx.oxml import parse_xml
+
+from codeshuffler.lib.docxstream import iter_docx_lines
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NAMESPACES = (
+    'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006" '
+    'xmlns:wps="http://schemas.microsoft.com/office/word/2010/wordprocessingShape" '
+    'xmlns:v="urn:schemas-microsoft-com:vml"'
+)
+
+
+def p(text):
+    return f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>"
+
+
+def tc(body, span=None, v_merge=None):
+    pr = f'<w:gridSpan w:val="{span}"/>' if span else ""
+    if v_merge == "continue":
+        pr += "<w:vMerge/>"
+    elif v_merge:
+        pr += f'<w:vMerge w:val="{v_merge}"/>'
+    return f"<w:tc><w:tcPr>{pr}</w:tcPr>{body}</w:tc>"
+
+
+def tr(*cells):
+    return "<w:tr>" + "".join(cells) + "</w:tr>"
+
+
+def tbl(*rows):
+    return "<w:tbl>" + "".join(rows) + "</w:tbl>"
+
+
+def text_box(before, text):
+    # Word writes a text box twice: a DrawingML choice and a VML fallback
+    return (
+        f"<w:p><w:r><w:t>{before}</w:t></w:r><w:r><mc:AlternateContent>"
+        f'<mc:Choice Requires="wps"><w:drawing><wps:txbx><w:txbxContent>{p(text)}'
+        "</w:txbxContent></wps:txbx></w:drawing></mc:Choice>"
+        f"<mc:Fallback><w:pict><v:textbox><w:txbxContent>{p(text)}"
+        "</w:txbxContent></v:textbox></w:pict></mc:Fallback>"
+        "</mc:AlternateContent></w:r><w:r><w:t>after</w:t></w:r></w:p>"
+    )
+
+
+BODIES = {
+    "grid-span": tbl(tr(tc(p("wide"), span=3)), tr(tc(p("a")), tc(p("b")), tc(p("c")))),
+    "vertical-merge": tbl(
+        tr(tc(p("top"), v_merge="restart"), tc(p("b1"))),
+        tr(tc(p(""), v_merge="continue"), tc(p("b2"))),
+    ),
+    "nested-table": tbl(
+        tr(
+            tc(p("pre") + tbl(tr(tc(p("inner"), span=2))) + p("post"), span=2),
+            tc(p("side")),
+        ),
+        tr(tc(p("n1")), tc(p("n2"), v_merge="continue"), tc(p("n3"))),
+    ),
+    "text-box": text_box("lead", "boxed"),
+    "text-box-in-cell": tbl(
+        tr(tc(p("first") + text_box("lead", "boxed") + p("last"), span=2)),
+        tr(tc(p("x")), tc(p("y"), v_merge="continue")),
+    ),
+}
+
+
+def _docx2python_lines(path):
+    with docx2python(path) as doc:
+        return [line.strip() for line in doc.text.splitlines() if line.strip()]
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        os.path.join(ROOT, "assessment-template.docx"),
+        os.path.join(ROOT, "codeshuffler", "codefiles", "templates", "CodeShufflersTemplate.docx"),
+    ],
+    ids=os.path.basename,
+)
+def test_bundled_documents_match_docx2python(path):
+    assert list(iter_docx_lines(path)) == _docx2python_lines(path)
+
+
+@pytest.mark.parametrize("body", list(BODIES.values()), ids=list(BODIES))
+def test_merged_cells_and_text_boxes_match_docx2python(tmp_path, body):
+    document = Document()
+    container = document.element.body
+    for i, element in enumerate(parse_xml(f"<w:body {NAMESPACES}>{body}</w:body>")):
+        container.insert(i, element)
+    path = str(tmp_path / "doc.docx")
+    document.save(path)
+    assert list(iter_docx_lines(path)) == _docx2python_lines(path)
@@ -0,0 +1,128 @@
+import itertools
+import random
+
+import pytest
+
+from codeshuffler.lib.generator import (
+    distinct_ranks,
+    distractor_blocks,
+    gen_correct_answer,
+    gen_random_choices,
+    gen_random_choices_wICinst,
+    generate_partials_with_swaps,
+    shuffle_question,
+    unrank_distractor,
+)
+from codeshuffler.lib.metrics import as_sequences, kendall_tau_distance, metric_filter
+from codeshuffler.settings import settings
+
+
+def _valid_distractors(remaining, wrong):
+    # every ordering of distinct lines that keeps all but at most two of the remaining
+    # correct lines and is num_remaining - 1 to num_remaining + num_wrong - 1 lines long
+    lines = remaining + wrong
+    valid = set()
+    for length in range(max(len(remaining) - 1, 0), len(lines)):
+        for seq in itertools.permutations(lines, length):
+            if sum(line in remaining for line in seq) >= len(remaining) - 2:
+                valid.add(seq)
+    return valid
+
+
+@pytest.mark.parametrize("num_remaining", range(0, 5))
+@pytest.mark.parametrize("num_wrong", range(0, 4))
+def test_unranking_is_a_bijection_onto_valid_distractors(num_remaining, num_wrong):
+    remaining = [str(i) for i in range(1, num_remaining + 1)]
+    wrong = [str(i) for i in range(num_remaining + 1, num_remaining + num_wrong + 1)]
+    blocks = distractor_blocks(num_remaining, num_wrong)
+    total = sum(size for *_, size in blocks)
+    unranked = [tuple(unrank_distractor(blocks, remaining, wrong, r)) for r in range(total)]
+    assert len(set(unranked)) == total
+    assert set(unranked) == _valid_distractors(remaining, wrong)
+
+
+@pytest.mark.parametrize("total", [0, 1, 2, 17])
+def test_distinct_ranks_is_a_permutation(total):
+    assert sorted(distinct_ranks(total, random.Random(total))) == list(range(total))
+
+
+@pytest.fixture
+def no_fixed_lines(monkeypatch):
+    monkeypatch.setattr(settings, "first_same_X_lines_MCQ", 0)
+
+
+# two correct lines and one incorrect line make 9 valid distractors, one of them correct
+@pytest.mark.parametrize("seed", range(5))
+def test_every_wrong_choice_at_the_boundary(no_fixed_lines, seed):
+    choices = gen_random_choices_wICinst("1,2", 9, ["3"], random.Random(seed))
+    assert len(set(choices)) == 9
+    assert choices.count("1,2") == 1
+
+
+def test_one_choice_past_the_boundary(no_fixed_lines):
+    with pytest.raises(ValueError, match="Only 8 distinct wrong choices"):
+        gen_random_choices_wICinst("1,2", 10, ["3"], random.Random(0))
+
+
+def test_random_choices_boundary():
+    assert sorted(gen_random_choices("1,2,3", 6, random.Random(0))) == sorted(
+        ",".join(p) for p in itertools.permutations("123")
+    )
+    with pytest.raises(ValueError, match="Only 5 distinct orderings"):
+        gen_random_choices("1,2,3", 7, random.Random(0))
+
+
+def test_filtered_choices_all_pass_the_filter(no_fixed_lines):
+    accept = metric_filter("kendall", minimum=2)
+    choices = gen_random_choices_wICinst(
+        "1,2,3,4", 5, ["5", "6"], random.Random(0), distractor_filter=accept
+    )
+    wrong = as_sequences([c for c in choices if c != "1,2,3,4"])
+    assert len(wrong) == 4
+    assert (kendall_tau_distance(wrong, "1,2,3,4") >= 2).all()
+
+
+def test_too_few_filtered_choices(no_fixed_lines):
+    # "1,2,3" without incorrect lines has six two-line distractors, three of them inverted
+    accept = metric_filter("kendall", minimum=1)
+    choices = gen_random_choices_wICinst("1,2,3", 4, [], random.Random(0), distractor_filter=accept)
+    assert sorted(choices) == ["1,2,3", "2,1", "3,1", "3,2"]
+    with pytest.raises(ValueError, match="Only 3 distinct wrong choices pass"):
+        gen_random_choices_wICinst("1,2,3", 5, [], random.Random(0), distractor_filter=accept)
+
+
+def _partials(correct_sol, incorrect_lines, seed):
+    question = shuffle_question(correct_sol + list(incorrect_lines.values()), random.Random(seed))
+    answer, _ = gen_correct_answer(correct_sol, question)
+    partials = generate_partials_with_swaps(len(incorrect_lines), question, incorrect_lines, answer)
+    return question, answer, partials
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_partials_match_whole_lines_only(seed):
+    # "total = 1" is part of "total = 10" and "total = 2" is part of "total = 20"
+    correct_sol = ["total = 10", "total = 1", "total = 20", "print(total)"]
+    question, answer, partials = _partials(correct_sol, {"total = 1": "total = 2"}, seed)
+    assert len(partials) == 1
+    partial, swap = partials[0]
+    expected = answer.split(",")
+    expected[1] = str(question.positions["total = 2"][0] + 1)
+    assert (partial, swap) == (",".join(expected), "total = 1")
+
+
+@pytest.mark.parametrize("seed", range(10))
+@pytest.mark.parametrize(
+    "incorrect_lines, swaps",
+    [
+        pytest.param({"i += 1": "i -= 1"}, 1, id="one-shown-copy"),
+        # a second key that strips to the same line shows the incorrect line twice
+        pytest.param({"i += 1": "i -= 1", "  i += 1": "i -= 1"}, 2, id="two-shown-copies"),
+    ],
+)
+def test_partials_never_repeat_a_position(seed, incorrect_lines, swaps):
+    correct_sol = ["i = 0", "i += 1", "i += 1", "print(i)"]
+    _, _, partials = _partials(correct_sol, incorrect_lines, seed)
+    assert len(partials) == swaps
+    for partial, _ in partials:
+        positions = partial.split(",")
+        assert len(set(positions)) == len(positions)
@@ -0,0 +1,146 @@
+import csv
+import json
+
+import pytest
+
+from codeshuffler.lib.grading import grade_files
+from codeshuffler.lib.manifest import ManifestWriter
+
+SNIPPETS = [
+    {"name": "a.py", "lines": 4, "swaps": ["x = 1", "y = 2"]},
+    {"name": "b.py", "lines": 3, "swaps": []},
+]
+
+
+def choice(letter, sequence, score=0.0, swap=None):
+    return {"letter": letter, "sequence": sequence, "score": score, "swap": swap}
+
+
+def item(name, version, order, choices):
+    correct = next(c for c in choices if c["score"] == 1.0)
+    return {
+        "item": name,
+        "image": f"v{version:04d}/{name}.png",
+        "correct": correct["letter"],
+        "sequence": correct["sequence"],
+        "order": order,
+        "choices": choices,
+    }
+
+
+VERSIONS = [
+    {
+        "version": 1,
+        "items": [
+            item(
+                "a.py",
+                1,
+                "0,1,2,3",
+                [
+                    choice("a", "2,1,3"),
+                    choice("b", "1,2,3", 1.0),
+                    choice("c", "1,4,3", 0.75, "x = 1"),
+                ],
+            ),
+            item("b.py", 1, "2,0,1", [choice("a", "3,1,2", 1.0), choice("b", "1,3,2")]),
+        ],
+    },
+    {
+        "version": 2,
+        "items": [
+            item(
+                "a.py",
+                2,
+                "3,2,1,0",
+                [
+                    choice("a", "4,1,2", 0.5, "y = 2"),
+                    choice("b", "3,2,4"),
+                    choice("c", "4,3,2", 1.0),
+                ],
+            ),
+            item("b.py", 2, "1,2,0", [choice("a", "2,1,3"), choice("b", "2,3,1", 1.0)]),
+        ],
+    },
+]
+
+RESPONSES = [
+    ["student_id", "version", "q1", "q2"],
+    ["full", "1", "b", "a"],
+    ["partial", "1", "C", "b"],
+    ["blank", "2", "", "b"],
+    ["invalid", "2", "ab", "z"],
+    ["partial-2", "2", "a", "b"],
+]
+
+# score, max_score, percent, a.py, b.py
+EXPECTED = {
+    "full": ["2", "2", "100.00", "1", "1"],
+    "partial": ["0.75", "2", "37.50", "0.75", "0"],
+    "blank": ["1", "2", "50.00", "0", "1"],
+    "invalid": ["0", "2", "0.00", "0", "0"],
+    "partial-2": ["1.5", "2", "75.00", "0.5", "1"],
+}
+
+
+def write_manifests(tmp_path):
+    header = {
+        "format": 1,
+        "seed": 1,
+        "versions_total": len(VERSIONS),
+        "no_of_choices": 3,
+        "first_same_lines": 0,
+        "snippets": [snippet["name"] for snippet in SNIPPETS],
+        "warnings": {},
+    }
+    json_path = tmp_path / "manifest.json"
+    json_path.write_text(json.dumps({**header, "versions": VERSIONS}), encoding="utf-8")
+    binary_path = str(tmp_path / "manifest.bin")
+    with ManifestWriter(binary_path, {**header, "snippets": SNIPPETS}) as writer:
+        for version in VERSIONS:
+            writer.add(version["version"], version["items"])
+    return str(json_path), binary_path
+
+
+def write_responses(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        csv.writer(f).writerows(rows)
+    return str(path)
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_student_scores(tmp_path):
+    json_path, _ = write_manifests(tmp_path)
+    responses = write_responses(tmp_path / "responses.csv", RESPONSES)
+    students_path, items_path = grade_files(json_path, responses, str(tmp_path / "grades"))
+
+    header, *rows = read_csv(students_path)
+    assert header == ["student_id", "version", "score", "max_score", "percent", "a.py", "b.py"]
+    assert {row[0]: row[2:] for row in rows} == EXPECTED
+
+    header, *rows = read_csv(items_path)
+    assert header[:3] == ["item", "responses", "mean_score"]
+    # full, partial, no credit, omitted; "ab" and "z" count as omitted like a blank
+    assert {row[0]: row[3:] for row in rows} == {
+        "a.py": ["1", "2", "0", "2"],
+        "b.py": ["3", "0", "1", "1"],
+    }
+
+
+def test_unknown_version(tmp_path):
+    json_path, _ = write_manifests(tmp_path)
+    responses = write_responses(tmp_path / "responses.csv", [*RESPONSES, ["stray", "3", "a", "a"]])
+    with pytest.raises(ValueError, match="unknown version 3"):
+        grade_files(json_path, responses, str(tmp_path / "grades"))
+
+
+def test_binary_manifest_grades_like_json(tmp_path):
+    json_path, binary_path = write_manifests(tmp_path)
+    responses = write_responses(tmp_path / "responses.csv", RESPONSES)
+    from_json = grade_files(json_path, responses, str(tmp_path / "json"))
+    from_binary = grade_files(binary_path, responses, str(tmp_path / "binary"))
+    for json_csv, binary_csv in zip(from_json, from_binary):
+        assert read_csv(json_csv) == read_csv(binary_csv)
@@ -0,0 +1,56 @@
+import os
+
+from codeshuffler.lib.inputcache import InputCache
+
+CODE = 'x = 1\r\nprint(x)\r\n# Incorrect lines below\r\nincorrect_lines = {"x = 1": "x = 2"}\r\n'
+
+
+def write(path, content):
+    path.write_bytes(content.encode("utf-8"))
+    return str(path)
+
+
+def entries(cache):
+    return sorted(os.listdir(cache.directory))
+
+
+def test_same_content_is_stored_once(tmp_path):
+    cache = InputCache(str(tmp_path / "cache"), 1024)
+    first = cache.store(write(tmp_path / "a.py", CODE))
+    second = cache.store(write(tmp_path / "renamed.PY", CODE))
+    assert first == second
+    assert entries(cache) == [os.path.basename(first)]
+    assert first.endswith(".py")
+
+    codefile = cache.codefile(first, "a.py")
+    again = cache.codefile(second, "renamed.PY")
+    assert (codefile.filename, again.filename) == ("a.py", "renamed.PY")
+    # parsed once; the copies only differ in the name they show
+    assert again.correct_sol is codefile.correct_sol
+    assert codefile.correct_sol == ["x = 1", "print(x)"]
+    assert codefile.text == CODE.replace("\r\n", "\n")
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = InputCache(str(tmp_path / "cache"), 3 * len(CODE))
+    paths = []
+    for i in range(3):
+        paths.append(cache.store(write(tmp_path / f"{i}.py", CODE + f"# {i}\n")))
+        os.utime(paths[-1], (i, i))
+    assert len(entries(cache)) == 2 and not os.path.exists(paths[0])
+
+    # storing the oldest again makes it the most recently used
+    paths[1] = cache.store(write(tmp_path / "1.py", CODE + "# 1\n"))
+    paths.append(cache.store(write(tmp_path / "3.py", CODE + "# 3\n")))
+    assert entries(cache) == sorted(os.path.basename(p) for p in (paths[1], paths[3]))
+    assert os.path.getsize(paths[1]) + os.path.getsize(paths[3]) <= cache.max_bytes
+
+
+def test_the_stored_file_is_kept_even_when_too_big(tmp_path):
+    cache = InputCache(str(tmp_path / "cache"), 10)
+    small = cache.store(write(tmp_path / "small.py", "x = 1\n"))
+    big = cache.store(write(tmp_path / "big.py", CODE))
+    assert entries(cache) == [os.path.basename(big)]
+    assert not os.path.exists(small)
+    # temporary copies never linger
+    assert not [name for name in entries(cache) if name.endswith(".tmp")]
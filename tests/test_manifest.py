@@ -0,0 +1,116 @@
+import itertools
+import json
+import os
+
+import pytest
+
+from codeshuffler.lib.batch import run_batch
+from codeshuffler.lib.manifest import (
+    ManifestReader,
+    ManifestWriter,
+    decode_version,
+    encode_version,
+    rank_arrangement,
+    unrank_arrangement,
+)
+
+SNIPPET_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "codeshuffler",
+    "codefiles",
+    "snippets",
+)
+
+
+@pytest.fixture(scope="module")
+def batch_dir(tmp_path_factory):
+    out_dir = str(tmp_path_factory.mktemp("batch"))
+    run_batch(
+        SNIPPET_DIR,
+        out_dir,
+        3,
+        seed=7,
+        first_same_lines=2,
+        renderer="pillow",
+        mix="hard=3,easy=1",
+        workers=2,
+    )
+    return out_dir
+
+
+def _load_json(batch_dir):
+    with open(os.path.join(batch_dir, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("n", range(1, 6))
+def test_rank_round_trips_full_and_partial_arrangements(n):
+    for length in range(n + 1):
+        arrangements = list(itertools.permutations(range(n), length))
+        ranks = [rank_arrangement(values, n) for values in arrangements]
+        # lexicographic order, so the ranks are exactly 0 .. count - 1
+        assert ranks == list(range(len(arrangements)))
+        for rank, values in zip(ranks, arrangements):
+            assert unrank_arrangement(rank, n, length) == list(values)
+
+
+def test_decode_matches_manifest_json(batch_dir):
+    manifest = _load_json(batch_dir)
+    with ManifestReader(os.path.join(batch_dir, "manifest.bin")) as reader:
+        snippets = reader.snippets
+        assert reader.to_dict() == manifest
+    # the --mix run must have exercised the swap index
+    assert any(
+        choice["swap"] is not None
+        for version in manifest["versions"]
+        for item in version["items"]
+        for choice in item["choices"]
+    )
+    for version in manifest["versions"]:
+        buf = encode_version(version["items"], snippets)
+        assert decode_version(buf, 0, version["version"], snippets) == version
+
+
+def test_repeated_position_partial_round_trips(batch_dir):
+    manifest = _load_json(batch_dir)
+    with ManifestReader(os.path.join(batch_dir, "manifest.bin")) as reader:
+        snippets = reader.snippets
+    version = manifest["versions"][0]
+    index, snippet = next((i, s) for i, s in enumerate(snippets) if s["swaps"])
+    item = version["items"][index]
+    wrong = next(i for i, choice in enumerate(item["choices"]) if choice["score"] < 1)
+    positions = item["choices"][wrong]["sequence"].split(",")
+    # older manifests hold partials that list the swapped line's position twice
+    item["choices"][wrong] = {
+        "letter": item["choices"][wrong]["letter"],
+        "sequence": ",".join(positions[:2] + positions[:1]),
+        "score": 0.5,
+        "swap": snippet["swaps"][-1],
+    }
+    buf = encode_version(version["items"], snippets)
+    assert decode_version(buf, 0, version["version"], snippets) == version
+
+
+def test_reader_skips_unwritten_versions(batch_dir, tmp_path):
+    manifest = _load_json(batch_dir)
+    with ManifestReader(os.path.join(batch_dir, "manifest.bin")) as reader:
+        header = {**reader.header, "versions_total": 5}
+    path = str(tmp_path / "manifest.bin")
+    with ManifestWriter(path, header) as writer:
+        writer.add(2, manifest["versions"][0]["items"])
+        writer.add(4, manifest["versions"][1]["items"])
+
+    with ManifestReader(path) as reader:
+        assert len(reader) == 5
+        assert reader.versions() == [2, 4]
+        assert [v in reader for v in range(7)] == [False, False, True, False, True, False, False]
+        assert "2" not in reader
+        # images are named after the version id they were written under
+        assert reader[4]["items"] == [
+            {**item, "image": item["image"].replace("v0002", "v0004")}
+            for item in manifest["versions"][1]["items"]
+        ]
+        with pytest.raises(KeyError):
+            reader[3]
+        with pytest.raises(KeyError):
+            reader[6]
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from codeshuffler.lib.metrics import (
+    PAD,
+    as_sequences,
+    hamming_distance,
+    kendall_tau_distance,
+    lcs_length,
+)
+
+
+def kendall(candidate, reference):
+    where = {item: i for i, item in enumerate(candidate)}
+    return sum(
+        1
+        for i, a in enumerate(reference)
+        for b in reference[i + 1 :]
+        if a in where and b in where and where[a] > where[b]
+    )
+
+
+def lcs(candidate, reference):
+    dp = [[0] * (len(reference) + 1) for _ in range(len(candidate) + 1)]
+    for i, a in enumerate(candidate):
+        for j, b in enumerate(reference):
+            dp[i + 1][j + 1] = dp[i][j] + 1 if a == b else max(dp[i][j + 1], dp[i + 1][j])
+    return dp[-1][-1]
+
+
+def hamming(candidate, reference):
+    width = max(len(candidate), len(reference))
+    candidate = candidate + [PAD] * (width - len(candidate))
+    reference = reference + [PAD] * (width - len(reference))
+    return sum(a != b for a, b in zip(candidate, reference))
+
+
+def _batch(rng):
+    # distinct positions like real answers, some lines of the reference missing and some
+    # incorrect lines swapped in, with lengths on both sides of the reference's
+    reference = rng.sample(range(1, 10), rng.randint(1, 8))
+    candidates = [rng.sample(range(1, 13), rng.randint(0, 10)) for _ in range(rng.randint(1, 30))]
+    return candidates, reference
+
+
+@pytest.mark.parametrize(
+    "metric, brute_force",
+    [
+        (kendall_tau_distance, kendall),
+        (lcs_length, lcs),
+        (hamming_distance, hamming),
+    ],
+    ids=["kendall", "lcs", "hamming"],
+)
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_brute_force_on_padded_batches(metric, brute_force, seed):
+    candidates, reference = _batch(random.Random(seed))
+    for as_reference in (reference, ",".join(map(str, reference))):
+        values = metric(as_sequences(candidates), as_reference)
+        expected = [brute_force(candidate, reference) for candidate in candidates]
+        assert values.tolist() == expected
+
+
+def test_as_sequences_pads_mixed_lengths():
+    packed = as_sequences(["3,1,2", [4], ""])
+    assert packed.tolist() == [[3, 1, 2], [4, PAD, PAD], [PAD, PAD, PAD]]
+    assert as_sequences([[1, 2, 3]], width=2).tolist() == [[1, 2]]
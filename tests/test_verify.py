@@ -0,0 +1,77 @@
+import signal
+
+import pytest
+
+from codeshuffler.lib import verify
+from codeshuffler.lib.verify import VerifyCache, run_case, verify_chunk, verify_snippets
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(signal, "setitimer"), reason="verification needs POSIX timers"
+)
+
+# the correct code is the first three lines; the last one is the incorrect line
+LINES = ["a = 1", "b = 2", "print(a + b)", "print(a - b)"]
+
+
+@pytest.fixture
+def timers(monkeypatch):
+    # what _init_worker sets up in a worker, without its resource limits on the test process
+    monkeypatch.setattr(verify, "_limits", (0.2, 1.0))
+    previous = {
+        sig: signal.signal(sig, verify._on_timeout) for sig in (signal.SIGPROF, signal.SIGALRM)
+    }
+    yield
+    for sig, handler in previous.items():
+        signal.signal(sig, handler)
+
+
+def run(source, **case):
+    return run_case(compile(source, "<snippet>", "exec"), case)
+
+
+def test_run_case_records_output_value_and_files(timers):
+    source = "x = int(input())\nprint(x * 2)\nopen('data.txt', 'a').write('!')"
+    case = {"stdin": "21\n", "eval": "x", "files": {"data.txt": "hi"}}
+    assert run(source, **case) == ["42\n", "21", None, {"data.txt": "hi!"}]
+
+
+def test_run_case_records_raised_exceptions(timers):
+    assert run("print('before')\nraise KeyError('k')") == ["before\n", None, "KeyError", {}]
+    assert run("import sys\nsys.exit(3)")[2] == "SystemExit"
+
+
+def test_run_case_times_out(timers):
+    # a bare except in the snippet cannot swallow the timeout
+    source = "while True:\n    try:\n        pass\n    except:\n        pass"
+    assert run(source)[2] == "Timeout"
+
+
+def test_verify_chunk_flags_equivalent_orders(timers):
+    orders = ["1,0,2", "0,1,3", "2,0,1", "0,1"]
+    reference, verdicts = verify_chunk(LINES, [{}], 3, orders)
+    assert reference == [["3\n", None, None, {}]]
+    # only swapping the two independent assignments behaves like the correct code
+    assert verdicts == {"1,0,2": True, "0,1,3": False, "2,0,1": False, "0,1": False}
+
+
+def test_verify_chunk_gives_up_when_the_correct_code_times_out(timers):
+    reference, verdicts = verify_chunk(["while True:", "    pass"], [{}], 2, ["1,0"])
+    assert reference[0][2] == "Timeout"
+    assert verdicts is None
+
+
+def test_dead_workers_are_reported(tmp_path):
+    # some distractors swap in a line that kills the worker process outright
+    (tmp_path / "crash.py").write_text(
+        "import os\nx = 1\nprint(x)\n# Incorrect lines below\n"
+        'incorrect_lines = {"print(x)": "os._exit(1)"}\n',
+        encoding="utf-8",
+    )
+    (tmp_path / "crash.py.tests.json").write_text("[{}]", encoding="utf-8")
+    cache = VerifyCache(str(tmp_path / "cache"))
+    report = verify_snippets(str(tmp_path), workers=1, first_same_lines=1, cache=cache)
+    result = report["crash.py"]
+    assert result["status"] == "incomplete"
+    assert result["errors"][0].startswith("BrokenProcessPool")
+    assert result["unverified"] == result["candidates"]
+    assert result["flagged"] == []